@@ -17,6 +17,10 @@ def create_app(config_class=Config):
     jwt.init_app(app)
     CORS(app)
 
+    # Batas cache hasil forecast
+    from app.utils.forecast_cache import forecast_cache
+    forecast_cache.configure(app.config["FORECAST_CACHE_SIZE"], app.config["FORECAST_CACHE_TTL"])
+
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.import_data import import_data_bp
@@ -35,4 +39,8 @@ def create_app(config_class=Config):
     app.register_blueprint(goals_bp, url_prefix="/api/forecast") 
     app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")    
 
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+
     return app
@@ -0,0 +1,50 @@
+# app/commands.py
+import click
+from flask.cli import with_appcontext
+from .db import db
+
+
+@click.command("rebuild-sales-summary")
+@with_appcontext
+def rebuild_sales_summary_command():
+    """Bangun ulang tabel sales_summary dari seluruh transaksi"""
+    from app.utils.sales_summary import rebuild_all
+
+    months = rebuild_all()
+    db.session.commit()
+    click.echo(f"Sales summary rebuilt for {months} month(s)")
+
+
+@click.command("create-indexes")
+@with_appcontext
+def create_indexes_command():
+    """Buat index model yang belum ada pada tabel yang sudah ada"""
+    from app.utils.db_indexes import create_missing_indexes
+
+    created = create_missing_indexes()
+    if created:
+        for name in created:
+            click.echo(f"Created index {name}")
+    else:
+        click.echo("All indexes already exist")
+
+
+@click.command("create-columns")
+@with_appcontext
+def create_columns_command():
+    """Tambahkan kolom model yang belum ada pada tabel yang sudah ada"""
+    from app.utils.db_indexes import create_missing_columns
+
+    added = create_missing_columns()
+    if added:
+        for name in added:
+            click.echo(f"Added column {name}")
+    else:
+        click.echo("All columns already exist")
+
+
+def register_commands(app):
+    """Daftarkan perintah CLI (flask <command>)"""
+    app.cli.add_command(rebuild_sales_summary_command)
+    app.cli.add_command(create_indexes_command)
+    app.cli.add_command(create_columns_command)
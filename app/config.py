@@ -20,5 +20,51 @@ class Config:
 
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
 
+    # Import configuration (jumlah baris per window saat membaca file upload)
+    IMPORT_CHUNK_ROWS = int(os.environ.get("IMPORT_CHUNK_ROWS", 5000))
+
+    
     
-    
\ No newline at end of file
+    # Direktori staging file upload untuk import job di background
+    IMPORT_STAGING_DIR = os.environ.get("IMPORT_STAGING_DIR")
+
+    # Cache hasil forecast per proses (jumlah entri maksimum dan umur dalam detik)
+    FORECAST_CACHE_SIZE = int(os.environ.get("FORECAST_CACHE_SIZE", 256))
+    FORECAST_CACHE_TTL = int(os.environ.get("FORECAST_CACHE_TTL", 3600))
+
+    # Direktori model Prophet yang sudah di-fit (dipakai ulang sampai ada data baru)
+    FORECAST_MODEL_DIR = os.environ.get("FORECAST_MODEL_DIR")
+
+    # Refit /sales_forecast memakai parameter fit sebelumnya sebagai nilai awal Stan (tuning selalu cold start)
+    FORECAST_WARM_START = os.environ.get("FORECAST_WARM_START", "true").lower() == "true"
+
+    # Batas proses worker forecast batch; pool memegang slot dari budget core
+    # bersama job tuning (TUNING_CORE_BUDGET). Kosong = sebanyak slot yang bebas
+    FORECAST_BATCH_WORKERS = int(os.environ.get("FORECAST_BATCH_WORKERS", 0)) or None
+
+    # Forecaster statistik (seasonal naive / Croston / ETS) untuk seri pendek atau intermittent.
+    # "auto" = pakai jika error holdout <= FORECAST_FAST_MAX_ERROR (%), "off" = selalu Prophet
+    FORECAST_FAST_MODE = os.environ.get("FORECAST_FAST_MODE", "auto").lower()
+    FORECAST_FAST_MAX_ERROR = float(os.environ.get("FORECAST_FAST_MAX_ERROR", 30))
+    FORECAST_FAST_MAX_MONTHS = int(os.environ.get("FORECAST_FAST_MAX_MONTHS", 24))
+
+    # Interval default /sales_forecast: "full" (1000 simulasi Prophet), "reduced"
+    # (FORECAST_INTERVAL_SAMPLES simulasi) atau "residual" (kuantil residual, tanpa sampling)
+    FORECAST_INTERVAL_MODE = os.environ.get("FORECAST_INTERVAL_MODE", "full").lower()
+    FORECAST_INTERVAL_SAMPLES = int(os.environ.get("FORECAST_INTERVAL_SAMPLES", 100))
+
+    # Budget core untuk semua job tuning di satu node (default: semua core - TUNING_RESERVED_CORES)
+    TUNING_CORE_BUDGET = int(os.environ.get("TUNING_CORE_BUDGET", 0)) or None
+    TUNING_RESERVED_CORES = int(os.environ.get("TUNING_RESERVED_CORES", 2))
+    TUNING_WORKER_NICE = int(os.environ.get("TUNING_WORKER_NICE", 10))
+    # Direktori file slot core (harus sama untuk semua worker di node)
+    TUNING_SLOT_DIR = os.environ.get("TUNING_SLOT_DIR")
+
+    # Antrean job tuning: lease (detik) diperpanjang heartbeat; job dengan lease habis di-requeue
+    TUNING_LEASE_SECONDS = int(os.environ.get("TUNING_LEASE_SECONDS", 120))
+    TUNING_MAX_ATTEMPTS = int(os.environ.get("TUNING_MAX_ATTEMPTS", 3))
+    # true = API menjalankan job sendiri di thread; false = hanya worker.py yang mengambil job
+    TUNING_EMBEDDED_WORKER = os.environ.get("TUNING_EMBEDDED_WORKER", "true").lower() == "true"
+
+    # Direktori file memory-mapped data training tuning (default: /dev/shm jika ada, lalu temp)
+    TUNING_SHARED_DIR = os.environ.get("TUNING_SHARED_DIR")
@@ -6,4 +6,9 @@ from .product_stock import ProductStock
 from .transaction import Transaction
 from .forecast_parameter import ForecastParameter
 from .forecast_parameter import TuningJob
+from .forecast_parameter import TuningResult
 from .saved_forecast import SavedForecast
+from .import_job import ImportJob
+from .import_ledger import ImportLedger
+from .sales_summary import SalesSummary
+from .forecast_run import ForecastRun
@@ -64,17 +64,26 @@ class TuningJob(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     category = db.Column(db.String(100), nullable=False)  # Category being tuned
-    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed, cancelled
     progress = db.Column(db.Integer, default=0)  # Progress percentage (0-100)
     parameters = db.Column(db.Text, nullable=False)  # JSON of parameters being tested
     result = db.Column(db.Text, nullable=True)  # JSON of results (when completed)
     error = db.Column(db.Text, nullable=True)  # Error message (if failed)
+    worker_id = db.Column(db.String(100), nullable=True)  # Worker yang memegang lease (saat running)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)  # Job di-requeue jika lewat tanpa heartbeat
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Heartbeat terakhir dari worker
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # Jumlah claim
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(
         db.DateTime,
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
     )
+
+    __table_args__ = (
+        # Polling antrean: job pending tertua / lease running yang kedaluwarsa
+        db.Index("ix_tuning_jobs_status_lease", "status", "lease_expires_at"),
+    )
     
     def get_parameters(self):
         """Get parameters as dictionary from JSON string"""
@@ -121,13 +130,54 @@ class TuningJob(db.Model):
             "status": self.status,
             "progress": self.progress,
             "parameters": self.get_parameters(),
+            "worker_id": self.worker_id,
+            "attempts": self.attempts,
+            "heartbeat_at": self.format_date_makassar(self.heartbeat_at),
             "created_at": self.format_date_makassar(self.created_at),
             "updated_at": self.format_date_makassar(self.updated_at),
         }
         
-        if self.status == "completed":
+        if self.status in ("completed", "running") and self.result:
+            # Saat running: leaderboard sementara (successive halving)
             result["result"] = self.get_result()
-        elif self.status == "failed":
+        elif self.status in ("failed", "cancelled"):
             result["error"] = self.error
             
-        return result
\ No newline at end of file
+        return result
+
+class TuningResult(db.Model):
+    """Checkpoint hasil satu kombinasi parameter dari sebuah TuningJob"""
+
+    __tablename__ = "tuning_results"
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey("tuning_jobs.id", ondelete="CASCADE"), nullable=False)
+    params_hash = db.Column(db.String(64), nullable=False)  # SHA-256 kombinasi parameter (kunci resume)
+    parameters = db.Column(db.Text, nullable=False)  # JSON kombinasi parameter
+    cutoffs = db.Column(db.Integer, nullable=False)  # Jumlah cutoff CV yang dinilai (rung successive halving)
+    success = db.Column(db.Boolean, nullable=False, default=True)
+    mape = db.Column(db.Float, nullable=True)
+    rmse = db.Column(db.Float, nullable=True)
+    error = db.Column(db.Text, nullable=True)  # Error message (if failed)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    
+    __table_args__ = (
+        db.UniqueConstraint("job_id", "params_hash", "cutoffs", name="uq_tuning_results_job_params_cutoffs"),
+    )
+    
+    def to_result(self):
+        """Hasil dalam bentuk yang sama dengan TuningScheduler.evaluate"""
+        result = {
+            "parameters": json.loads(self.parameters),
+            "cutoffs": self.cutoffs,
+            "success": self.success,
+        }
+        if self.success:
+            # NULL = NaN saat disimpan (mis. tidak ada bulan dengan penjualan > 0)
+            result.update(
+                mape=self.mape if self.mape is not None else float("nan"),
+                rmse=self.rmse if self.rmse is not None else float("nan"),
+            )
+        else:
+            result["error"] = self.error
+        return result
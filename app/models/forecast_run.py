@@ -0,0 +1,99 @@
+# app/models/forecast_run.py
+from ..db import db
+from datetime import datetime, timezone
+import json
+import pytz
+
+
+class ForecastRun(db.Model):
+    """Job forecast batch untuk seluruh produk satu kategori / use_forecast"""
+
+    __tablename__ = "forecast_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(100), nullable=True)  # Kategori produk (None = semua kategori)
+    use_forecast_only = db.Column(db.Boolean, default=False)  # Hanya produk dengan use_forecast=True
+    periods = db.Column(db.Integer, nullable=False, default=6)  # Jumlah bulan forecast
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    progress = db.Column(db.Integer, default=0)  # Progress percentage (0-100)
+    total_products = db.Column(db.Integer, nullable=True)  # Jumlah produk dalam batch
+    processed_products = db.Column(db.Integer, default=0)  # Produk yang sudah selesai (berhasil/gagal)
+    succeeded = db.Column(db.Integer, default=0)  # Produk yang forecast-nya tersimpan
+    failed = db.Column(db.Integer, default=0)  # Produk yang gagal di-forecast
+    result = db.Column(db.Text, nullable=True)  # JSON ringkasan (saved, updated, errors per produk)
+    error = db.Column(db.Text, nullable=True)  # Error message (if failed)
+    created_by = db.Column(db.String(50), nullable=True)  # ID of user who started the run
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def get_result(self):
+        """Get result as dictionary from JSON string"""
+        if self.result:
+            return json.loads(self.result)
+        return None
+
+    def set_result(self, result_dict):
+        """Set result from dictionary to JSON string"""
+        self.result = json.dumps(result_dict)
+
+    def products_per_second(self):
+        """Throughput produk yang sudah diproses sejak job mulai"""
+        if not self.started_at or not self.processed_products:
+            return 0
+        # Waktu tersimpan sebagai UTC tanpa tzinfo
+        end = self.finished_at or datetime.now(timezone.utc)
+        elapsed = (end.replace(tzinfo=None) - self.started_at.replace(tzinfo=None)).total_seconds()
+        return round(self.processed_products / elapsed, 3) if elapsed > 0 else 0
+
+    def format_date_makassar(self, date_obj):
+        """Format date in Makassar timezone (UTC+8)"""
+        if not date_obj:
+            return None
+
+        # Define Makassar timezone
+        makassar_tz = pytz.timezone('Asia/Makassar')
+
+        # Convert UTC date to Makassar timezone
+        if date_obj.tzinfo is not None:
+            makassar_date = date_obj.astimezone(makassar_tz)
+        else:
+            # If no timezone info, assume it's UTC
+            utc_date = pytz.utc.localize(date_obj)
+            makassar_date = utc_date.astimezone(makassar_tz)
+
+        # Format the date as a string
+        return makassar_date.strftime('%Y-%m-%d %H:%M:%S')
+
+    def to_dict(self):
+        """Convert object to dictionary"""
+        result = {
+            "id": self.id,
+            "category": self.category,
+            "use_forecast_only": self.use_forecast_only,
+            "periods": self.periods,
+            "status": self.status,
+            "progress": self.progress,
+            "total_products": self.total_products,
+            "processed_products": self.processed_products,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "products_per_second": self.products_per_second(),
+            "created_by": self.created_by,
+            "started_at": self.format_date_makassar(self.started_at),
+            "finished_at": self.format_date_makassar(self.finished_at),
+            "created_at": self.format_date_makassar(self.created_at),
+            "updated_at": self.format_date_makassar(self.updated_at),
+        }
+
+        if self.status == "completed":
+            result["result"] = self.get_result()
+        elif self.status == "failed":
+            result["error"] = self.error
+
+        return result
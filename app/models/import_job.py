@@ -0,0 +1,89 @@
+# app/models/import_job.py
+from ..db import db
+from datetime import datetime, timezone
+import json
+import pytz
+
+
+class ImportJob(db.Model):
+    __tablename__ = "import_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    import_type = db.Column(db.String(50), nullable=False)  # customers, products, product_stock, transactions
+    filename = db.Column(db.String(255), nullable=False)  # Nama file asli yang di-upload
+    file_path = db.Column(db.String(500), nullable=True)  # Lokasi file staging (dihapus setelah selesai)
+    options = db.Column(db.Text, nullable=True)  # JSON opsi import (mis. update_existing)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    progress = db.Column(db.Integer, default=0)  # Progress percentage (0-100)
+    processed_rows = db.Column(db.Integer, default=0)  # Jumlah baris yang sudah diproses
+    total_rows = db.Column(db.Integer, nullable=True)  # Perkiraan jumlah baris (None untuk CSV)
+    result = db.Column(db.Text, nullable=True)  # JSON statistik import (inserted, duplicates, ...)
+    error = db.Column(db.Text, nullable=True)  # Error message (if failed)
+    created_by = db.Column(db.String(50), nullable=True)  # ID of user who uploaded the file
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def get_options(self):
+        """Get options as dictionary from JSON string"""
+        if self.options:
+            return json.loads(self.options)
+        return {}
+
+    def set_options(self, options_dict):
+        """Set options from dictionary to JSON string"""
+        self.options = json.dumps(options_dict)
+
+    def get_result(self):
+        """Get result as dictionary from JSON string"""
+        if self.result:
+            return json.loads(self.result)
+        return None
+
+    def set_result(self, result_dict):
+        """Set result from dictionary to JSON string"""
+        self.result = json.dumps(result_dict)
+
+    def format_date_makassar(self, date_obj):
+        """Format date in Makassar timezone (UTC+8)"""
+        if not date_obj:
+            return None
+
+        # Define Makassar timezone
+        makassar_tz = pytz.timezone('Asia/Makassar')
+
+        # Convert UTC date to Makassar timezone
+        if date_obj.tzinfo is not None:
+            makassar_date = date_obj.astimezone(makassar_tz)
+        else:
+            # If no timezone info, assume it's UTC
+            utc_date = pytz.utc.localize(date_obj)
+            makassar_date = utc_date.astimezone(makassar_tz)
+
+        # Format the date as a string
+        return makassar_date.strftime('%Y-%m-%d %H:%M:%S')
+
+    def to_dict(self):
+        """Convert object to dictionary"""
+        result = {
+            "id": self.id,
+            "import_type": self.import_type,
+            "filename": self.filename,
+            "options": self.get_options(),
+            "status": self.status,
+            "progress": self.progress,
+            "processed_rows": self.processed_rows,
+            "total_rows": self.total_rows,
+            "stats": self.get_result(),
+            "created_by": self.created_by,
+            "created_at": self.format_date_makassar(self.created_at),
+            "updated_at": self.format_date_makassar(self.updated_at),
+        }
+
+        if self.status == "failed":
+            result["error"] = self.error
+
+        return result
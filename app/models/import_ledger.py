@@ -0,0 +1,29 @@
+# app/models/import_ledger.py
+from ..db import db
+from datetime import datetime, timezone
+
+
+class ImportLedger(db.Model):
+    __tablename__ = "import_ledger"
+
+    id = db.Column(db.Integer, primary_key=True)
+    import_type = db.Column(db.String(50), nullable=False)  # customers, products, product_stock, transactions
+    chunk_key = db.Column(db.String(50), nullable=True)  # Kunci chunk (mis. bulan invoice "2025-03"); None = seluruh file
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 isi file / baris chunk
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # Jumlah baris yang tercakup
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        db.Index("ix_import_ledger_type_hash", "import_type", "content_hash"),
+    )
+
+    def to_dict(self):
+        """Convert object to dictionary"""
+        return {
+            "id": self.id,
+            "import_type": self.import_type,
+            "chunk_key": self.chunk_key,
+            "content_hash": self.content_hash,
+            "row_count": self.row_count,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
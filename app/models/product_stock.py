@@ -25,6 +25,10 @@ class ProductStock(db.Model):
     # Relasi ke Product
     product = db.relationship("Product", backref=db.backref("product_stock", lazy=True))
 
+    __table_args__ = (
+        db.Index("ix_product_stock_product_date", "product_id", "report_date"),
+    )
+
     def to_dict(self):
         """Mengonversi objek Stock ke dictionary"""
         return {
@@ -0,0 +1,45 @@
+from ..db import db
+from datetime import datetime, timezone
+
+
+class SalesSummary(db.Model):
+    """Agregat penjualan per hari/bulan, diperbarui setiap import transaksi"""
+
+    __tablename__ = "sales_summary"
+
+    id = db.Column(db.Integer, primary_key=True)  # Auto Increment ID
+    grain = db.Column(db.String(10), nullable=False)  # day / month
+    dimension = db.Column(db.String(20), nullable=False)  # product / category / customer / total
+    dim_key = db.Column(db.String(100), nullable=False, default="")  # product_id, category, customer_id ("" untuk total)
+    period_date = db.Column(db.Date, nullable=False)  # Tanggal (day) atau tanggal 1 (month)
+    qty = db.Column(db.Integer, nullable=False, default=0)  # SUM(qty)
+    amount = db.Column(db.Float, nullable=False, default=0)  # SUM(total_amount)
+    cost = db.Column(db.Float, nullable=False, default=0)  # SUM(total_cost)
+    line_count = db.Column(db.Integer, nullable=False, default=0)  # Jumlah baris transaksi
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)  # Jumlah invoice unik
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "grain", "dimension", "dim_key", "period_date", name="uix_sales_summary_key"
+        ),
+        db.Index("ix_sales_summary_period", "grain", "dimension", "period_date"),
+    )
+
+    def to_dict(self):
+        """Mengonversi objek SalesSummary ke dictionary"""
+        return {
+            "grain": self.grain,
+            "dimension": self.dimension,
+            "key": self.dim_key,
+            "period_date": self.period_date.isoformat() if self.period_date else None,
+            "qty": self.qty,
+            "amount": self.amount,
+            "cost": self.cost,
+            "line_count": self.line_count,
+            "invoice_count": self.invoice_count,
+        }
@@ -24,6 +24,7 @@ class SavedForecast(db.Model):
     # Composite unique constraint to ensure one forecast per product per date
     __table_args__ = (
         db.UniqueConstraint('product_id', 'forecast_date', name='uix_forecast_product_date'),
+        db.Index('ix_saved_forecast_date', 'forecast_date'),
     )
 
     def get_forecast_data(self):
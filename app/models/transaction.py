@@ -47,6 +47,15 @@ class Transaction(db.Model):
         onupdate=lambda: datetime.now(timezone.utc),
     )
 
+    # Index komposit untuk filter yang paling sering dipakai route dan import
+    __table_args__ = (
+        db.Index("ix_transaction_invoice_date", "invoice_date"),
+        db.Index("ix_transaction_product_date", "product_id", "invoice_date"),
+        db.Index("ix_transaction_category_date", "category", "invoice_date"),
+        db.Index("ix_transaction_customer_date", "customer_id", "invoice_date"),
+        db.Index("ix_transaction_invoice_line", "invoice_id", "product_id", "order_sequence"),
+    )
+
     # Relasi ke Customer dan Product
     customer = db.relationship(
         "Customer", backref=db.backref("transactions", lazy=True)
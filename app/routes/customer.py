@@ -3,8 +3,11 @@ from flask_jwt_extended import jwt_required
 import pandas as pd
 from app.models.customer import Customer
 from app.models.transaction import Transaction
+from app.models.sales_summary import SalesSummary
 from ..db import db
 from app.utils.security import success_response, error_response
+from app.utils.import_ledger import clear_ledger
+from app.utils.sales_summary import summary_query
 from sqlalchemy import or_, func, desc
 from datetime import datetime, timedelta
 import tempfile
@@ -286,6 +289,8 @@ def delete_customer(customer_id):
             )
         
         db.session.delete(customer)
+        # File customer yang pernah diimport harus bisa diimport ulang
+        clear_ledger("customers")
         db.session.commit()
         
         return success_response(message="Customer deleted successfully")
@@ -439,29 +444,28 @@ def get_customer_sales(customer_id):
         total_sales = sum(t["total_amount"] for t in transaction_list)
         total_orders = len(transaction_list)
         
-        # Calculate YTD and previous YTD sales for comparison
-        this_ytd_sales = db.session.query(
-            func.sum(Transaction.total_amount)
+        # Calculate YTD and previous YTD sales for comparison (daily summary)
+        customer_daily = summary_query(
+            "day",
+            "customer",
+            func.sum(SalesSummary.amount)
         ).filter(
-            Transaction.customer_id == customer_id,
-            Transaction.invoice_date >= this_year_start,
-            Transaction.invoice_date <= today
+            SalesSummary.dim_key == customer_id
+        )
+        
+        this_ytd_sales = customer_daily.filter(
+            SalesSummary.period_date >= this_year_start,
+            SalesSummary.period_date <= today
         ).scalar() or 0
         
-        previous_ytd_sales = db.session.query(
-            func.sum(Transaction.total_amount)
-        ).filter(
-            Transaction.customer_id == customer_id,
-            Transaction.invoice_date >= previous_year_start,
-            Transaction.invoice_date <= same_day_previous_year
+        previous_ytd_sales = customer_daily.filter(
+            SalesSummary.period_date >= previous_year_start,
+            SalesSummary.period_date <= same_day_previous_year
         ).scalar() or 0
         
         # Calculate this month sales
-        this_month_sales = db.session.query(
-            func.sum(Transaction.total_amount)
-        ).filter(
-            Transaction.customer_id == customer_id,
-            Transaction.invoice_date >= this_month_start
+        this_month_sales = customer_daily.filter(
+            SalesSummary.period_date >= this_month_start
         ).scalar() or 0
         
         # Calculate YTD growth
@@ -470,24 +474,32 @@ def get_customer_sales(customer_id):
             ytd_growth = ((this_ytd_sales - previous_ytd_sales) / previous_ytd_sales) * 100
         
         # Group by month for time series (within date range)
-        monthly_sales = db.session.query(
-            func.date_format(Transaction.invoice_date, '%Y-%m-01').label('month'),
-            func.sum(Transaction.total_amount).label('amount'),
-            func.count(func.distinct(Transaction.invoice_id)).label('order_count')
+        daily_sales = summary_query(
+            "day",
+            "customer",
+            SalesSummary.period_date,
+            SalesSummary.amount,
+            SalesSummary.invoice_count
         ).filter(
-            Transaction.customer_id == customer_id,
-            Transaction.invoice_date >= start_date,
-            Transaction.invoice_date <= end_date
-        ).group_by('month').order_by('month').all()
+            SalesSummary.dim_key == customer_id,
+            SalesSummary.period_date >= start_date,
+            SalesSummary.period_date <= end_date
+        ).order_by(SalesSummary.period_date).all()
+        
+        monthly_sales = {}
+        for day, amount, order_count in daily_sales:
+            month = monthly_sales.setdefault(day.replace(day=1), {"amount": 0, "order_count": 0})
+            month["amount"] += float(amount)
+            month["order_count"] += int(order_count)
         
         # Format monthly sales for frontend charts
         sales_by_month = [
             {
-                "month": datetime.strptime(entry[0], "%Y-%m-%d").strftime("%b %Y"),
-                "amount": float(entry[1]),
-                "order_count": int(entry[2])
+                "month": month.strftime("%b %Y"),
+                "amount": entry["amount"],
+                "order_count": entry["order_count"]
             }
-            for entry in monthly_sales
+            for month, entry in monthly_sales.items()
         ]
 
         # Get ALL products purchased by this customer based on date range
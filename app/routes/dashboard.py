@@ -6,8 +6,11 @@ from app.models.product import Product
 from app.models.product_stock import ProductStock
 from app.models.customer import Customer
 from app.models.saved_forecast import SavedForecast
+from app.models.sales_summary import SalesSummary
 from app.utils.security import success_response, error_response
-from app.utils.use_forecast import get_stock_limits
+from app.utils.use_forecast import get_stock_limits_bulk
+from app.utils.sales_summary import summary_query
+from app.utils.date_buckets import month_filter
 from sqlalchemy import func, desc, and_, extract, distinct
 from datetime import datetime, timedelta
 import calendar
@@ -36,25 +39,28 @@ def dashboard_summary():
         
         # ===== Sales Metrics =====
         
-        # Current month sales
-        current_month_sales_query = db.session.query(
-            func.sum(Transaction.total_amount).label('total_amount'),
-            func.count(func.distinct(Transaction.invoice_id)).label('order_count')
+        # Current month sales (daily summary up to today)
+        current_month_sales_query = summary_query(
+            "day",
+            "total",
+            func.sum(SalesSummary.amount).label('total_amount'),
+            func.sum(SalesSummary.invoice_count).label('order_count')
         ).filter(
-            Transaction.invoice_date >= current_month_start,
-            Transaction.invoice_date <= today
+            SalesSummary.period_date >= current_month_start,
+            SalesSummary.period_date <= today
         ).first()
         
         current_month_sales = float(current_month_sales_query.total_amount or 0)
         current_month_orders = int(current_month_sales_query.order_count or 0)
         
-        # Last month sales
-        last_month_sales_query = db.session.query(
-            func.sum(Transaction.total_amount).label('total_amount'),
-            func.count(func.distinct(Transaction.invoice_id)).label('order_count')
+        # Last month sales (monthly summary row)
+        last_month_sales_query = summary_query(
+            "month",
+            "total",
+            func.sum(SalesSummary.amount).label('total_amount'),
+            func.sum(SalesSummary.invoice_count).label('order_count')
         ).filter(
-            Transaction.invoice_date >= last_month_start,
-            Transaction.invoice_date <= last_month_end
+            SalesSummary.period_date == last_month_start
         ).first()
         
         last_month_sales = float(last_month_sales_query.total_amount or 0)
@@ -73,18 +79,18 @@ def dashboard_summary():
         for _ in range(4):  # Go back 5 more months
             six_months_ago = (six_months_ago - timedelta(days=1)).replace(day=1)
         
-        monthly_sales_trend = db.session.query(
-            func.date_format(Transaction.invoice_date, '%Y-%m').label('month'),
-            func.sum(Transaction.total_amount).label('amount')
+        monthly_sales_trend = summary_query(
+            "month",
+            "total",
+            SalesSummary.period_date,
+            SalesSummary.amount
         ).filter(
-            Transaction.invoice_date >= six_months_ago
-        ).group_by('month').order_by('month').all()
+            SalesSummary.period_date >= six_months_ago
+        ).order_by(SalesSummary.period_date).all()
         
         # Format monthly trend for frontend
         sales_trend = []
-        for month_str, amount in monthly_sales_trend:
-            year, month = map(int, month_str.split('-'))
-            month_date = datetime(year, month, 1)
+        for month_date, amount in monthly_sales_trend:
             month_name = month_date.strftime("%b %Y")
             
             sales_trend.append({
@@ -95,8 +101,6 @@ def dashboard_summary():
         # ===== Sales Target =====
         
         # Get target from saved forecasts for current month
-        current_month_str = current_month_start.strftime("%Y-%m")
-        
         # Retrieve all saved forecasts for current month to calculate sales target
         saved_forecasts_query = db.session.query(
             SavedForecast.product_id,
@@ -105,7 +109,7 @@ def dashboard_summary():
         ).join(
             Product, SavedForecast.product_id == Product.product_id
         ).filter(
-            func.date_format(SavedForecast.forecast_date, '%Y-%m') == current_month_str
+            month_filter(SavedForecast.forecast_date, current_month_start)
         ).all()
         
         # Calculate total target amount by summing product of forecast qty * price
@@ -139,11 +143,14 @@ def dashboard_summary():
             ProductStock, Product.product_id == ProductStock.product_id
         ).all()
 
+        # Resolve min_stock for all products in one forecast query
+        stock_limits = get_stock_limits_bulk([product for product, _ in all_stock_query])
+
         # Then filter using the helper function
         low_stock_items = []
         for product, stock in all_stock_query:
             # Get min_stock considering use_forecast setting
-            min_stock, _ = get_stock_limits(product)
+            min_stock, _ = stock_limits[product.product_id]
             
             # Compare current stock to the appropriate min_stock
             if stock.qty <= min_stock:
@@ -161,10 +168,12 @@ def dashboard_summary():
         total_customers = Customer.query.count()
         
         # Active customers (who made transactions this month)
-        active_customers_count = db.session.query(
-            func.count(distinct(Transaction.customer_id))
+        active_customers_count = summary_query(
+            "month",
+            "customer",
+            func.count(distinct(SalesSummary.dim_key))
         ).filter(
-            Transaction.invoice_date >= current_month_start
+            SalesSummary.period_date >= current_month_start
         ).scalar() or 0
         
         # New customers this month
@@ -175,16 +184,20 @@ def dashboard_summary():
         # ===== Top Products =====
         
         # Get top selling products for current month
-        top_products_query = db.session.query(
-            Transaction.product_id,
-            Transaction.product_name,
-            func.sum(Transaction.qty).label('quantity'),
-            func.sum(Transaction.total_amount).label('total_sales')
+        top_products_query = summary_query(
+            "month",
+            "product",
+            SalesSummary.dim_key,
+            Product.product_name,
+            func.sum(SalesSummary.qty).label('quantity'),
+            func.sum(SalesSummary.amount).label('total_sales')
+        ).join(
+            Product, Product.product_id == SalesSummary.dim_key
         ).filter(
-            Transaction.invoice_date >= current_month_start
+            SalesSummary.period_date >= current_month_start
         ).group_by(
-            Transaction.product_id,
-            Transaction.product_name
+            SalesSummary.dim_key,
+            Product.product_name
         ).order_by(
             desc('total_sales')
         ).limit(5).all()
@@ -4,18 +4,37 @@ from flask import Blueprint, current_app, request, make_response
 from flask_jwt_extended import get_jwt_identity, jwt_required
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-from sqlalchemy import and_, extract, func
+from sqlalchemy import and_, extract, func, update
 from ..db import db
 from app.models.transaction import Transaction
 from app.models.product import Product
-from app.models.forecast_parameter import ForecastParameter, TuningJob
+from app.models.forecast_parameter import ForecastParameter, TuningJob, TuningResult
+from app.models.forecast_run import ForecastRun
 from app.utils.security import success_response, error_response
 from datetime import datetime, timezone, timedelta
 from dateutil.relativedelta import relativedelta
 import calendar
 from app.models.saved_forecast import SavedForecast
 from app.models.product_stock import ProductStock
+from app.models.sales_summary import SalesSummary
+from app.utils.sales_summary import summary_query
+from app.utils.date_buckets import month_filter
+from app.utils.forecast_cache import forecast_cache
+from app.utils.single_flight import forecast_flight
+from app.utils.saved_forecasts import upsert_saved_forecasts
+from app.utils.forecast_runs import batch_products_query, start_forecast_run_background
+from app.utils.tuning_queue import requeue_stale_jobs
+from app.utils.forecasting import (
+    fast_forecast_settings,
+    fast_forecasts,
+    forecast_from_model,
+    get_fitted_model,
+    interval_settings,
+    load_product_history,
+    params_fingerprint,
+    prepare_monthly_frame,
+    product_data_version,
+)
 import os
 import tempfile
 
@@ -70,6 +89,9 @@ def delete_parameter(param_id):
         db.session.delete(param)
         db.session.commit()
         
+        # Forecast kategori ini kembali memakai parameter default
+        forecast_cache.invalidate(category=param.category)
+        
         return success_response(
             message="Parameter deleted successfully"
         )
@@ -103,13 +125,34 @@ def parameter_tuning():
         if invalid_params:
             return error_response(f"Parameters with no values: {', '.join(invalid_params)}", 400)
         
-        # Check if there's already a running job for this category
-        existing_job = TuningJob.query.filter_by(
-            category=category, 
-            status="running"
+        # Mode pencarian: "grid" (default, semua kombinasi), "random" atau "halving"
+        search = data.get("search") or {}
+        if isinstance(search, str):
+            search = {"mode": search}
+        search_mode = search.get("mode", "grid")
+        if search_mode not in ("grid", "random", "halving"):
+            return error_response("Search mode must be one of: grid, random, halving", 400)
+        if search_mode == "random" and not search.get("n_candidates"):
+            return error_response("n_candidates is required for random search", 400)
+        for option in ("n_candidates", "min_cutoffs", "eta"):
+            if option in search and (not isinstance(search[option], int) or search[option] < 1):
+                return error_response(f"Search option '{option}' must be a positive integer", 400)
+        
+        # Job dari worker yang mati (lease habis) kembali ke antrean
+        requeue_stale_jobs(current_app.config.get("TUNING_MAX_ATTEMPTS", 3))
+        
+        # Check if there's already a queued or running job for this category
+        existing_job = TuningJob.query.filter(
+            TuningJob.category == category,
+            TuningJob.status.in_(["pending", "running"])
         ).first()
         
         if existing_job:
+            if existing_job.status == "pending" and current_app.config.get("TUNING_EMBEDDED_WORKER", True):
+                # Job yang di-requeue belum diambil siapa pun: jalankan di API
+                from app.utils.tasks import start_parameter_tuning_background
+                start_parameter_tuning_background(existing_job.id)
+
             return error_response(
                 f"A tuning job is already running for category '{category}'. "
                 f"Job ID: {existing_job.id}, Started: {existing_job.created_at}",
@@ -126,16 +169,18 @@ def parameter_tuning():
         # Store the parameters configuration
         job.set_parameters({
             "selected_parameters": selected_parameters,
-            "parameters": parameters
+            "parameters": parameters,
+            "search": dict(search, mode=search_mode)
         })
         
         # Save to get an ID
         db.session.add(job)
         db.session.commit()
         
-        # Start the background task
-        from app.utils.tasks import start_parameter_tuning_background
-        start_parameter_tuning_background(job.id)
+        # Job diambil worker tuning (worker.py); tanpa worker terpisah, API menjalankannya sendiri
+        if current_app.config.get("TUNING_EMBEDDED_WORKER", True):
+            from app.utils.tasks import start_parameter_tuning_background
+            start_parameter_tuning_background(job.id)
         
         return success_response(
             data={
@@ -192,9 +237,13 @@ def get_tuning_job(job_id):
         
         if not job:
             return error_response(f"Job {job_id} not found", 404)
+        
+        data = job.to_dict()
+        # Jumlah kombinasi yang sudah tersimpan (checkpoint untuk resume)
+        data["checkpointed_results"] = TuningResult.query.filter_by(job_id=job_id).count()
             
         return success_response(
-            data=job.to_dict(),
+            data=data,
             message="Job retrieved successfully"
         )
         
@@ -203,6 +252,192 @@ def get_tuning_job(job_id):
         return error_response(f"Error retrieving tuning job: {str(e)}", 500)
 
 
+@forecast_bp.route("/tuning_jobs/<int:job_id>/cancel", methods=["POST"])
+@jwt_required()
+def cancel_tuning_job(job_id):
+    """Batalkan tuning job pending/running; worker berhenti di heartbeat berikutnya"""
+    try:
+        # Conditional update: tidak menimpa job yang baru saja selesai
+        cancelled = db.session.execute(
+            update(TuningJob)
+            .where(TuningJob.id == job_id, TuningJob.status.in_(["pending", "running"]))
+            .values(status="cancelled", error="Cancelled by user", worker_id=None, lease_expires_at=None)
+        ).rowcount
+        db.session.commit()
+        
+        job = db.session.get(TuningJob, job_id, populate_existing=True)
+        if not job:
+            return error_response(f"Job {job_id} not found", 404)
+        if not cancelled:
+            return error_response(f"Job {job_id} is {job.status} and cannot be cancelled", 409)
+        
+        return success_response(
+            data=job.to_dict(),
+            message="Tuning job cancelled. Finished combinations are kept and the job can be resumed."
+        )
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error cancelling tuning job: {str(e)}")
+        return error_response(f"Error cancelling tuning job: {str(e)}", 500)
+
+
+@forecast_bp.route("/tuning_jobs/<int:job_id>/resume", methods=["POST"])
+@jwt_required()
+def resume_tuning_job(job_id):
+    """Antrekan ulang tuning job cancelled/failed; kombinasi yang sudah selesai dilewati"""
+    try:
+        job = db.session.get(TuningJob, job_id)
+        if not job:
+            return error_response(f"Job {job_id} not found", 404)
+        
+        if job.status not in ("cancelled", "failed"):
+            return error_response(f"Job {job_id} is {job.status} and cannot be resumed", 409)
+        
+        # Satu job aktif per kategori
+        existing_job = TuningJob.query.filter(
+            TuningJob.category == job.category,
+            TuningJob.status.in_(["pending", "running"])
+        ).first()
+        if existing_job:
+            return error_response(
+                f"A tuning job is already running for category '{job.category}'. Job ID: {existing_job.id}",
+                409  # Conflict
+            )
+        
+        job.status = "pending"
+        job.error = None
+        job.attempts = 0
+        db.session.commit()
+        
+        if current_app.config.get("TUNING_EMBEDDED_WORKER", True):
+            from app.utils.tasks import start_parameter_tuning_background
+            start_parameter_tuning_background(job.id)
+        
+        return success_response(
+            data=job.to_dict(),
+            message="Tuning job has been queued again"
+        )
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error resuming tuning job: {str(e)}")
+        return error_response(f"Error resuming tuning job: {str(e)}", 500)
+
+
+@forecast_bp.route("/batch", methods=["POST"])
+@jwt_required()
+def start_forecast_batch():
+    """Forecast seluruh produk satu kategori dan/atau semua produk use_forecast di background"""
+    try:
+        data = request.get_json() or {}
+        
+        category = data.get("category") or None
+        use_forecast_only = bool(data.get("use_forecast", False))
+        periods = int(data.get("periods", 6))
+        
+        if periods not in [3, 6]:
+            return error_response("Periods must be either 3 or 6 months", 400)
+        
+        if not category and not use_forecast_only:
+            return error_response("Provide a category and/or use_forecast=true", 400)
+        
+        # Satu batch aktif per cakupan produk
+        existing_run = ForecastRun.query.filter(
+            ForecastRun.category == category if category else ForecastRun.category.is_(None),
+            ForecastRun.use_forecast_only == use_forecast_only,
+            ForecastRun.status.in_(["pending", "running"])
+        ).first()
+        
+        if existing_run:
+            return error_response(
+                f"A forecast batch is already running for this selection. Run ID: {existing_run.id}",
+                409  # Conflict
+            )
+        
+        total_products = batch_products_query(category, use_forecast_only).count()
+        if not total_products:
+            return error_response("No products found for this selection", 404)
+        
+        run = ForecastRun(
+            category=category,
+            use_forecast_only=use_forecast_only,
+            periods=periods,
+            status="pending",
+            progress=0,
+            total_products=total_products,
+            created_by=str(get_jwt_identity())
+        )
+        
+        # Save to get an ID
+        db.session.add(run)
+        db.session.commit()
+        
+        # Start the background task
+        start_forecast_run_background(run.id)
+        
+        return success_response(
+            data={
+                "run_id": run.id,
+                "status": run.status,
+                "total_products": total_products
+            },
+            message="Forecast batch has been queued. You can check the status using the run ID."
+        )
+    
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error starting forecast batch: {str(e)}")
+        return error_response(f"Error starting forecast batch: {str(e)}", 500)
+
+
+@forecast_bp.route("/batch", methods=["GET"])
+@jwt_required()
+def get_forecast_batches():
+    """Daftar forecast batch (terbaru dulu), opsional filter status/category"""
+    try:
+        query = ForecastRun.query
+        
+        status = request.args.get("status")
+        if status:
+            query = query.filter_by(status=status)
+        
+        category = request.args.get("category")
+        if category:
+            query = query.filter_by(category=category)
+        
+        runs = query.order_by(ForecastRun.created_at.desc()).all()
+        
+        return success_response(
+            data=[run.to_dict() for run in runs],
+            message="Forecast batches retrieved successfully"
+        )
+    
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving forecast batches: {str(e)}")
+        return error_response(f"Error retrieving forecast batches: {str(e)}", 500)
+
+
+@forecast_bp.route("/batch/<int:run_id>", methods=["GET"])
+@jwt_required()
+def get_forecast_batch(run_id):
+    """Status satu forecast batch: progress dan throughput (produk per detik)"""
+    try:
+        run = db.session.get(ForecastRun, run_id)
+        
+        if not run:
+            return error_response(f"Forecast batch {run_id} not found", 404)
+        
+        return success_response(
+            data=run.to_dict(),
+            message="Forecast batch retrieved successfully"
+        )
+    
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving forecast batch: {str(e)}")
+        return error_response(f"Error retrieving forecast batch: {str(e)}", 500)
+
+
 # @forecast_bp.route("/sales_forecast", methods=["GET"])
 # @jwt_required()
 # def sales_forecast():
@@ -410,6 +645,12 @@ def sales_forecast():
         
         if not product_id:
             return error_response("Product ID is required", 400)
+        
+        # Mode interval: interaktif bisa pakai "reduced"/"residual", job malam "full"
+        try:
+            interval, interval_samples = interval_settings(request.args.get('interval'))
+        except ValueError as e:
+            return error_response(str(e), 400)
             
         # Check if product exists and get its category
         product = Product.query.filter_by(product_id=product_id).first()
@@ -418,179 +659,63 @@ def sales_forecast():
         
         category = product.category
         
-        # Get historical sales data for the product
-        query = db.session.query(
-            Transaction.invoice_date.label("ds"), 
-            func.sum(Transaction.qty).label("y")
-        ).filter(
-            Transaction.product_id == product_id
-        ).group_by(
-            Transaction.invoice_date
-        ).order_by(
-            Transaction.invoice_date
-        )
-        
-        transactions = query.all()
-        
-        if not transactions:
-            return error_response("No historical sales data available for this product", 404)
-            
-        # Convert to DataFrame
-        df = pd.DataFrame(transactions, columns=["ds", "y"])
-        df["ds"] = pd.to_datetime(df["ds"])
-        df["y"] = df["y"].astype(float)
-        
-        # Prepare monthly data with proper frequency
-        freq = "MS"  # Monthly start frequency
-        df_monthly = df.groupby(pd.Grouper(key='ds', freq=freq))['y'].sum().reset_index()
-        
-        # Ensure the date range is complete with all months
-        all_dates = pd.date_range(start=df_monthly['ds'].min(), end=df_monthly['ds'].max(), freq=freq)
-        df_complete = pd.DataFrame({'ds': all_dates})
-        df_monthly = pd.merge(df_complete, df_monthly, on='ds', how='left').fillna(0)
-        
-        # Add month dummies as additional regressors for better monthly seasonality handling
-        df_monthly['month'] = df_monthly['ds'].dt.month
-        for m_val in range(1, 13):
-            df_monthly[f'is_{m_val:02d}'] = (df_monthly['month'] == m_val).astype(int)
-        df_monthly = df_monthly.drop(columns=['month'])
-        
-        # ===== NEW CODE - APPLY LOG TRANSFORMATION =====
-        # Same as parameter tuning
-        df_monthly['y_orig'] = df_monthly['y'].copy()  # Save original values
-        df_monthly['y'] = np.log1p(df_monthly['y'])  # log(1 + y) to avoid log(0)
-        # ==============================================
-        
         # Check if we have saved parameters for this category
-        params = None
+        prophet_params = None
         if category:
             params = ForecastParameter.query.filter_by(category=category).first()
-        
-        # Set up Prophet model
-        if params:
-            # Use saved parameters
-            prophet_params = params.get_parameters()
-            model = Prophet(yearly_seasonality=True, weekly_seasonality=False, daily_seasonality=False, **prophet_params)
-            current_app.logger.info(f"Using custom parameters for category '{category}': {prophet_params}")
-        else:
-            # Use default parameters
-            model = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=True,
-                daily_seasonality=False,
-                seasonality_mode='multiplicative',
-                changepoint_prior_scale=0.05,
-                seasonality_prior_scale=1,
-                holidays_prior_scale= 10,
-                changepoint_range= 0.8,
-            )
-            # model = Prophet(
-            #     yearly_seasonality=True,
-            #     weekly_seasonality=False,
-            #     daily_seasonality=False,
-            #     seasonality_mode='additive',
-            #     changepoint_prior_scale=0.7,
-            #     seasonality_prior_scale=5,
-            #     holidays_prior_scale= 10,
-            #     changepoint_range= 0.9,
-            # )
-            current_app.logger.info(f"Using default parameters for product '{product_id}'")
-            
-        # Add Indonesia country holidays
-        model.add_country_holidays(country_name='ID')
-        
-        # Add monthly dummy regressors
-        for m_val in range(1, 13):
-            model.add_regressor(f'is_{m_val:02d}')
-        
-        # Fit the model
-        model.fit(df_monthly)
-        
-        # Create future dataframe for forecasting
-        future = model.make_future_dataframe(periods=periods, freq='MS')
-        
-        # Add month dummies to future dataframe
-        future['month'] = future['ds'].dt.month
-        for m_val in range(1, 13):
-            future[f'is_{m_val:02d}'] = (future['month'] == m_val).astype(int)
-        future = future.drop(columns=['month'])
-        
-        # Generate forecast
-        forecast = model.predict(future)
-        
-        # ===== NEW CODE - TRANSFORM PREDICTIONS BACK FROM LOG SPACE =====
-        # Same as parameter tuning
-        forecast['yhat'] = np.expm1(forecast['yhat'])
-        forecast['yhat_lower'] = np.expm1(forecast['yhat_lower'])
-        forecast['yhat_upper'] = np.expm1(forecast['yhat_upper'])
-
-        print(f"Forecast: {forecast}")
-        # ==============================================
-        
-        # ===== NEW CODE - CALCULATE MAPE USING PARAMETER TUNING METHOD =====
-        mape = None
-        if len(df_monthly) > 0:
-            # Get actual values (transform back from log)
-            actual_values = np.expm1(df_monthly['y'].values)
-            
-            # Get predicted values for same dates
-            historical_dates = df_monthly['ds'].values
-            historical_predictions = forecast[forecast['ds'].isin(historical_dates)]['yhat'].values
+            if params:
+                prophet_params = params.get_parameters()
+        
+        # Hasil yang sama (produk, periode, parameter, data transaksi) diambil dari cache
+        data_version = product_data_version(product_id)
+        cache_key = forecast_cache.make_key(
+            product_id,
+            periods,
+            params_fingerprint(prophet_params),
+            data_version,
+            interval
+        )
+        cached = forecast_cache.get(cache_key)
+        if cached is not None:
+            return success_response(data=cached, message="Forecast generated successfully")
+        
+        def compute_forecast():
+            # Seri pendek / intermittent: forecaster statistik jika cukup akurat
+            fast_settings = fast_forecast_settings()
+            if fast_settings:
+                rows = load_product_history(product_id)
+                if not rows:
+                    return None
+                
+                result = fast_forecasts([prepare_monthly_frame(rows)], periods, *fast_settings)[0]
+                if result is not None:
+                    current_app.logger.info(f"Using {result['model']} forecaster for product '{product_id}'")
+                    forecast_cache.set(cache_key, result, category=category)
+                    return result
             
-            # Make sure arrays are the same length
-            min_len = min(len(actual_values), len(historical_predictions))
-            actual_values = actual_values[:min_len]
-            historical_predictions = historical_predictions[:min_len]
+            if prophet_params:
+                current_app.logger.info(f"Using custom parameters for category '{category}': {prophet_params}")
+            else:
+                current_app.logger.info(f"Using default parameters for product '{product_id}'")
             
-            # print count of actual_values and historical_predictions
-            current_app.logger.info(f"Count of actual_values: {actual_values}, historical_predictions: {historical_predictions}")
-
-            # Calculate MAPE with same method as parameter tuning
-            df_cv = pd.DataFrame({
-                'y': actual_values,
-                'yhat': historical_predictions
-            })
+            # Model tersimpan dipakai ulang selama belum ada data penjualan baru
+            model = get_fitted_model(product_id, prophet_params, data_version)
+            if model is None:
+                return None
             
-            df_cv['ape'] = np.where(
-                df_cv['y'] > 0,  # Only where y > 0
-                np.abs((df_cv['y'] - df_cv['yhat']) / df_cv['y']),
-                np.nan  # Mark as NaN where y = 0
-            )
-            mape = np.nanmean(df_cv['ape']) * 100  # Convert to percentage
-        # ==============================================
-        
-        # Format the forecast results
-        # Include 2 months of historical data for continuity in the chart
-        last_historical_date = df_monthly['ds'].max()
-        
-        # Get the 2 most recent historical months
-        historical_data = forecast[forecast['ds'] <= last_historical_date].tail(2)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
-        historical_data['is_historical'] = True
-        
-        # Get future forecast periods
-        future_data = forecast[forecast['ds'] > last_historical_date][['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
-        future_data['is_historical'] = False
-        
-        # Combine historical and forecast data
-        forecast_data = pd.concat([historical_data, future_data]).to_dict('records')
-        
-        # Ensure we only return the historical plus requested number of periods
-        forecast_data = forecast_data[:periods + 2]
-        
-        # Convert dates to string format
-        for item in forecast_data:
-            item['ds'] = item['ds'].strftime('%Y-%m-%d')
-            # Round values to integers since we're forecasting quantities
-            item['yhat'] = max(0, round(float(item['yhat']), 2))
-            item['yhat_lower'] = max(0, round(float(item['yhat_lower']), 2))  # Ensure non-negative
-            item['yhat_upper'] = max(0, round(float(item['yhat_upper']), 2))
+            result = forecast_from_model(model, periods, interval, interval_samples)
+            forecast_cache.set(cache_key, result, category=category)
+            return result
+        
+        # Request identik yang bersamaan di worker ini menunggu satu perhitungan yang sama
+        result, coalesced = forecast_flight.do(cache_key, compute_forecast)
+        if coalesced:
+            current_app.logger.info(f"Coalesced forecast request for product '{product_id}'")
+        if result is None:
+            return error_response("No historical sales data available for this product", 404)
         
         return success_response(
-            data={
-                'forecast': forecast_data,
-                'mape': mape,
-                'periods': periods
-            },
+            data=result,
             message="Forecast generated successfully"
         )
             
@@ -1083,71 +1208,12 @@ def save_forecast():
         if not product:
             return error_response(f"Product with ID {product_id} not found", 404)
         
-        # Deduplicate forecast items by date - if there are multiple items for the same date, use the last one
-        processed_dates = {}
-        for forecast_item in forecast_data:
-            forecast_date = forecast_item.get('ds')
-            if not forecast_date:
-                continue
-                
-            # Convert to datetime if it's a string
-            if isinstance(forecast_date, str):
-                forecast_date = datetime.strptime(forecast_date, '%Y-%m-%d').date()
-                
-            # Save item in processed_dates dictionary, overwriting any previous entry for this date
-            processed_dates[forecast_date] = forecast_item
-        
-        # Now process each unique date
-        saved_count = 0
-        updated_count = 0
-        
-        for forecast_date, forecast_item in processed_dates.items():
-            # Check if forecast for this month already exists
-            existing_forecast = SavedForecast.query.filter_by(
-                product_id=product_id,
-                forecast_date=forecast_date
-            ).first()
-            
-            # Extract values based on keys that might be present
-            if forecast_item.get('is_historical') == True:
-                # Historical data from model
-                forecast_values = {
-                    'yhat': forecast_item.get('yhat'),
-                    'yhat_lower': forecast_item.get('yhat_lower'),
-                    'yhat_upper': forecast_item.get('yhat_upper')
-                }
-            else:
-                # Future forecast data
-                forecast_values = {
-                    'yhat': forecast_item.get('forecast') or forecast_item.get('yhat'),
-                    'yhat_lower': forecast_item.get('lower') or forecast_item.get('yhat_lower'),
-                    'yhat_upper': forecast_item.get('upper') or forecast_item.get('yhat_upper')
-                }
-            
-            # Skip if we don't have valid forecast values
-            if not forecast_values['yhat']:
-                continue
-            
-            # Log for debugging - this can be removed later
-            current_app.logger.info(f"Processing forecast for {product_id} on {forecast_date}: {'update' if existing_forecast else 'new'}")
-                
-            if existing_forecast:
-                # Update existing forecast
-                existing_forecast.set_forecast_data(forecast_values)
-                existing_forecast.mape = mape
-                existing_forecast.updated_at = datetime.now(timezone.utc)
-                updated_count += 1
-            else:
-                # Create new forecast
-                new_forecast = SavedForecast(
-                    product_id=product_id,
-                    forecast_date=forecast_date,
-                    forecast_data=json.dumps(forecast_values),
-                    mape=mape,
-                    created_by=current_user
-                )
-                db.session.add(new_forecast)
-                saved_count += 1
+        saved_count, updated_count, unique_dates = upsert_saved_forecasts(
+            product_id,
+            forecast_data,
+            mape=mape,
+            created_by=current_user
+        )
         
         db.session.commit()
         
@@ -1155,7 +1221,7 @@ def save_forecast():
             data={
                 'saved': saved_count,
                 'updated': updated_count,
-                'unique_dates': list(processed_dates.keys())
+                'unique_dates': unique_dates
             },
             message=f"Forecast saved successfully: {saved_count} new entries, {updated_count} updates"
         )
@@ -1247,7 +1313,7 @@ def get_goals_data():
             ProductStock, ProductStock.product_id == Product.product_id,  # Join with ProductStock
             isouter=True  # Use left outer join in case some products don't have stock entries
         ).filter(
-            func.date_format(SavedForecast.forecast_date, '%Y-%m') == month_str
+            month_filter(SavedForecast.forecast_date, start_date)
         ).all()
         
         # If no saved forecasts found for this month, return empty result
@@ -1293,15 +1359,15 @@ def get_goals_data():
         # Step 2: Get actual sales for these products in the specified month
         product_ids = [p["product_id"] for p in products_with_forecasts]
         
-        actual_sales_query = db.session.query(
-            Transaction.product_id,
-            func.sum(Transaction.qty).label('actual_qty'),
-            func.sum(Transaction.total_amount).label('actual_amount')
+        actual_sales_query = summary_query(
+            "month",
+            "product",
+            SalesSummary.dim_key,
+            SalesSummary.qty,
+            SalesSummary.amount
         ).filter(
-            Transaction.product_id.in_(product_ids),
-            Transaction.invoice_date.between(start_date, end_date)
-        ).group_by(
-            Transaction.product_id
+            SalesSummary.dim_key.in_(product_ids),
+            SalesSummary.period_date == start_date
         ).all()
         
         # Create a lookup dictionary for actual sales
@@ -1386,29 +1452,36 @@ def get_goals_data():
         # Step 4: Get historical data for trend analysis (last 6 months)
         historical_data = {}
         
+        # Get 6 months of historical data including current month
+        historical_start = start_date - relativedelta(months=5)
+        
+        # Monthly sales for all products in one summary query
+        monthly_sales_query = summary_query(
+            "month",
+            "product",
+            SalesSummary.dim_key,
+            SalesSummary.period_date,
+            SalesSummary.qty
+        ).filter(
+            SalesSummary.dim_key.in_(product_ids),
+            SalesSummary.period_date >= historical_start,
+            SalesSummary.period_date <= end_date
+        ).all()
+        
+        # Convert query results to dict by product and month
+        monthly_sales_by_product = {}
+        for product_id, month_date, qty in monthly_sales_query:
+            monthly_sales_by_product.setdefault(product_id, {})[month_date.strftime("%Y-%m")] = (
+                int(qty) if qty is not None else 0
+            )
+        
         for product in products_with_forecasts:
             product_id = product["product_id"]
-            # Get 6 months of historical data including current month
-            historical_start = start_date - relativedelta(months=5)
-            
-            monthly_sales_query = db.session.query(
-                func.date_format(Transaction.invoice_date, '%Y-%m').label('month'),
-                func.sum(Transaction.qty).label('qty')
-            ).filter(
-                Transaction.product_id == product_id,
-                Transaction.invoice_date >= historical_start,
-                Transaction.invoice_date <= end_date
-            ).group_by('month').order_by('month').all()
-            
-            # Convert query results to dict by month
-            product_monthly_sales = {
-                month: int(qty) if qty is not None else 0
-                for month, qty in monthly_sales_query
-            }
+            product_monthly_sales = monthly_sales_by_product.get(product_id, {})
             
             # Get historical forecasts for this product if available
             historical_forecasts_query = db.session.query(
-                func.date_format(SavedForecast.forecast_date, '%Y-%m').label('month'),
+                SavedForecast.forecast_date,
                 SavedForecast.forecast_data
             ).filter(
                 SavedForecast.product_id == product_id,
@@ -1418,9 +1491,9 @@ def get_goals_data():
             
             # Convert forecast query results to dict by month
             product_monthly_forecasts = {}
-            for month, forecast_data in historical_forecasts_query:
+            for forecast_date, forecast_data in historical_forecasts_query:
                 forecast_values = json.loads(forecast_data)
-                product_monthly_forecasts[month] = round(float(forecast_values.get('yhat', 0)))
+                product_monthly_forecasts[forecast_date.strftime("%Y-%m")] = round(float(forecast_values.get('yhat', 0)))
             
             # Build month-by-month trend data
             trend_data = []
@@ -5,6 +5,8 @@ from app.utils.security import success_response, error_response
 from app.models.transaction import Transaction
 from app.models.product import Product
 from app.models.saved_forecast import SavedForecast
+from app.models.sales_summary import SalesSummary
+from app.utils.sales_summary import summary_query
 from sqlalchemy import func, and_, extract
 from datetime import datetime, timedelta
 import pandas as pd
@@ -79,18 +81,22 @@ def get_goals_data():
             if not forecasts:
                 continue
             
-            # Get actual sales for this product by month
-            sales_query = db.session.query(
-                func.date_format(Transaction.invoice_date, '%Y-%m-01').label('month'),
-                func.sum(Transaction.qty).label('quantity')
+            # Get actual daily sales for this product from the sales summary
+            sales_query = summary_query(
+                "day",
+                "product",
+                SalesSummary.period_date,
+                SalesSummary.qty
             ).filter(
-                Transaction.product_id == product.product_id,
-                Transaction.invoice_date >= start_datetime,
-                Transaction.invoice_date <= end_datetime
-            ).group_by('month').all()
+                SalesSummary.dim_key == product.product_id,
+                SalesSummary.period_date >= start_datetime,
+                SalesSummary.period_date <= end_datetime
+            ).all()
             
-            # Convert to dict for easy lookup
-            actual_sales = {row.month: float(row.quantity) for row in sales_query}
+            # Aggregate per month into a dict for easy lookup
+            actual_sales = defaultdict(float)
+            for day, quantity in sales_query:
+                actual_sales[day.strftime("%Y-%m-01")] += float(quantity)
             
             # Process monthly data
             monthly_data = []
@@ -5,13 +5,17 @@ from flask_jwt_extended import jwt_required
 import pandas as pd
 from ..db import db
 from app.utils.security import success_response, error_response
-from app.utils.use_forecast import get_stock_limits
+from app.utils.import_ledger import clear_ledger
+from app.utils.use_forecast import get_stock_limits, get_stock_limits_bulk
 from sqlalchemy import or_, func
 from sqlalchemy.sql import text
 from app.models.product import Product
 from app.models.product_stock import ProductStock
 from app.models.transaction import Transaction
 from app.models.customer import Customer
+from app.models.sales_summary import SalesSummary
+from app.utils.sales_summary import summary_query
+from app.utils.date_buckets import month_bucket
 from datetime import datetime, timedelta
 
 inventory_bp = Blueprint("inventory", __name__)
@@ -53,6 +57,9 @@ def get_inventory():
                 'total_qty': int(total_qty) if total_qty else 0
             }
 
+        # Resolve min/max stock for all products in one forecast query
+        stock_limits = get_stock_limits_bulk([product for product, _ in results])
+
         # Manual conversion to ensure proper dictionary format and include sales data
         inventory_list = []
         for product, stock in results:
@@ -60,7 +67,7 @@ def get_inventory():
             sales = product_sales.get(product.product_id, {'total_amount': 0, 'total_qty': 0})
             normal_min_stock = float(product.min_stock) if product.min_stock else 0
             normal_max_stock = float(product.max_stock) if product.max_stock else 0
-            min_stock, max_stock = get_stock_limits(product)
+            min_stock, max_stock = stock_limits[product.product_id]
 
             item = {
                 # From Product model
@@ -242,7 +249,7 @@ def get_product_sales(product_id):
             
         # Get monthly sales data (within date range)
         monthly_sales = db.session.query(
-            func.date_format(Transaction.invoice_date, '%Y-%m-01').label('month'),
+            month_bucket(Transaction.invoice_date).label('month'),
             func.sum(Transaction.total_amount).label('amount'),
             func.count(func.distinct(Transaction.invoice_id)).label('order_count'),
             func.sum(Transaction.qty).label('qty')
@@ -265,7 +272,7 @@ def get_product_sales(product_id):
         
         # Get monthly cost data for profit margin calculations (within date range)
         monthly_cost_query = db.session.query(
-            func.date_format(Transaction.invoice_date, '%Y-%m-01').label('month'),
+            month_bucket(Transaction.invoice_date).label('month'),
             func.sum(Transaction.total_cost).label('amount'),
             func.count(func.distinct(Transaction.invoice_id)).label('order_count'),
             func.sum(Transaction.qty).label('qty')
@@ -538,6 +545,9 @@ def delete_product(product_id):
             
         # Delete product
         db.session.delete(product)
+        # File produk/stok yang pernah diimport harus bisa diimport ulang
+        clear_ledger("products")
+        clear_ledger("product_stock")
         db.session.commit()
         
         return success_response(
@@ -668,15 +678,21 @@ def export_inventory():
         if not results:
             return error_response("No inventory data found", 404)
 
+        # Total terjual per produk dalam satu query (dari agregat bulanan)
+        total_sold = dict(
+            summary_query(
+                "month",
+                "product",
+                SalesSummary.dim_key,
+                func.sum(SalesSummary.qty)
+            ).group_by(SalesSummary.dim_key).all()
+        )
+
         # Siapkan list untuk DataFrame
         export_data = []
         for product, stock in results:
             # Ambil informasi transaksi
-            total_purchases = db.session.query(
-                func.sum(Transaction.qty)
-            ).filter(
-                Transaction.product_id == product.product_id
-            ).scalar() or 0
+            total_purchases = total_sold.get(product.product_id) or 0
             
             # Hitung nilai stok
             stock_value = float(stock.qty) * float(product.standard_price)
@@ -782,21 +798,28 @@ def get_product_history():
         # Get sales history (aggregate by month)
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30 * months)
-        # Query monthly sales
-        sales_history = db.session.query(
-            func.date_format(Transaction.invoice_date, '%Y-%m-01').label('date'),
-            func.sum(Transaction.qty).label('quantity')
+        # Query daily sales from the sales summary
+        sales_history = summary_query(
+            "day",
+            "product",
+            SalesSummary.period_date,
+            SalesSummary.qty
         ).filter(
-            Transaction.product_id == product_id,
-            Transaction.invoice_date >= start_date,
-            Transaction.invoice_date <= end_date
-        ).group_by('date').order_by('date').all()
+            SalesSummary.dim_key == product_id,
+            SalesSummary.period_date >= start_date,
+            SalesSummary.period_date <= end_date
+        ).order_by(SalesSummary.period_date).all()
+        # Aggregate by month (rows are ordered by date)
+        monthly = {}
+        for day, quantity in sales_history:
+            month = day.strftime("%Y-%m-01")
+            monthly[month] = monthly.get(month, 0) + float(quantity)
         # Format results
         results = []
-        for entry in sales_history:
+        for month, quantity in monthly.items():
             results.append({
-                "date": entry.date,
-                "quantity": float(entry.quantity)
+                "date": month,
+                "quantity": quantity
             })
         return success_response(
             data=results,
@@ -904,7 +927,7 @@ def get_product_analysis():
         daily_demand_rate = monthly_demand_rate / 30.44  # Average days per month
         # Calculate seasonal variability
         monthly_sales = db.session.query(
-            func.date_format(Transaction.invoice_date, '%Y-%m-01').label('month'),
+            month_bucket(Transaction.invoice_date).label('month'),
             func.sum(Transaction.qty).label('quantity')
         ).filter(
             Transaction.product_id == product_id,
@@ -0,0 +1,493 @@
+# app/utils/bulk_import.py
+from datetime import datetime, timezone
+import pandas as pd
+from sqlalchemy import update
+from ..db import db
+from app.models.customer import Customer
+from app.models.product import Product
+from app.models.product_stock import ProductStock
+from app.models.transaction import Transaction
+from app.utils.date_buckets import month_start
+
+# Jumlah nilai per klausa IN saat mengambil kunci yang sudah ada
+KEY_FETCH_CHUNK_SIZE = 1000
+
+# Jumlah baris per statement INSERT multi-row
+INSERT_CHUNK_SIZE = 1000
+
+# Pemisah untuk kunci komposit berbentuk string
+KEY_SEPARATOR = "\x1f"
+
+
+class ImportRowError(ValueError):
+    """Error validasi pada baris tertentu di file import (dikembalikan sebagai 400)"""
+
+
+def normalize_keys(series):
+    """
+    Samakan representasi kolom kunci (kode customer, produk, invoice) menjadi string.
+
+    Excel sering membaca kode numerik sebagai float (mis. 1001.0), sedangkan
+    database menyimpannya sebagai string "1001". Nilai kosong menjadi None.
+    """
+    def to_key(value):
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    mask = series.notna()
+    values = series[mask]
+    if pd.api.types.is_float_dtype(values):
+        integral = values % 1 == 0
+        text = values.astype(str).astype(object)
+        text[integral] = values[integral].astype("int64").astype(str)
+    elif pd.api.types.is_integer_dtype(values):
+        text = values.astype(str)
+    else:
+        text = values.map(to_key)
+
+    result = pd.Series(None, index=series.index, dtype=object)
+    result[mask] = text.astype(str).str.strip()
+    result[result == ""] = None
+    return result
+
+
+def find_null_row(df, columns):
+    """Kembalikan index baris pertama yang memiliki nilai kosong pada kolom tertentu"""
+    null_mask = df[columns].isna().any(axis=1)
+    if null_mask.any():
+        return null_mask.idxmax()
+    return None
+
+
+def fetch_existing_keys(column, values):
+    """
+    Ambil nilai kunci yang sudah ada di database dengan beberapa query IN.
+
+    Args:
+        column: Kolom model (mis. Customer.customer_id)
+        values: Iterable nilai yang ingin dicek
+
+    Returns:
+        set: Nilai yang sudah ada di database
+    """
+    values = list({v for v in values if v is not None})
+    existing = set()
+    for start in range(0, len(values), KEY_FETCH_CHUNK_SIZE):
+        chunk = values[start:start + KEY_FETCH_CHUNK_SIZE]
+        rows = db.session.query(column).filter(column.in_(chunk)).distinct().all()
+        existing.update(row[0] for row in rows)
+    return existing
+
+
+def to_records(df, columns):
+    """Konversi DataFrame menjadi list of dict dengan NaN/NaT menjadi None"""
+    frame = df[columns].astype(object)
+    frame = frame.where(pd.notna(frame), None)
+    return frame.to_dict("records")
+
+
+def bulk_insert(model, records):
+    """Masukkan records dengan INSERT multi-row per chunk"""
+    table = model.__table__
+    for start in range(0, len(records), INSERT_CHUNK_SIZE):
+        db.session.execute(table.insert(), records[start:start + INSERT_CHUNK_SIZE])
+    return len(records)
+
+
+def bulk_update(model, mappings):
+    """Update baris berdasarkan primary key; mapping dengan kolom berbeda dikelompokkan oleh ORM"""
+    for start in range(0, len(mappings), INSERT_CHUNK_SIZE):
+        db.session.execute(update(model), mappings[start:start + INSERT_CHUNK_SIZE])
+    return len(mappings)
+
+
+def _sequence_keys(series):
+    """Ubah order_sequence menjadi string kunci ("" untuk nilai kosong)"""
+    numeric = pd.to_numeric(series, errors="coerce").astype("Int64")
+    return numeric.astype(str).where(numeric.notna(), "")
+
+
+class TransactionImporter:
+    """
+    Engine import transaksi berbasis himpunan.
+
+    Kunci yang sudah ada (invoice, customer, product) diambil dengan beberapa
+    query IN per chunk, pengecekan duplikat dan foreign key dilakukan secara
+    vektor pada DataFrame, lalu baris baru ditulis dengan INSERT multi-row.
+    Satu instance dapat memproses beberapa chunk dari file yang sama.
+    """
+
+    COLUMNS = [
+        "invoice_id",
+        "invoice_date",
+        "customer_id",
+        "agent_name",
+        "product_id",
+        "product_name",
+        "qty",
+        "unit",
+        "total_amount",
+        "order_sequence",
+        "price_after_discount",
+        "shipping_cost",
+        "shipping_cost_per_item",
+        "invoice_note",
+        "category",
+        "discount_percentage",
+        "price_before_discount",
+        "brand",
+        "cost_price",
+        "total_cost",
+    ]
+
+    def __init__(self):
+        self.stats = {
+            "total_rows": 0,
+            "inserted": 0,
+            "duplicates": 0,
+            "missing_customer": 0,
+            "missing_product": 0,
+        }
+        # Invoice yang dimasukkan oleh import ini (bisa terpecah di beberapa chunk)
+        self.imported_invoices = set()
+        # Index baris pada chunk terakhir yang ditolak karena foreign key tidak ada
+        self.last_rejected = pd.Index([])
+        # Bulan yang menerima transaksi baru (untuk memperbarui sales_summary)
+        self.imported_months = set()
+        # Produk yang menerima transaksi baru (untuk invalidasi cache forecast)
+        self.imported_products = set()
+
+    def process(self, df):
+        """
+        Proses satu DataFrame yang kolomnya sudah di-rename sesuai model.
+
+        Returns:
+            DataFrame: Baris yang benar-benar dimasukkan ke database
+        """
+        df = df.copy()
+        self.stats["total_rows"] += len(df)
+
+        for col in ("invoice_id", "customer_id", "product_id"):
+            df[col] = normalize_keys(df[col])
+
+        null_index = find_null_row(df, ["invoice_id", "customer_id", "product_id"])
+        if null_index is not None:
+            raise ImportRowError(
+                f"Row {null_index + 1}: Invoice id, customer id, and product id cannot be null"
+            )
+
+        df["invoice_date"] = pd.to_datetime(df["invoice_date"], errors="coerce").dt.date
+        null_index = find_null_row(df, ["invoice_date"])
+        if null_index is not None:
+            raise ImportRowError(f"Row {null_index + 1}: Invalid invoice date")
+
+        # Kunci komposit invoice + product + urutan untuk deteksi duplikat
+        line_keys = (
+            df["invoice_id"] + KEY_SEPARATOR + df["product_id"]
+            + KEY_SEPARATOR + _sequence_keys(df["order_sequence"])
+        )
+
+        # Invoice yang sudah ada sebelum import ini dilewati seluruhnya
+        invoice_ids = set(df["invoice_id"].unique())
+        existing_invoices = fetch_existing_keys(Transaction.invoice_id, invoice_ids)
+        preexisting = existing_invoices - self.imported_invoices
+        duplicate_mask = df["invoice_id"].isin(preexisting)
+
+        # Invoice yang terpecah lintas chunk: cek baris yang sudah dimasukkan
+        continued = existing_invoices & self.imported_invoices
+        if continued:
+            existing_lines = self._fetch_line_keys(continued)
+            duplicate_mask |= line_keys.isin(existing_lines)
+
+        # Duplikat di dalam file yang sama (simpan kemunculan pertama)
+        duplicate_mask |= line_keys.duplicated()
+        self.stats["duplicates"] += int(duplicate_mask.sum())
+        df = df[~duplicate_mask]
+
+        # Cek foreign key customer dan product
+        customers = fetch_existing_keys(Customer.customer_id, df["customer_id"].unique())
+        missing_customer = ~df["customer_id"].isin(customers)
+        self.stats["missing_customer"] += int(missing_customer.sum())
+        rejected = df.index[missing_customer]
+        df = df[~missing_customer]
+
+        products = fetch_existing_keys(Product.product_id, df["product_id"].unique())
+        missing_product = ~df["product_id"].isin(products)
+        self.stats["missing_product"] += int(missing_product.sum())
+        self.last_rejected = rejected.append(df.index[missing_product])
+        df = df[~missing_product]
+
+        self.stats["inserted"] += bulk_insert(Transaction, to_records(df, self.COLUMNS))
+        self.imported_invoices.update(df["invoice_id"].unique())
+        self.imported_months.update(month_start(d) for d in df["invoice_date"].unique())
+        self.imported_products.update(df["product_id"].unique())
+        return df
+
+    def _fetch_line_keys(self, invoice_ids):
+        """Ambil kunci invoice + product + urutan untuk invoice tertentu"""
+        invoice_ids = list(invoice_ids)
+        keys = set()
+        for start in range(0, len(invoice_ids), KEY_FETCH_CHUNK_SIZE):
+            chunk = invoice_ids[start:start + KEY_FETCH_CHUNK_SIZE]
+            rows = db.session.query(
+                Transaction.invoice_id,
+                Transaction.product_id,
+                Transaction.order_sequence,
+            ).filter(Transaction.invoice_id.in_(chunk)).all()
+            keys.update(
+                KEY_SEPARATOR.join(
+                    [invoice_id, product_id, "" if sequence is None else str(sequence)]
+                )
+                for invoice_id, product_id, sequence in rows
+            )
+        return keys
+
+
+class CustomerImporter:
+    """
+    Engine import customer (DaftarLangganan) berbasis kolom.
+
+    Semua customer_code/customer_id yang sudah ada diambil dengan satu query,
+    pembersihan NaN dan validasi dilakukan untuk seluruh DataFrame sekaligus,
+    dan customer baru dimasukkan per batch. Dengan ``update_existing=True``,
+    customer yang sudah ada hanya di-update pada kolom yang nilainya berubah.
+    """
+
+    COLUMNS = [
+        "extra",
+        "price_type",
+        "customer_code",
+        "business_name",
+        "npwp",
+        "nik",
+        "customer_id",
+        "city",
+        "address_1",
+        "address_2",
+        "address_3",
+        "address_4",
+        "address_5",
+        "owner_name",
+        "owner_address_1",
+        "owner_address_2",
+        "owner_address_3",
+        "owner_address_4",
+        "owner_address_5",
+        "religion",
+        "additional_address",
+        "additional_address_1",
+        "additional_address_2",
+        "additional_address_3",
+        "additional_address_4",
+        "additional_address_5",
+    ]
+
+    # Kolom kunci tidak pernah di-update karena dipakai sebagai relasi transaksi
+    KEY_COLUMNS = ["customer_code", "customer_id"]
+
+    def __init__(self, update_existing=False):
+        self.update_existing = update_existing
+        self.stats = {
+            "total_rows": 0,
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "duplicates": 0,
+            "conflicts": 0,
+        }
+        # Satu query untuk seluruh kunci customer yang sudah ada
+        rows = db.session.query(Customer.customer_code, Customer.customer_id).all()
+        self.known_codes = {code for code, _ in rows}
+        self.known_ids = {customer_id for _, customer_id in rows}
+        self.seen_codes = set()
+
+    def process(self, df):
+        """Proses satu DataFrame yang kolomnya sudah di-rename sesuai model"""
+        df = df[self.COLUMNS].copy()
+        self.stats["total_rows"] += len(df)
+
+        # Semua kolom customer bertipe string: seragamkan sekaligus
+        for col in self.COLUMNS:
+            df[col] = normalize_keys(df[col])
+
+        null_index = find_null_row(df, ["customer_code", "business_name"])
+        if null_index is not None:
+            raise ImportRowError(
+                f"Row {null_index + 1}: Customer code and business name cannot be null"
+            )
+
+        # Duplikat customer_code di dalam file (termasuk chunk sebelumnya)
+        duplicate_mask = df["customer_code"].duplicated() | df["customer_code"].isin(self.seen_codes)
+        self.stats["duplicates"] += int(duplicate_mask.sum())
+        df = df[~duplicate_mask]
+        self.seen_codes.update(df["customer_code"])
+
+        existing_mask = df["customer_code"].isin(self.known_codes)
+        existing = df[existing_mask]
+        new = df[~existing_mask]
+
+        if self.update_existing:
+            self._update_changed(existing)
+        else:
+            self.stats["duplicates"] += len(existing)
+
+        # customer_id baru yang sudah dipakai customer lain tidak bisa dimasukkan
+        conflict_mask = (
+            new["customer_id"].isna()
+            | new["customer_id"].isin(self.known_ids)
+            | new["customer_id"].duplicated()
+        )
+        self.stats["conflicts"] += int(conflict_mask.sum())
+        new = new[~conflict_mask]
+
+        self.stats["inserted"] += bulk_insert(Customer, to_records(new, self.COLUMNS))
+        self.known_codes.update(new["customer_code"])
+        self.known_ids.update(new["customer_id"])
+
+    def _update_changed(self, df):
+        """Update hanya kolom yang berbeda dari data di database"""
+        if df.empty:
+            return
+
+        value_columns = [col for col in self.COLUMNS if col not in self.KEY_COLUMNS]
+        codes = list(df["customer_code"])
+        rows = []
+        for start in range(0, len(codes), KEY_FETCH_CHUNK_SIZE):
+            chunk = codes[start:start + KEY_FETCH_CHUNK_SIZE]
+            rows.extend(
+                db.session.query(
+                    Customer.id,
+                    Customer.customer_code,
+                    *[getattr(Customer, col) for col in value_columns],
+                ).filter(Customer.customer_code.in_(chunk)).all()
+            )
+        current = pd.DataFrame(rows, columns=["id", "customer_code"] + value_columns)
+        current = current.set_index("customer_code")
+        incoming = df.set_index("customer_code")[value_columns]
+        current = current.loc[incoming.index]
+
+        # Bandingkan per kolom: nilai berubah jika tidak sama dan tidak sama-sama kosong
+        old_values = current[value_columns].astype(object)
+        changed = incoming.ne(old_values) & ~(incoming.isna() & old_values.isna())
+        changed_rows = changed.any(axis=1)
+        self.stats["unchanged"] += int((~changed_rows).sum())
+
+        incoming = incoming.where(pd.notna(incoming), None)
+        mappings = []
+        for code in changed.index[changed_rows]:
+            columns = changed.columns[changed.loc[code]]
+            mapping = {"id": int(current.at[code, "id"])}
+            mapping.update({col: incoming.at[code, col] for col in columns})
+            mappings.append(mapping)
+
+        self.stats["updated"] += bulk_update(Customer, mappings)
+
+
+class ProductStockImporter:
+    """
+    Engine import saldo stok (saldostock) berbasis himpunan.
+
+    Tanggal laporan diekstrak dari kolom ``judul`` sekaligus untuk satu window,
+    stok yang sudah ada diambil ke DataFrame berkunci product_id, lalu insert,
+    update (tanggal lebih baru) dan skip ditentukan secara vektor. Hasilnya
+    sama dengan memproses baris satu per satu sesuai urutan file.
+    """
+
+    COLUMNS = ["product_id", "report_date", "location", "qty", "unit", "price"]
+
+    def __init__(self):
+        self.stats = {
+            "total_rows": 0,
+            "inserted": 0,
+            "updated": 0,
+            "skipped": 0,
+            "missing_product": 0,
+        }
+
+    def process(self, df):
+        """Proses satu DataFrame yang kolomnya sudah di-rename sesuai model"""
+        df = df.copy()
+        self.stats["total_rows"] += len(df)
+
+        df["product_id"] = normalize_keys(df["product_id"])
+        qty = pd.to_numeric(df["qty"], errors="coerce")
+        invalid = df["product_id"].isna() | qty.isna() | (qty == 0)
+        if invalid.any():
+            raise ImportRowError(
+                f"Row {invalid.idxmax() + 1}: Product ID and quantity cannot be null"
+            )
+
+        # Ekstrak tanggal "dd-mm-yyyy" dari kolom judul untuk seluruh window
+        text = df["report_date"].astype(str).str.extract(r"(\d{2}-\d{2}-\d{4})")[0]
+        df["report_date"] = pd.to_datetime(text, format="%d-%m-%Y", errors="coerce")
+
+        # Stok untuk produk yang tidak ada di master produk dilewati
+        products = fetch_existing_keys(Product.product_id, df["product_id"].unique())
+        missing_product = ~df["product_id"].isin(products)
+        self.stats["skipped"] += int(missing_product.sum())
+        self.stats["missing_product"] += int(missing_product.sum())
+        df = df[~missing_product]
+        if df.empty:
+            return
+
+        current = self._fetch_current(df["product_id"].unique())
+        is_existing = df["product_id"].isin(current.index)
+
+        # Baris pertama produk yang belum punya stok menjadi record baru
+        new_mask = ~is_existing & ~df["product_id"].duplicated()
+        null_index = find_null_row(df[new_mask], ["report_date"])
+        if null_index is not None:
+            raise ImportRowError(f"Row {null_index + 1}: Invalid report date")
+
+        # Tanggal terbaru sebelum baris ini (stok di database atau baris sebelumnya)
+        floor = pd.Timestamp.min
+        running_max = (
+            df["report_date"].fillna(floor)
+            .groupby(df["product_id"]).cummax()
+            .groupby(df["product_id"]).shift()
+            .fillna(floor)
+        )
+        existing_date = pd.Series(
+            current["report_date"].reindex(df["product_id"]).to_numpy(), index=df.index
+        )
+        # Stok lama tanpa tanggal tidak pernah di-update
+        existing_date = existing_date.where(~is_existing | existing_date.notna(), pd.Timestamp.max)
+        existing_date = existing_date.fillna(floor)
+        threshold = running_max.where(running_max >= existing_date, existing_date)
+
+        updated_mask = ~new_mask & df["report_date"].notna() & (df["report_date"] > threshold)
+        self.stats["inserted"] += int(new_mask.sum())
+        self.stats["updated"] += int(updated_mask.sum())
+        self.stats["skipped"] += int((~new_mask & ~updated_mask).sum())
+
+        # Nilai akhir per produk = baris terakhir yang menang dalam urutan file
+        final = df[new_mask | updated_mask].drop_duplicates("product_id", keep="last").copy()
+        final["report_date"] = final["report_date"].dt.date
+        final_existing = final["product_id"].isin(current.index)
+
+        bulk_insert(ProductStock, to_records(final[~final_existing], self.COLUMNS))
+
+        updates = final[final_existing].copy()
+        updates["id"] = current["id"].reindex(updates["product_id"]).to_numpy()
+        updates["updated_at"] = datetime.now(timezone.utc)
+        bulk_update(
+            ProductStock,
+            to_records(updates, ["id", "report_date", "location", "qty", "unit", "price", "updated_at"]),
+        )
+
+    def _fetch_current(self, product_ids):
+        """Ambil stok yang sudah ada sebagai DataFrame berkunci product_id"""
+        product_ids = list(product_ids)
+        rows = []
+        for start in range(0, len(product_ids), KEY_FETCH_CHUNK_SIZE):
+            chunk = product_ids[start:start + KEY_FETCH_CHUNK_SIZE]
+            rows.extend(
+                db.session.query(
+                    ProductStock.id, ProductStock.product_id, ProductStock.report_date
+                ).filter(ProductStock.product_id.in_(chunk)).order_by(ProductStock.id).all()
+            )
+        current = pd.DataFrame(rows, columns=["id", "product_id", "report_date"])
+        current["report_date"] = pd.to_datetime(current["report_date"])
+        # Satu record stok per produk (sama seperti .first())
+        return current.drop_duplicates("product_id").set_index("product_id")
@@ -0,0 +1,68 @@
+# app/utils/date_buckets.py
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import String, and_, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def month_start(value):
+    """Tanggal 1 dari bulan tanggal yang diberikan"""
+    return date(value.year, value.month, 1)
+
+
+def month_range(value, months=1):
+    """
+    Rentang setengah terbuka [start, end) untuk bulan tanggal yang diberikan.
+
+    Args:
+        value: Tanggal (hari apa pun dalam bulan awal)
+        months: Jumlah bulan yang dicakup (default 1)
+
+    Returns:
+        tuple: (start, end) dengan end = tanggal 1 bulan setelah rentang
+    """
+    start = month_start(value)
+    return start, start + relativedelta(months=months)
+
+
+def month_filter(column, value, months=1):
+    """
+    Predicate ``column >= start AND column < end`` untuk satu (atau beberapa) bulan.
+
+    Kolom tidak dibungkus fungsi sehingga index pada kolom tanggal tetap
+    terpakai, berbeda dengan ``date_format(column, '%Y-%m') = ...``.
+    """
+    start, end = month_range(value, months)
+    return and_(column >= start, column < end)
+
+
+class month_bucket(FunctionElement):
+    """
+    Kunci bulan 'YYYY-MM-01' (string) dari kolom tanggal, untuk SELECT/GROUP BY.
+
+    Dikompilasi sesuai dialect: DATE_FORMAT di MySQL, strftime di SQLite.
+    Untuk filter gunakan ``month_filter``, bukan ekspresi ini.
+    """
+
+    type = String()
+    name = "month_bucket"
+    inherit_cache = True
+
+
+@compiles(month_bucket)
+def _month_bucket_default(element, compiler, **kw):
+    column = list(element.clauses)[0]
+    return compiler.process(func.date_format(column, "%Y-%m-01"), **kw)
+
+
+@compiles(month_bucket, "sqlite")
+def _month_bucket_sqlite(element, compiler, **kw):
+    column = list(element.clauses)[0]
+    return compiler.process(func.strftime("%Y-%m-01", column), **kw)
+
+
+@compiles(month_bucket, "postgresql")
+def _month_bucket_postgresql(element, compiler, **kw):
+    column = list(element.clauses)[0]
+    return compiler.process(func.to_char(func.date_trunc("month", column), "YYYY-MM-DD"), **kw)
@@ -0,0 +1,78 @@
+# app/utils/db_indexes.py
+from sqlalchemy import inspect, text
+from ..db import db
+
+
+def create_missing_indexes(bind=None, tables=None):
+    """
+    Buat index yang dideklarasikan di model tetapi belum ada di database.
+
+    ``db.create_all()`` hanya membuat index untuk tabel baru, sehingga tabel
+    yang sudah ada perlu perintah ini. Aman dijalankan berulang kali.
+
+    Args:
+        bind: Engine/connection (default: engine aplikasi)
+        tables: List tabel yang diproses (default: semua tabel model)
+
+    Returns:
+        list: Nama index yang baru dibuat
+    """
+    bind = bind or db.engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    created = []
+    for table in tables or db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            index.create(bind=bind)
+            created.append(index.name)
+    return created
+
+
+def create_missing_columns(bind=None, tables=None):
+    """
+    Tambahkan kolom model yang belum ada pada tabel yang sudah ada (ALTER TABLE ADD COLUMN).
+
+    Hanya untuk kolom nullable atau yang punya server_default; aman dijalankan
+    berulang kali.
+
+    Args:
+        bind: Engine/connection (default: engine aplikasi)
+        tables: List tabel yang diproses (default: semua tabel model)
+
+    Returns:
+        list: "tabel.kolom" yang baru ditambahkan
+    """
+    bind = bind or db.engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    preparer = bind.dialect.identifier_preparer
+
+    added = []
+    for table in tables or db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise ValueError(f"Column {table.name}.{column.name} needs a server_default to be added")
+
+            ddl = (
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                f"{preparer.format_column(column)} {column.type.compile(dialect=bind.dialect)}"
+            )
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            ddl += " NULL" if column.nullable else " NOT NULL"
+
+            with bind.begin() as connection:
+                connection.execute(text(ddl))
+            added.append(f"{table.name}.{column.name}")
+    return added
@@ -0,0 +1,328 @@
+# app/utils/fast_forecast.py
+"""
+Forecaster statistik ringan (NumPy) untuk seri pendek atau intermittent.
+
+Semua model berjalan tervektorisasi untuk banyak seri sekaligus. Seri
+disusun rata kanan (bulan terakhir di kolom terakhir) dengan NaN di depan,
+sehingga panjang histori boleh berbeda antar seri.
+
+Model (urut dari yang paling murah):
+    - seasonal_naive: nilai bulan yang sama tahun lalu (naive jika < 12 bulan)
+    - croston: Croston/SBA untuk permintaan intermittent
+    - ets: Holt-Winters aditif dengan tren teredam (tanpa musiman jika < 24 bulan)
+"""
+import numpy as np
+import pandas as pd
+
+SEASON = 12
+
+# Interval 80%, sama dengan interval_width default Prophet
+Z_INTERVAL = 1.2816
+
+# Average demand interval di atas batas ini dianggap intermittent (Syntetos-Boylan)
+INTERMITTENT_ADI = 1.32
+
+# Bulan terakhir yang ditahan untuk memilih model
+HOLDOUT_MONTHS = 3
+
+CROSTON_ALPHA = 0.1
+
+# Grid (alpha, beta, gamma) Holt-Winters; dipilih per seri dari SSE in-sample
+ETS_GRID = [
+    (alpha, beta, 0.1)
+    for alpha in (0.1, 0.3, 0.5, 0.8)
+    for beta in (0.0, 0.1)
+]
+ETS_PHI = 0.9
+
+MODEL_ORDER = ("seasonal_naive", "croston", "ets")
+
+
+def stack_series(series_list):
+    """
+    Susun list array penjualan bulanan menjadi matriks rata kanan.
+
+    Returns:
+        tuple: (Y (n, T) dengan NaN di depan, start index per seri)
+    """
+    lengths = np.array([len(values) for values in series_list], dtype=int)
+    T = int(lengths.max()) if len(lengths) else 0
+    Y = np.full((len(series_list), T), np.nan)
+    for i, values in enumerate(series_list):
+        if lengths[i]:
+            Y[i, T - lengths[i]:] = values
+    return Y, T - lengths
+
+
+def is_intermittent(values):
+    """True jika rata-rata jarak antar bulan dengan penjualan > INTERMITTENT_ADI"""
+    nonzero = np.count_nonzero(np.asarray(values) > 0)
+    return nonzero == 0 or len(values) / nonzero > INTERMITTENT_ADI
+
+
+def is_fast_candidate(values, max_months):
+    """Seri pendek (< max_months) atau intermittent diarahkan ke forecaster cepat"""
+    return len(values) < max_months or is_intermittent(values)
+
+
+def _horizon_bounds(yhat, residuals, horizon):
+    # Interval dari sebaran residual one-step, melebar dengan akar horizon
+    valid = ~np.isnan(residuals)
+    count = valid.sum(axis=1)
+    centered = np.where(valid, residuals - np.nansum(residuals, axis=1, keepdims=True) / np.maximum(count, 1)[:, None], 0.0)
+    sigma = np.sqrt((centered ** 2).sum(axis=1) / np.maximum(count, 1))
+    steps = np.sqrt(np.arange(1, horizon + 1))
+    spread = Z_INTERVAL * sigma[:, None] * steps[None, :]
+    return yhat - spread, yhat + spread, Z_INTERVAL * sigma
+
+
+def seasonal_naive(Y, start, horizon):
+    """
+    Seasonal naive: y[t] = y[t - 12], atau y[t - 1] jika histori < 12 bulan.
+
+    Returns:
+        tuple: (fitted (n, T), forecast (n, horizon))
+    """
+    n, T = Y.shape
+    lengths = T - start
+    seasonal = lengths >= SEASON
+
+    fitted = np.full((n, T), np.nan)
+    if T > 1:
+        fitted[:, 1:] = Y[:, :-1]
+    if T > SEASON:
+        # Tahun pertama seri (lag 12 masih NaN) tetap memakai naive
+        lagged = Y[:, :-SEASON]
+        use_lag = seasonal[:, None] & ~np.isnan(lagged)
+        fitted[:, SEASON:] = np.where(use_lag, lagged, fitted[:, SEASON:])
+
+    steps = np.arange(horizon)
+    if T >= SEASON:
+        season_cols = T - SEASON + steps % SEASON
+        seasonal_forecast = Y[:, season_cols]
+    else:
+        seasonal_forecast = np.zeros((n, horizon))
+    last = Y[:, -1:] if T else np.zeros((n, 1))
+    forecast = np.where(seasonal[:, None], seasonal_forecast, np.repeat(last, horizon, axis=1))
+    return fitted, forecast
+
+
+def croston(Y, start, horizon, alpha=CROSTON_ALPHA):
+    """
+    Croston dengan koreksi bias SBA: (1 - alpha/2) * ukuran / interval permintaan.
+
+    Returns:
+        tuple: (fitted (n, T), forecast (n, horizon))
+    """
+    n, T = Y.shape
+    size = np.full(n, np.nan)  # Rata-rata ukuran permintaan
+    interval = np.full(n, np.nan)  # Rata-rata jarak antar permintaan
+    since = np.ones(n)  # Bulan sejak permintaan terakhir
+    factor = 1 - alpha / 2
+
+    fitted = np.full((n, T), np.nan)
+    for t in range(T):
+        active = t >= start
+        fitted[:, t] = np.where(active, factor * size / interval, np.nan)
+
+        y = Y[:, t]
+        demand = active & (y > 0)
+        first = demand & np.isnan(size)
+        update = demand & ~first
+
+        size = np.where(first, y, np.where(update, size + alpha * (y - size), size))
+        interval = np.where(first, since, np.where(update, interval + alpha * (since - interval), interval))
+        since = np.where(demand, 1, np.where(active, since + 1, since))
+
+    level = np.nan_to_num(factor * size / interval)
+    return fitted, np.repeat(level[:, None], horizon, axis=1)
+
+
+def _ets_init(Y, start, seasonal):
+    n, T = Y.shape
+    rows = np.arange(n)
+    first_year = np.clip(start[:, None] + np.arange(SEASON), 0, T - 1)
+    second_year = np.clip(first_year + SEASON, 0, T - 1)
+
+    mean_1 = np.nanmean(Y[rows[:, None], first_year], axis=1)
+    mean_2 = np.nanmean(Y[rows[:, None], second_year], axis=1)
+
+    level = np.where(seasonal, mean_1, Y[rows, np.minimum(start, T - 1)])
+    trend = np.where(seasonal, (mean_2 - mean_1) / SEASON, 0.0)
+    season = np.where(seasonal[:, None], Y[rows[:, None], first_year] - mean_1[:, None], 0.0)
+    return level, trend, season
+
+
+def ets(Y, start, horizon, grid=ETS_GRID, phi=ETS_PHI):
+    """
+    Holt-Winters aditif dengan tren teredam; musiman hanya untuk seri >= 24 bulan.
+
+    Setiap kombinasi grid dijalankan sekaligus dan yang dipakai per seri
+    adalah kombinasi dengan SSE one-step terkecil.
+
+    Returns:
+        tuple: (fitted (n, T), forecast (n, horizon))
+    """
+    n, T = Y.shape
+    rows = np.arange(n)
+    seasonal = (T - start) >= 2 * SEASON
+    params = np.array(grid, dtype=float)
+    alpha, beta, gamma = (params[:, i][:, None] for i in range(3))
+    gamma = np.where(seasonal[None, :], gamma, 0.0)
+
+    level, trend, season = _ets_init(Y, start, seasonal)
+    # Dimensi pertama: kombinasi grid
+    level = np.repeat(level[None, :], len(grid), axis=0)
+    trend = np.repeat(trend[None, :], len(grid), axis=0)
+    season = np.repeat(season[None, :, :], len(grid), axis=0)
+
+    fitted = np.full((len(grid), n, T), np.nan)
+    for t in range(T):
+        update = t > start
+        idx = (t - start) % SEASON
+        s = season[:, rows, idx]
+        f = level + phi * trend + s
+        fitted[:, :, t] = np.where(update, f, np.nan)
+
+        y = Y[:, t]
+        err = np.where(update, y - f, 0.0)
+        new_level = level + phi * trend + alpha * err
+        trend = np.where(update, phi * trend + alpha * beta * err, trend)
+        season[:, rows, idx] = np.where(update, s + gamma * err, s)
+        level = np.where(update, new_level, level)
+
+    sse = np.nansum((Y[None, :, :] - fitted) ** 2, axis=2)
+    best = np.argmin(sse, axis=0)
+
+    steps = np.arange(1, horizon + 1)
+    damped = np.cumsum(phi ** steps)
+    future_idx = (T - 1 + steps[None, :] - start[:, None]) % SEASON
+    level, trend, season = level[best, rows], trend[best, rows], season[best, rows]
+    forecast = level[:, None] + damped[None, :] * trend[:, None] + season[rows[:, None], future_idx]
+    return fitted[best, rows], forecast
+
+
+FORECASTERS = {
+    "seasonal_naive": seasonal_naive,
+    "croston": croston,
+    "ets": ets,
+}
+
+
+def _holdout_error(Y, start, name, cumulative=None):
+    """
+    Error holdout (%) pada HOLDOUT_MONTHS bulan terakhir: sum |error| / sum |aktual|.
+
+    Untuk seri ``cumulative`` (intermittent) yang dibandingkan adalah total
+    permintaan selama holdout, karena waktu tiap permintaan tidak bisa ditebak.
+    """
+    n, T = Y.shape
+    h = HOLDOUT_MONTHS
+    error = np.full(n, np.inf)
+    # Minimal 3 bulan data latih di luar holdout
+    valid = (T - start) >= h + 3
+    if not valid.any() or T <= h:
+        return error
+
+    train, actual = Y[valid, :-h], Y[valid, -h:]
+    _, predicted = FORECASTERS[name](train, start[valid], h)
+    predicted = np.maximum(predicted, 0)
+
+    # Holdout tanpa penjualan: skala pakai rata-rata bulanan data latih
+    denominator = np.abs(actual).sum(axis=1)
+    denominator = np.where(denominator > 0, denominator, h * np.nanmean(train, axis=1))
+    absolute_error = np.abs(predicted - actual).sum(axis=1)
+    if cumulative is not None:
+        total_error = np.abs(predicted.sum(axis=1) - actual.sum(axis=1))
+        absolute_error = np.where(cumulative[valid], total_error, absolute_error)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = absolute_error / denominator * 100
+    error[valid] = np.where(np.isfinite(scores), scores, np.inf)
+    return error
+
+
+def select_models(series_list, max_error):
+    """
+    Pilih model termurah per seri yang error holdout-nya <= max_error (%).
+
+    Croston hanya dicoba untuk seri intermittent, dan error seri intermittent
+    dihitung dari total permintaan selama holdout. Seri yang terlalu pendek
+    untuk holdout memakai croston (intermittent) atau ets; seri tanpa
+    penjualan sama sekali memakai croston (forecast 0).
+
+    Returns:
+        tuple: (list nama model atau None jika tidak ada yang memenuhi, array error holdout)
+    """
+    Y, start = stack_series(series_list)
+    intermittent = np.array([is_intermittent(values) for values in series_list])
+    too_short = (Y.shape[1] - start) < HOLDOUT_MONTHS + 3
+
+    chosen = [None] * len(series_list)
+    chosen_error = np.full(len(series_list), np.nan)
+    for name in MODEL_ORDER:
+        error = _holdout_error(Y, start, name, cumulative=intermittent)
+        if name == "croston":
+            error = np.where(intermittent, error, np.inf)
+        for i in np.flatnonzero(error <= max_error):
+            if chosen[i] is None:
+                chosen[i] = name
+                chosen_error[i] = error[i]
+
+    for i in np.flatnonzero(too_short):
+        chosen[i] = "croston" if intermittent[i] else "ets"
+    for i, values in enumerate(series_list):
+        if not np.any(np.asarray(values) > 0):
+            chosen[i] = "croston"
+    return chosen, chosen_error
+
+
+def forecast_series(series_list, models, horizon):
+    """
+    Fit + forecast setiap seri dengan model yang sudah dipilih (dikelompokkan per model).
+
+    Returns:
+        list: dict per seri {"fitted", "yhat", "yhat_lower", "yhat_upper",
+        "fitted_lower", "fitted_upper"} dalam skala asli, atau None jika model None
+    """
+    results = [None] * len(series_list)
+    for name in MODEL_ORDER:
+        members = [i for i, model in enumerate(models) if model == name]
+        if not members:
+            continue
+
+        Y, start = stack_series([series_list[i] for i in members])
+        fitted, yhat = FORECASTERS[name](Y, start, horizon)
+        lower, upper, fitted_spread = _horizon_bounds(yhat, Y - fitted, horizon)
+
+        for row, i in enumerate(members):
+            length = len(series_list[i])
+            series_fitted = fitted[row, Y.shape[1] - length:]
+            # Bulan pertama tidak punya prediksi one-step: pakai nilai aktual
+            series_fitted = np.where(np.isnan(series_fitted), series_list[i], series_fitted)
+            results[i] = {
+                "fitted": series_fitted,
+                "fitted_lower": series_fitted - fitted_spread[row],
+                "fitted_upper": series_fitted + fitted_spread[row],
+                "yhat": yhat[row],
+                "yhat_lower": lower[row],
+                "yhat_upper": upper[row],
+            }
+    return results
+
+
+def forecast_frame(df_monthly, result, periods):
+    """
+    DataFrame forecast (histori + ``periods`` bulan) dengan kolom seperti hasil predict_model.
+
+    Args:
+        df_monthly: DataFrame hasil prepare_monthly_frame
+        result: Satu item hasil forecast_series
+        periods: Jumlah bulan ke depan
+    """
+    future_dates = pd.date_range(df_monthly["ds"].max(), periods=periods + 1, freq="MS")[1:]
+    return pd.DataFrame({
+        "ds": list(df_monthly["ds"]) + list(future_dates),
+        "yhat": np.concatenate([result["fitted"], result["yhat"][:periods]]),
+        "yhat_lower": np.concatenate([result["fitted_lower"], result["yhat_lower"][:periods]]),
+        "yhat_upper": np.concatenate([result["fitted_upper"], result["yhat_upper"][:periods]]),
+    })
@@ -0,0 +1,179 @@
+# app/utils/file_reader.py
+import pandas as pd
+
+# Jumlah baris per window yang diproses sekaligus
+DEFAULT_CHUNK_ROWS = 5000
+
+
+class MissingColumnsError(ValueError):
+    """Header file tidak memiliki semua kolom yang diperlukan"""
+
+    def __init__(self, missing_columns):
+        self.missing_columns = missing_columns
+        super().__init__(f"Missing required columns: {', '.join(missing_columns)}")
+
+
+class ChunkedFileReader:
+    """
+    Membaca file upload (xlsx, xls, csv) per window baris dengan memori terbatas.
+
+    Header divalidasi saat reader dibuat, sehingga file dengan kolom yang salah
+    langsung ditolak sebelum baris data dibaca. Reader dapat diiterasi lebih
+    dari sekali (mis. pass hash lalu pass import). Setiap window dikembalikan
+    sebagai DataFrame yang hanya berisi kolom yang diperlukan, sudah di-rename
+    sesuai mapping, dengan index yang melanjutkan nomor baris data sebelumnya.
+
+    Args:
+        file: Path atau file-like object (mis. FileStorage dari Flask)
+        filename: Nama file asli, dipakai untuk menentukan format
+        columns: Mapping kolom file -> kolom model
+        chunk_size: Jumlah baris per window
+    """
+
+    def __init__(self, file, filename, columns, chunk_size=DEFAULT_CHUNK_ROWS):
+        self.file = file
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.extension = filename.rsplit(".", 1)[-1].lower()
+        # Perkiraan jumlah baris data (None jika tidak diketahui, mis. CSV)
+        self.total_rows = None
+
+        if self.extension == "csv":
+            self._open_csv()
+        elif self.extension == "xls":
+            self._open_xls()
+        else:
+            self._open_xlsx()
+
+    def __iter__(self):
+        if self.extension == "csv":
+            return self._csv_windows()
+        if self.extension == "xls":
+            return self._windows(self._xls_rows())
+        return self._windows(self._xlsx_rows())
+
+    def _check_header(self, header):
+        """Hentikan pembacaan jika ada kolom yang hilang"""
+        missing_columns = [col for col in self.columns if col not in header]
+        if missing_columns:
+            raise MissingColumnsError(missing_columns)
+
+    def _frame(self, rows, start):
+        """Bangun DataFrame untuk satu window baris"""
+        df = pd.DataFrame(rows, columns=list(self.columns.values()))
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    def _windows(self, row_iter):
+        """Kelompokkan iterator baris (tuple) menjadi DataFrame per window"""
+        rows = []
+        start = 0
+        for row in row_iter:
+            # Lewati baris yang seluruh kolomnya kosong (sering ada di akhir sheet)
+            if all(value is None or value == "" for value in row):
+                continue
+            rows.append(row)
+            if len(rows) >= self.chunk_size:
+                yield self._frame(rows, start)
+                start += len(rows)
+                rows = []
+        if rows:
+            yield self._frame(rows, start)
+
+    # ----- CSV -----
+
+    def _open_csv(self):
+        self._rewind()
+        header = pd.read_csv(self.file, nrows=0).columns
+        self._check_header(header)
+
+    def _csv_windows(self):
+        self._rewind()
+        reader = pd.read_csv(
+            self.file, usecols=list(self.columns), chunksize=self.chunk_size
+        )
+        for chunk in reader:
+            yield chunk[list(self.columns)].rename(columns=self.columns)
+
+    def _rewind(self):
+        if hasattr(self.file, "seek"):
+            self.file.seek(0)
+
+    # ----- XLSX (openpyxl read_only) -----
+
+    def _load_xlsx(self):
+        from openpyxl import load_workbook
+
+        self._rewind()
+        self._workbook = load_workbook(self.file, read_only=True, data_only=True)
+        return self._workbook
+
+    def _open_xlsx(self):
+        sheet = self._load_xlsx().worksheets[0]
+        header = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ()))
+        self._check_header(header)
+        self._positions = [header.index(col) for col in self.columns]
+        if sheet.max_row:
+            self.total_rows = max(sheet.max_row - 1, 0)
+
+    def _xlsx_rows(self):
+        # Workbook dibuka ulang jika file dibaca lebih dari sekali
+        workbook = self._workbook or self._load_xlsx()
+        sheet = workbook.worksheets[0]
+        try:
+            for row in sheet.iter_rows(min_row=2, values_only=True):
+                yield tuple(
+                    row[pos] if pos < len(row) else None for pos in self._positions
+                )
+        finally:
+            workbook.close()
+            self._workbook = None
+
+    # ----- XLS (xlrd, format lama) -----
+
+    def _load_xls(self):
+        import xlrd
+
+        self._rewind()
+        if hasattr(self.file, "read"):
+            self._book = xlrd.open_workbook(file_contents=self.file.read(), on_demand=True)
+        else:
+            self._book = xlrd.open_workbook(self.file, on_demand=True)
+        return self._book
+
+    def _open_xls(self):
+        sheet = self._load_xls().sheet_by_index(0)
+        header = sheet.row_values(0) if sheet.nrows else []
+        self._check_header(header)
+        self._positions = [header.index(col) for col in self.columns]
+        self.total_rows = max(sheet.nrows - 1, 0)
+
+    def _xls_rows(self):
+        import xlrd
+
+        # Workbook dibuka ulang jika file dibaca lebih dari sekali
+        book = self._book or self._load_xls()
+        sheet = book.sheet_by_index(0)
+        try:
+            for index in range(1, sheet.nrows):
+                cells = sheet.row(index)
+                values = []
+                for pos in self._positions:
+                    cell = cells[pos] if pos < len(cells) else None
+                    values.append(self._xls_value(cell, xlrd, book))
+                yield tuple(values)
+        finally:
+            book.release_resources()
+            self._book = None
+
+    def _xls_value(self, cell, xlrd, book):
+        """Konversi sel xlrd seperti yang dilakukan pandas.read_excel"""
+        if cell is None or cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+            return None
+        if cell.ctype == xlrd.XL_CELL_DATE:
+            return xlrd.xldate_as_datetime(cell.value, book.datemode)
+        if cell.ctype == xlrd.XL_CELL_NUMBER and float(cell.value).is_integer():
+            return int(cell.value)
+        if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+            return bool(cell.value)
+        return cell.value
@@ -0,0 +1,108 @@
+# app/utils/forecast_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+
+class ForecastCache:
+    """
+    Cache hasil forecast in-process dengan batas ukuran (LRU) dan TTL.
+
+    Kunci berisi product_id, periods, fingerprint parameter dan high-water mark
+    transaksi produk, sehingga data baru otomatis menghasilkan kunci baru.
+    Invalidasi eksplisit (import, tuning) membuang entri lama lebih awal.
+    Cache berlaku per proses worker; tidak dibagi antar proses.
+
+    Args:
+        max_entries: Jumlah entri maksimum (0 = cache nonaktif)
+        ttl: Umur entri dalam detik (0 = tanpa batas waktu)
+    """
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_entries, ttl):
+        """Atur ulang batas cache (dipanggil dari create_app)"""
+        with self._lock:
+            self.max_entries = max_entries
+            self.ttl = ttl
+            self._evict()
+
+    @staticmethod
+    def make_key(product_id, periods, params_hash, data_version, interval="full"):
+        return (product_id, periods, params_hash, data_version, interval)
+
+    def get(self, key):
+        """Nilai cache atau None jika tidak ada / kedaluwarsa"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def set(self, key, value, category=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = {
+                "value": value,
+                "category": category,
+                "stored_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, product_ids=None, category=None):
+        """
+        Hapus entri untuk produk dan/atau kategori tertentu.
+
+        Returns:
+            int: Jumlah entri yang dihapus
+        """
+        product_ids = set(product_ids or [])
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if key[0] in product_ids or (category is not None and entry["category"] == category)
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _expired(self, entry):
+        return bool(self.ttl) and time.monotonic() - entry["stored_at"] > self.ttl
+
+    def _evict(self):
+        """Buang entri kedaluwarsa lalu entri paling lama tidak dipakai"""
+        for key in [k for k, entry in self._entries.items() if self._expired(entry)]:
+            del self._entries[key]
+        while len(self._entries) > max(self.max_entries, 0):
+            self._entries.popitem(last=False)
+
+
+# Instance bersama untuk seluruh request dan job di proses ini
+forecast_cache = ForecastCache()
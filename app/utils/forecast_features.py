@@ -0,0 +1,92 @@
+# app/utils/forecast_features.py
+"""
+Fitur model forecast: tabel libur nasional dan regressor bulan is_01 .. is_12.
+
+Dipakai bersama oleh forecast satu produk, batch dan tuning. Keduanya
+di-cache per rentang tanggal di proses ini, jadi fit berulang (refit,
+kandidat tuning, produk dengan rentang histori yang sama) tidak lagi
+membangkitkan libur lewat paket ``holidays`` atau membangun kolom bulan
+satu per satu.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+HOLIDAY_COUNTRY = "ID"
+
+# Libur ikut dibuat sekian tahun setelah histori agar predict ke depan tetap kena
+HOLIDAY_YEARS_AHEAD = 5
+
+MONTH_COLUMNS = [f"is_{m_val:02d}" for m_val in range(1, 13)]
+
+
+@lru_cache(maxsize=64)
+def _holiday_table(first_year, last_year):
+    from prophet.make_holidays import make_holidays_df
+
+    # Hanya nama libur yang muncul di tahun histori, sama seperti add_country_holidays
+    seen = make_holidays_df(year_list=list(range(first_year, last_year + 1)), country=HOLIDAY_COUNTRY)
+    table = make_holidays_df(
+        year_list=list(range(first_year, last_year + HOLIDAY_YEARS_AHEAD + 1)),
+        country=HOLIDAY_COUNTRY,
+    )
+    table = table[table["holiday"].isin(seen["holiday"])].reset_index(drop=True)
+    table["ds"] = pd.to_datetime(table["ds"])
+    return table
+
+
+def holiday_frame(dates):
+    """
+    Tabel libur Indonesia (kolom ds, holiday) untuk argumen ``holidays`` Prophet.
+
+    Setara dengan ``add_country_holidays(country_name="ID")``: nama libur
+    diambil dari tahun-tahun ``dates`` (data training), tanggalnya dibuat
+    sampai HOLIDAY_YEARS_AHEAD tahun sesudahnya untuk predict.
+
+    Args:
+        dates: Series/array tanggal data training
+
+    Returns:
+        DataFrame: Salinan tabel cache (Prophet mengubah kolom ds miliknya)
+    """
+    dates = pd.DatetimeIndex(dates)
+    return _holiday_table(int(dates.min().year), int(dates.max().year)).copy()
+
+
+@lru_cache(maxsize=256)
+def _month_matrix(first_month, length):
+    matrix = np.eye(12, dtype=np.int64)[(first_month - 1 + np.arange(length)) % 12]
+    matrix.setflags(write=False)
+    return matrix
+
+
+def month_dummies(dates):
+    """
+    Matriks regressor bulan (n x 12) untuk ``dates``.
+
+    Rentang bulanan yang berurutan (histori lengkap, future dataframe)
+    diambil dari cache per (bulan awal, panjang); selain itu dihitung
+    langsung dalam satu langkah.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if len(dates) == 0:
+        return np.zeros((0, 12), dtype=np.int64)
+
+    month_index = dates.year.to_numpy() * 12 + dates.month.to_numpy() - 1
+    if month_index[-1] - month_index[0] == len(dates) - 1 and np.all(np.diff(month_index) == 1):
+        return _month_matrix(int(dates[0].month), len(dates))
+    return np.eye(12, dtype=np.int64)[month_index % 12]
+
+
+def add_month_dummies(df):
+    """Tambahkan regressor is_01 .. is_12 sesuai bulan kolom ds"""
+    df[MONTH_COLUMNS] = month_dummies(df["ds"])
+    return df
+
+
+def add_month_regressors(model):
+    """Daftarkan is_01 .. is_12 sebagai regressor model Prophet"""
+    for column in MONTH_COLUMNS:
+        model.add_regressor(column)
+    return model
@@ -0,0 +1,254 @@
+# app/utils/forecast_runs.py
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from flask import current_app
+from ..db import db
+from app.models.forecast_parameter import ForecastParameter
+from app.models.forecast_run import ForecastRun
+from app.models.product import Product
+from app.models.sales_summary import SalesSummary
+from app.utils.forecasting import (
+    fast_forecast_settings,
+    fast_forecasts,
+    prepare_monthly_frame,
+    run_product_forecast,
+)
+from app.utils.sales_summary import summary_query
+from app.utils.saved_forecasts import upsert_saved_forecasts_bulk
+from app.utils.tuning import node_core_budget
+
+logger = logging.getLogger(__name__)
+
+# Simpan progress (dan forecast yang sudah jadi) setiap N produk
+PROGRESS_EVERY = 10
+
+
+def batch_products_query(category=None, use_forecast_only=False):
+    """Filter produk untuk satu batch forecast"""
+    query = Product.query
+    if category:
+        query = query.filter(Product.category == category)
+    if use_forecast_only:
+        query = query.filter(Product.use_forecast == True)  # noqa: E712
+    return query
+
+
+def load_batch_series(category=None, use_forecast_only=False):
+    """
+    Penjualan bulanan seluruh produk batch dalam satu query agregat.
+
+    Returns:
+        dict: product_id -> list (ds, y) urut tanggal
+    """
+    query = summary_query(
+        "month",
+        "product",
+        SalesSummary.dim_key,
+        SalesSummary.period_date,
+        SalesSummary.qty
+    ).join(
+        Product, Product.product_id == SalesSummary.dim_key
+    )
+    if category:
+        query = query.filter(Product.category == category)
+    if use_forecast_only:
+        query = query.filter(Product.use_forecast == True)  # noqa: E712
+
+    series = {}
+    for product_id, period_date, qty in query.order_by(SalesSummary.dim_key, SalesSummary.period_date):
+        series.setdefault(product_id, []).append((period_date, qty))
+    return series
+
+
+def _init_worker():
+    # Log per fit dari cmdstanpy di setiap proses worker tidak berguna di sini
+    logging.getLogger("cmdstanpy").disabled = True
+
+
+def _forecast_worker(product_id, rows, params, periods):
+    """Fit satu produk di proses worker (tanpa akses database)"""
+    try:
+        return product_id, run_product_forecast(rows, params, periods), None
+    except Exception as e:
+        return product_id, None, str(e)
+
+
+def _flush_results(run, stats, pending):
+    """Upsert forecast produk yang sudah jadi ke saved_forecast dengan satu query lookup"""
+    if not pending:
+        return
+    counts = upsert_saved_forecasts_bulk(pending, created_by=run.created_by)
+    for saved, updated, _ in counts.values():
+        stats["saved"] += saved
+        stats["updated"] += updated
+    pending.clear()
+
+
+def _save_progress(run, stats, pending=None):
+    _flush_results(run, stats, pending)
+    run.set_result(stats)
+    if run.total_products:
+        run.progress = int(run.processed_products * 100 / run.total_products)
+    db.session.commit()
+
+
+def _store_result(run, pending, product_id, result):
+    """Antrekan bulan forecast satu produk untuk upsert berikutnya dan catat di run"""
+    future_items = [item for item in result["forecast"] if not item["is_historical"]]
+    # MAPE NaN (tidak ada bulan dengan penjualan > 0) disimpan sebagai NULL
+    mape = result["mape"]
+    mape = float(mape) if mape is not None and not math.isnan(mape) else None
+    pending.append((product_id, future_items, mape))
+    run.processed_products += 1
+    run.succeeded += 1
+
+
+def run_forecast_batch(run):
+    """
+    Forecast seluruh produk sebuah ForecastRun dan simpan ke saved_forecast.
+
+    Semua seri diambil dengan satu query. Seri pendek / intermittent
+    di-forecast sekaligus dengan forecaster statistik, sisanya di-fit di
+    process pool yang memegang slot dari budget core node (sama dengan job
+    tuning, dibatasi FORECAST_BATCH_WORKERS jika diisi). Hasil disimpan oleh proses utama
+    (hanya bulan forecast, bukan bulan historis) setiap PROGRESS_EVERY produk,
+    sekaligus dalam satu upsert bulk.
+
+    Returns:
+        dict: Statistik batch
+    """
+    products = batch_products_query(run.category, run.use_forecast_only).with_entities(
+        Product.product_id, Product.category
+    ).all()
+    series = load_batch_series(run.category, run.use_forecast_only)
+
+    categories = {category for _, category in products if category}
+    parameters = {}
+    if categories:
+        parameters = {
+            param.category: param.get_parameters()
+            for param in ForecastParameter.query.filter(ForecastParameter.category.in_(categories))
+        }
+
+    stats = {"saved": 0, "updated": 0, "no_history": 0, "errors": {}}
+    pending = []
+    run.total_products = len(products)
+    run.processed_products = 0
+    _save_progress(run, stats)
+
+    jobs = []
+    for product_id, category in products:
+        if product_id in series:
+            jobs.append((product_id, series[product_id], parameters.get(category)))
+        else:
+            # Produk tanpa penjualan tidak bisa di-forecast
+            stats["no_history"] += 1
+            run.processed_products += 1
+
+    # Seri pendek / intermittent di-forecast sekaligus di proses utama; sisanya ke Prophet
+    stats["fast_models"] = {}
+    fast_settings = fast_forecast_settings()
+    if fast_settings and jobs:
+        frames = [prepare_monthly_frame(rows) for _, rows, _ in jobs]
+        prophet_jobs = []
+        for job, result in zip(jobs, fast_forecasts(frames, run.periods, *fast_settings)):
+            if result is None:
+                prophet_jobs.append(job)
+                continue
+            _store_result(run, pending, job[0], result)
+            stats["fast_models"][result["model"]] = stats["fast_models"].get(result["model"], 0) + 1
+        jobs = prophet_jobs
+        _save_progress(run, stats, pending)
+
+    workers = 0
+    if jobs:
+        # Pool batch berbagi slot core dengan job tuning agar node tidak oversubscribed
+        budget = node_core_budget(current_app.config)
+        workers = budget.acquire(min(len(jobs), current_app.config.get("FORECAST_BATCH_WORKERS") or len(jobs)))
+        # spawn: aman dipakai dari thread background (fork + thread bisa deadlock)
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_forecast_worker, product_id, rows, params, run.periods)
+                    for product_id, rows, params in jobs
+                ]
+
+                for done, future in enumerate(as_completed(futures), start=1):
+                    product_id, result, error = future.result()
+
+                    if error:
+                        run.processed_products += 1
+                        run.failed += 1
+                        stats["errors"][product_id] = error
+                    else:
+                        _store_result(run, pending, product_id, result)
+
+                    if done % PROGRESS_EVERY == 0:
+                        _save_progress(run, stats, pending)
+        finally:
+            budget.release()
+
+    _flush_results(run, stats, pending)
+    stats["workers"] = workers
+    return stats
+
+
+def run_forecast_run_task(run_id, app=None):
+    """Background task untuk satu ForecastRun (``app`` default: create_app() baru)"""
+    # Use app context for database operations
+    if app is None:
+        from app import create_app
+        app = create_app()
+
+    with app.app_context():
+        run = db.session.get(ForecastRun, run_id)
+        if not run:
+            logger.error(f"Forecast run {run_id} not found")
+            return
+
+        try:
+            run.status = "running"
+            run.progress = 0
+            run.started_at = datetime.now(timezone.utc)
+            db.session.commit()
+
+            logger.info(f"Starting forecast run {run_id} (category: {run.category}, use_forecast only: {run.use_forecast_only})")
+            start = time.perf_counter()
+
+            stats = run_forecast_batch(run)
+            stats["elapsed_seconds"] = round(time.perf_counter() - start, 2)
+
+            run.status = "completed"
+            run.progress = 100
+            run.finished_at = datetime.now(timezone.utc)
+            run.set_result(stats)
+            db.session.commit()
+
+            logger.info(f"Completed forecast run {run_id}: {run.succeeded} succeeded, {run.failed} failed")
+
+        except Exception as e:
+            logger.error(f"Forecast run {run_id} failed: {str(e)}")
+            db.session.rollback()
+
+            # Update run status to failed
+            run = db.session.get(ForecastRun, run_id)
+            if run:
+                run.status = "failed"
+                run.error = str(e)
+                run.finished_at = datetime.now(timezone.utc)
+                db.session.commit()
+
+
+def start_forecast_run_background(run_id):
+    """Start a background thread to run the batch forecast"""
+    app = current_app._get_current_object()
+    thread = threading.Thread(target=run_forecast_run_task, args=(run_id, app))
+    thread.daemon = True  # Allow the thread to be terminated when the main process exits
+    thread.start()
+    return thread
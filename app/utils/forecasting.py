@@ -0,0 +1,412 @@
+# app/utils/forecasting.py
+import hashlib
+import json
+import logging
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sqlalchemy import func
+from ..db import db
+from app.models.sales_summary import SalesSummary
+from app.models.transaction import Transaction
+from app.utils.forecast_features import add_month_dummies, add_month_regressors, holiday_frame
+from app.utils.fast_forecast import forecast_frame, forecast_series, is_fast_candidate, select_models
+from app.utils.model_store import load_model, model_lock_path, save_model
+from app.utils.sales_summary import summary_query
+from app.utils.single_flight import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Parameter Prophet jika kategori produk belum punya hasil tuning
+DEFAULT_PROPHET_PARAMS = {
+    "weekly_seasonality": True,
+    "seasonality_mode": "multiplicative",
+    "changepoint_prior_scale": 0.05,
+    "seasonality_prior_scale": 1,
+    "holidays_prior_scale": 10,
+    "changepoint_range": 0.8,
+}
+
+# Interval prediksi: sampling penuh Prophet, sampling dikurangi, atau kuantil residual tanpa sampling
+INTERVAL_MODES = ("full", "reduced", "residual")
+
+
+def load_product_history(product_id):
+    """Penjualan bulanan produk dari sales_summary sebagai list (ds, y)"""
+    return summary_query(
+        "month",
+        "product",
+        SalesSummary.period_date.label("ds"),
+        SalesSummary.qty.label("y")
+    ).filter(
+        SalesSummary.dim_key == product_id
+    ).order_by(
+        SalesSummary.period_date
+    ).all()
+
+
+def product_data_version(product_id):
+    """
+    High-water mark transaksi produk: (MAX(id), COUNT(id)).
+
+    Dijawab dari index (product_id, invoice_date) tanpa membaca baris tabel,
+    dan berubah setiap kali transaksi produk bertambah atau dihapus.
+    """
+    max_id, count = db.session.query(
+        func.max(Transaction.id), func.count(Transaction.id)
+    ).filter(
+        Transaction.product_id == product_id
+    ).one()
+    return max_id or 0, count or 0
+
+
+def params_fingerprint(params):
+    """Hash stabil dari parameter Prophet (None = parameter default)"""
+    payload = json.dumps(params, sort_keys=True, default=str) if params is not None else "default"
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def prepare_monthly_frame(rows):
+    """
+    Susun DataFrame bulanan lengkap (tanpa bulan bolong) dengan transformasi log.
+
+    Args:
+        rows: List (ds, y) penjualan bulanan
+
+    Returns:
+        DataFrame: ds, y (log1p), regressor bulan, y_orig
+    """
+    df = pd.DataFrame(rows, columns=["ds", "y"])
+    df["ds"] = pd.to_datetime(df["ds"])
+    df["y"] = df["y"].astype(float)
+
+    # Prepare monthly data with proper frequency
+    freq = "MS"  # Monthly start frequency
+    df_monthly = df.groupby(pd.Grouper(key="ds", freq=freq))["y"].sum().reset_index()
+
+    # Ensure the date range is complete with all months
+    all_dates = pd.date_range(start=df_monthly["ds"].min(), end=df_monthly["ds"].max(), freq=freq)
+    df_complete = pd.DataFrame({"ds": all_dates})
+    df_monthly = pd.merge(df_complete, df_monthly, on="ds", how="left").fillna(0)
+
+    # Add month dummies as additional regressors for better monthly seasonality handling
+    df_monthly = add_month_dummies(df_monthly)
+
+    # Log transformation, same as parameter tuning
+    df_monthly["y_orig"] = df_monthly["y"].copy()
+    df_monthly["y"] = np.log1p(df_monthly["y"])  # log(1 + y) to avoid log(0)
+    return df_monthly
+
+
+def build_model(params=None, dates=None):
+    """
+    Model Prophet dengan libur nasional Indonesia dan regressor bulan.
+
+    Args:
+        params: Parameter Prophet hasil tuning atau None untuk default
+        dates: Tanggal data training; libur diambil dari tabel cache
+            forecast_features (None = add_country_holidays per fit)
+    """
+    # Import lambat: prophet/cmdstanpy/holidays hanya dimuat saat forecast pertama
+    from prophet import Prophet
+
+    holidays = holiday_frame(dates) if dates is not None else None
+    if params:
+        model = Prophet(yearly_seasonality=True, weekly_seasonality=False, daily_seasonality=False,
+                        holidays=holidays, **params)
+    else:
+        model = Prophet(yearly_seasonality=True, daily_seasonality=False, holidays=holidays,
+                        **DEFAULT_PROPHET_PARAMS)
+
+    # Add Indonesia country holidays
+    if holidays is None:
+        model.add_country_holidays(country_name="ID")
+
+    # Add monthly dummy regressors
+    return add_month_regressors(model)
+
+
+def warm_start_params(model):
+    """
+    Nilai awal Stan (k, m, sigma_obs, delta, beta) dari model yang sudah di-fit.
+
+    Backend Prophet memakai nilai default untuk parameter yang ukurannya
+    tidak cocok (mis. jumlah changepoint berubah), jadi aman dipakai untuk
+    data yang sudah bertambah.
+    """
+    init = {name: float(np.mean(model.params[name])) for name in ("k", "m", "sigma_obs")}
+    for name in ("delta", "beta"):
+        init[name] = np.mean(model.params[name], axis=0)
+    return init
+
+
+def fit_model(df_monthly, params, init=None):
+    """
+    Fit model Prophet pada data bulanan hasil prepare_monthly_frame.
+
+    Args:
+        df_monthly: DataFrame hasil prepare_monthly_frame
+        params: Parameter Prophet hasil tuning atau None untuk default
+        init: Nilai awal optimasi dari warm_start_params (None = cold start)
+    """
+    model = build_model(params, df_monthly["ds"])
+    if init is not None:
+        model.fit(df_monthly, init=init)
+    else:
+        model.fit(df_monthly)
+    return model
+
+
+def residual_intervals(model, forecast):
+    """
+    yhat_lower/yhat_upper dari kuantil residual in-sample (skala log), tanpa sampling.
+
+    Kuantil mengikuti ``interval_width`` model; untuk bulan ke-h setelah data
+    terakhir lebarnya dikali sqrt(h) (ketidakpastian bertambah seperti random walk).
+    """
+    history = model.history
+    fitted = forecast.set_index("ds")["yhat"].reindex(history["ds"]).to_numpy()
+    residuals = history["y"].to_numpy() - fitted
+
+    alpha = (1 - model.interval_width) / 2
+    q_lower, q_upper = np.nanquantile(residuals, [alpha, 1 - alpha])
+
+    steps = np.maximum((forecast["ds"] > history["ds"].max()).cumsum().to_numpy(), 1)
+    scale = np.sqrt(steps)
+    forecast["yhat_lower"] = forecast["yhat"] + q_lower * scale
+    forecast["yhat_upper"] = forecast["yhat"] + q_upper * scale
+    return forecast
+
+
+def predict_model(model, periods, interval="full", samples=None):
+    """
+    Prediksi histori + ``periods`` bulan ke depan dari model yang sudah di-fit.
+
+    Args:
+        model: Model Prophet yang sudah di-fit
+        periods: Jumlah bulan ke depan
+        interval: "full" (uncertainty_samples model, default 1000), "reduced"
+            (``samples`` simulasi) atau "residual" (kuantil residual, tanpa sampling)
+        samples: Jumlah simulasi untuk mode "reduced"
+
+    Returns:
+        DataFrame: Hasil predict dengan yhat/yhat_lower/yhat_upper dalam skala asli
+    """
+    # Create future dataframe for forecasting
+    future = add_month_dummies(model.make_future_dataframe(periods=periods, freq="MS"))
+    if interval == "full":
+        forecast = model.predict(future)
+    else:
+        # Model bisa berasal dari model store: jumlah sampling dikembalikan setelah predict
+        full_samples = model.uncertainty_samples
+        model.uncertainty_samples = (samples or 100) if interval == "reduced" else 0
+        try:
+            forecast = model.predict(future)
+        finally:
+            model.uncertainty_samples = full_samples
+        if interval == "residual":
+            forecast = residual_intervals(model, forecast)
+
+    # Transform predictions back from log space
+    for column in ("yhat", "yhat_lower", "yhat_upper"):
+        forecast[column] = np.expm1(forecast[column])
+    return forecast
+
+
+def compute_mape(df_monthly, forecast):
+    """MAPE (%) data historis, hanya untuk bulan dengan penjualan > 0"""
+    if len(df_monthly) == 0:
+        return None
+
+    actual_values = np.expm1(df_monthly["y"].values)
+    historical_predictions = forecast[forecast["ds"].isin(df_monthly["ds"].values)]["yhat"].values
+
+    # Make sure arrays are the same length
+    min_len = min(len(actual_values), len(historical_predictions))
+    actual_values = actual_values[:min_len]
+    historical_predictions = historical_predictions[:min_len]
+
+    ape = np.where(
+        actual_values > 0,
+        np.abs((actual_values - historical_predictions) / np.where(actual_values > 0, actual_values, 1)),
+        np.nan
+    )
+    return np.nanmean(ape) * 100
+
+
+def format_forecast(df_monthly, forecast, periods):
+    """2 bulan historis terakhir + ``periods`` bulan forecast sebagai list dict"""
+    last_historical_date = df_monthly["ds"].max()
+    columns = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+    historical_data = forecast[forecast["ds"] <= last_historical_date].tail(2)[columns].copy()
+    historical_data["is_historical"] = True
+
+    future_data = forecast[forecast["ds"] > last_historical_date][columns].copy()
+    future_data["is_historical"] = False
+
+    forecast_data = pd.concat([historical_data, future_data]).to_dict("records")[:periods + 2]
+
+    for item in forecast_data:
+        item["ds"] = item["ds"].strftime("%Y-%m-%d")
+        # Ensure non-negative values
+        item["yhat"] = max(0, round(float(item["yhat"]), 2))
+        item["yhat_lower"] = max(0, round(float(item["yhat_lower"]), 2))
+        item["yhat_upper"] = max(0, round(float(item["yhat_upper"]), 2))
+    return forecast_data
+
+
+def forecast_from_model(model, periods, interval="full", samples=None):
+    """
+    Hasil forecast dari model yang sudah di-fit (baru atau dari model store).
+
+    Data historis (untuk MAPE dan batas histori) diambil dari ``model.history``
+    sehingga tidak perlu membaca database lagi. ``interval``/``samples``
+    diteruskan ke predict_model.
+
+    Returns:
+        dict: {"forecast": [...], "mape": float | None, "periods": int}
+    """
+    df_monthly = model.history
+    forecast = predict_model(model, periods, interval, samples)
+
+    return {
+        "forecast": format_forecast(df_monthly, forecast, periods),
+        "mape": compute_mape(df_monthly, forecast),
+        "periods": periods,
+        "model": "prophet",
+        "interval": interval,
+    }
+
+
+def interval_settings(mode=None):
+    """
+    (mode, samples) interval prediksi.
+
+    Args:
+        mode: Mode dari request; None = FORECAST_INTERVAL_MODE
+
+    Raises:
+        ValueError: Mode tidak dikenal
+    """
+    mode = (mode or current_app.config.get("FORECAST_INTERVAL_MODE", "full")).lower()
+    if mode not in INTERVAL_MODES:
+        raise ValueError(f"Interval must be one of: {', '.join(INTERVAL_MODES)}")
+    return mode, current_app.config.get("FORECAST_INTERVAL_SAMPLES", 100)
+
+
+def fast_forecast_settings():
+    """(max_error, max_months) untuk forecaster cepat, atau None jika FORECAST_FAST_MODE=off"""
+    if current_app.config.get("FORECAST_FAST_MODE", "auto") == "off":
+        return None
+    return (
+        current_app.config.get("FORECAST_FAST_MAX_ERROR", 30.0),
+        current_app.config.get("FORECAST_FAST_MAX_MONTHS", 24),
+    )
+
+
+def fast_forecasts(frames, periods, max_error, max_months):
+    """
+    Forecast statistik (seasonal naive / Croston-SBA / ETS) untuk seri pendek atau intermittent.
+
+    Semua seri yang memenuhi syarat di-fit sekaligus; model termurah dengan
+    error holdout <= max_error dipakai.
+
+    Args:
+        frames: List DataFrame hasil prepare_monthly_frame
+        periods: Jumlah bulan ke depan
+        max_error: Batas error holdout (%) agar model statistik dipakai
+        max_months: Seri lebih pendek dari ini dianggap pendek
+
+    Returns:
+        list: Hasil per frame dengan bentuk sama seperti forecast_from_model
+        (plus "model"), atau None jika produk tetap perlu Prophet
+    """
+    results = [None] * len(frames)
+    candidates = [
+        i for i, df_monthly in enumerate(frames)
+        if is_fast_candidate(df_monthly["y_orig"].to_numpy(), max_months)
+    ]
+    if not candidates:
+        return results
+
+    series = [frames[i]["y_orig"].to_numpy() for i in candidates]
+    models, _ = select_models(series, max_error)
+    fits = forecast_series(series, models, periods)
+
+    for i, model, fit in zip(candidates, models, fits):
+        if fit is None:
+            continue
+        forecast = forecast_frame(frames[i], fit, periods)
+        results[i] = {
+            "forecast": format_forecast(frames[i], forecast, periods),
+            "mape": compute_mape(frames[i], forecast),
+            "periods": periods,
+            "model": model,
+        }
+    return results
+
+
+def run_product_forecast(rows, params, periods, interval="full", samples=None):
+    """
+    Forecast satu produk dari data bulanan (tanpa akses database).
+
+    Args:
+        rows: List (ds, y) penjualan bulanan
+        params: Parameter Prophet hasil tuning atau None untuk default
+        periods: Jumlah bulan ke depan
+        interval: Mode interval prediksi (lihat predict_model)
+        samples: Jumlah simulasi untuk mode "reduced"
+
+    Returns:
+        dict: {"forecast": [...], "mape": float | None, "periods": int}
+    """
+    return forecast_from_model(fit_model(prepare_monthly_frame(rows), params), periods, interval, samples)
+
+
+def get_fitted_model(product_id, params, data_version=None):
+    """
+    Model produk dari model store, atau fit baru jika data penjualan berubah.
+
+    Refit memakai parameter model tersimpan sebagai nilai awal (warm start).
+    Fit dijalankan di bawah file lock per produk: worker lain di node yang
+    sama menunggu lalu memakai model yang baru disimpan, bukan fit ulang.
+
+    Args:
+        product_id: ID produk
+        params: Parameter Prophet hasil tuning atau None untuk default
+        data_version: High-water mark transaksi (dihitung jika None)
+
+    Returns:
+        Prophet | None: Model yang sudah di-fit, None jika produk belum punya penjualan
+    """
+    if data_version is None:
+        data_version = product_data_version(product_id)
+    data_version = tuple(data_version)
+    params_hash = params_fingerprint(params)
+
+    previous, stored_version = load_model(product_id, params_hash)
+    if previous is not None and stored_version == data_version:
+        return previous
+
+    with file_lock(model_lock_path(product_id)):
+        # Worker lain mungkin sudah selesai fit selagi kita menunggu lock
+        previous, stored_version = load_model(product_id, params_hash)
+        if previous is not None and stored_version == data_version:
+            return previous
+
+        rows = load_product_history(product_id)
+        if not rows:
+            return None
+
+        # Refit dimulai dari parameter fit sebelumnya (data biasanya hanya bertambah sedikit)
+        init = None
+        if previous is not None and current_app.config.get("FORECAST_WARM_START", True):
+            init = warm_start_params(previous)
+        model = fit_model(prepare_monthly_frame(rows), params, init=init)
+        try:
+            save_model(product_id, params_hash, data_version, model)
+        except OSError as e:
+            # Store tidak bisa ditulis: forecast tetap jalan tanpa menyimpan model
+            logger.warning(f"Could not store forecast model for {product_id}: {str(e)}")
+        return model
@@ -0,0 +1,390 @@
+# app/utils/import_jobs.py
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+
+import pandas as pd
+from flask import current_app
+from sqlalchemy import update
+
+from ..db import db
+from app.models.import_job import ImportJob
+from app.models.product import Product
+from app.utils.bulk_import import (
+    CustomerImporter,
+    ImportRowError,
+    ProductStockImporter,
+    TransactionImporter,
+)
+from app.utils.file_reader import DEFAULT_CHUNK_ROWS, ChunkedFileReader
+from app.utils.forecast_cache import forecast_cache
+from app.utils.import_ledger import ChunkLedger, file_digest, find_imported_file, record_file
+from app.utils.sales_summary import rebuild_months
+
+logger = logging.getLogger(__name__)
+
+# Daftar kolom yang diharapkan dalam file Excel (kolom file -> kolom model)
+CUSTOMER_COLUMNS = {
+    "cextra": "extra",
+    "jharga": "price_type",
+    "centpk": "customer_code",
+    "centdesc": "business_name",
+    "centnpwp": "npwp",
+    "centbill": "nik",
+    "centcode": "customer_id",
+    "ccitdesc": "city",
+    "centadd1": "address_1",
+    "centadd2": "address_2",
+    "centadd3": "address_3",
+    "centadd4": "address_4",
+    "centadd5": "address_5",
+    "centdescp": "owner_name",
+    "centadd1p": "owner_address_1",
+    "centadd2p": "owner_address_2",
+    "centadd3p": "owner_address_3",
+    "centadd4p": "owner_address_4",
+    "centadd5p": "owner_address_5",
+    "centagama": "religion",
+    "centadds": "additional_address",
+    "centadd1s": "additional_address_1",
+    "centadd2s": "additional_address_2",
+    "centadd3s": "additional_address_3",
+    "centadd4s": "additional_address_4",
+    "centadd5s": "additional_address_5",
+}
+
+PRODUCT_COLUMNS = {
+    "cstkpk": "product_code",
+    "cstkdesc": "product_name",
+    "nstdprice": "standard_price",
+    "nstdretail": "retail_price",
+    "cstdcode": "product_id",
+    "nstkppn": "ppn",
+    "cgrpdesc": "category",
+    "nstkmin": "min_stock",
+    "nstkmax": "max_stock",
+    "supp": "supplier_id",
+    "namasupp": "supplier_name",
+}
+
+PRODUCT_STOCK_COLUMNS = {
+    "judul": "report_date",
+    "tglbeli": "purchase_date",
+    "cstdcode": "product_id",
+    "cwhsdesc": "location",
+    "ntqty": "qty",
+    "cunidesc": "unit",
+    "nstdprice": "price",
+}
+
+TRANSACTION_COLUMNS = {
+    "cinvrefno": "invoice_id",
+    "dinvdate": "invoice_date",
+    "cinvfkentcode": "customer_id",
+    "csamdesc": "agent_name",
+    "civdcode": "product_id",
+    "cstkdesc": "product_name",
+    "mqty": "qty",
+    "civdunit": "unit",
+    "nivdamount": "total_amount",
+    "nivdorder": "order_sequence",
+    "nprice": "price_after_discount",
+    "ninvfreight": "shipping_cost",
+    "npindah": "shipping_cost_per_item",
+    "cinvremark": "invoice_note",
+    "cgrpdesc": "category",
+    "nivddisc1": "discount_percentage",
+    "nivdprice": "price_before_discount",
+    "merek": "brand",
+    "nstkbuy": "cost_price",
+    "nivdpokok": "total_cost",
+}
+
+IMPORT_COLUMNS = {
+    "customers": CUSTOMER_COLUMNS,
+    "products": PRODUCT_COLUMNS,
+    "product_stock": PRODUCT_STOCK_COLUMNS,
+    "transactions": TRANSACTION_COLUMNS,
+}
+
+
+def _track_chunks(reader, stats, on_progress):
+    """Iterasi window file dan laporkan progress setelah setiap window selesai diproses"""
+    processed_rows = 0
+    for df in reader:
+        yield df
+        processed_rows += len(df)
+        if on_progress:
+            on_progress(processed_rows, reader.total_rows, stats)
+
+
+def _import_customers(reader, options, on_progress):
+    # Validasi, deteksi duplikat dan insert dilakukan per kolom, bukan per baris
+    importer = CustomerImporter(update_existing=options.get("update_existing", False))
+    for df in _track_chunks(reader, importer.stats, on_progress):
+        importer.process(df)
+
+    stats = importer.stats
+    message = f"Customers imported successfully. Inserted: {stats['inserted']}, Updated: {stats['updated']}, Duplicates: {stats['duplicates']}, Conflicts: {stats['conflicts']}"
+    return message, stats
+
+
+def _import_products(reader, options, on_progress):
+    stats = {"total_rows": 0, "inserted": 0, "skipped": 0}
+
+    for df in _track_chunks(reader, stats, on_progress):
+        stats["total_rows"] += len(df)
+
+        # Konversi NaN menjadi None untuk seluruh DataFrame
+        df = df.where(pd.notna(df), None)
+
+        # Iterasi data sebelum dimasukkan ke database
+        for index, row in df.iterrows():
+            if not row["product_id"] or not row["product_name"]:
+                raise ImportRowError(f"Row {index + 1}: Product id and name cannot be null")
+
+            # Lewati produk yang sudah ada berdasarkan product_code atau product_id
+            if Product.query.filter_by(product_code=row["product_code"]).first():
+                stats["skipped"] += 1
+                continue
+
+            if Product.query.filter_by(product_id=row["product_id"]).first():
+                stats["skipped"] += 1
+                continue
+
+            # Buat instance Product dengan dictionary comprehension
+            new_product = Product(**{col: row[col] for col in PRODUCT_COLUMNS.values()})
+
+            # Tambahkan ke sesi database
+            db.session.add(new_product)
+            stats["inserted"] += 1
+
+    return "Products imported successfully", stats
+
+
+def _import_product_stock(reader, options, on_progress):
+    # Tanggal, cek produk dan perbandingan report_date dilakukan per window
+    importer = ProductStockImporter()
+    for df in _track_chunks(reader, importer.stats, on_progress):
+        importer.process(df)
+
+    stats = importer.stats
+    message = f"Product stock imported successfully. New records: {stats['inserted']}, Updated records: {stats['updated']}, Skipped records: {stats['skipped']}"
+    return message, stats
+
+
+def _invoice_month(df):
+    """Kunci chunk transaksi: bulan invoice (YYYY-MM)"""
+    dates = pd.to_datetime(df["invoice_date"], errors="coerce")
+    return dates.dt.strftime("%Y-%m").fillna("")
+
+
+def _import_transactions(reader, options, on_progress):
+    # Bulan invoice yang isinya identik dengan import sebelumnya dilewati
+    ledger = None
+    if not options.get("force"):
+        ledger = ChunkLedger("transactions", _invoice_month)
+        ledger.scan(reader)
+
+    # Cek duplikat dan foreign key secara vektor, lalu insert per chunk
+    importer = TransactionImporter()
+    for df in _track_chunks(reader, importer.stats, on_progress):
+        if ledger:
+            df = ledger.filter(df)
+            if df.empty:
+                continue
+        importer.process(df)
+        if ledger:
+            ledger.reject(importer.last_rejected)
+
+    # Perbarui agregat penjualan hanya untuk bulan yang menerima transaksi baru
+    rebuild_months(importer.imported_months)
+    forecast_cache.invalidate(product_ids=importer.imported_products)
+
+    stats = importer.stats
+    if ledger:
+        ledger.record()
+        stats["total_rows"] += ledger.skipped_rows
+        stats["duplicates"] += ledger.skipped_rows
+        stats["skipped_chunks"] = len(ledger.known_keys)
+
+    message = f"Transactions imported successfully. Inserted: {stats['inserted']}, Duplicates: {stats['duplicates']}, Missing customer: {stats['missing_customer']}, Missing product: {stats['missing_product']}"
+    return message, stats
+
+
+IMPORT_RUNNERS = {
+    "customers": _import_customers,
+    "products": _import_products,
+    "product_stock": _import_product_stock,
+    "transactions": _import_transactions,
+}
+
+# Statistik yang menandakan ada baris yang belum tuntas (file tidak dicatat di ledger)
+UNSETTLED_STATS = {
+    "customers": ["conflicts"],
+    "product_stock": ["missing_product"],
+    "transactions": ["missing_customer", "missing_product"],
+}
+
+
+def run_import(import_type, file, filename, options=None, on_progress=None):
+    """
+    Jalankan import satu file, dipakai oleh endpoint sinkron maupun job background.
+
+    Perubahan tidak di-commit di sini; commit atau rollback dilakukan pemanggil
+    sehingga satu file tetap diimport secara utuh atau tidak sama sekali.
+
+    Args:
+        import_type: Jenis import (customers, products, product_stock, transactions)
+        file: Path atau file-like object
+        filename: Nama file asli, dipakai untuk menentukan format
+        options: Opsi import (mis. {"update_existing": True, "force": True})
+        on_progress: Callback (processed_rows, total_rows, stats) per window
+
+    Returns:
+        tuple: (pesan, statistik import)
+    """
+    options = options or {}
+
+    # File yang identik dengan import sebelumnya langsung dikenali dari hash-nya
+    digest = file_digest(file)
+    if not options.get("force") and not options.get("update_existing"):
+        imported = find_imported_file(import_type, digest)
+        if imported:
+            return "File has already been imported. No rows were processed.", {
+                "total_rows": imported.row_count,
+                "already_imported": True,
+            }
+
+    # Baca file per window; kolom yang hilang langsung ditolak
+    reader = ChunkedFileReader(
+        file,
+        filename,
+        IMPORT_COLUMNS[import_type],
+        chunk_size=current_app.config.get("IMPORT_CHUNK_ROWS", DEFAULT_CHUNK_ROWS),
+    )
+    message, stats = IMPORT_RUNNERS[import_type](reader, options, on_progress)
+
+    # Catat file hanya jika semua barisnya tuntas
+    settled = not any(stats.get(key) for key in UNSETTLED_STATS.get(import_type, []))
+    if settled and not find_imported_file(import_type, digest):
+        record_file(import_type, digest, stats["total_rows"])
+
+    return message, stats
+
+
+def stage_upload(file):
+    """Simpan file upload ke direktori staging dan kembalikan path-nya"""
+    staging_dir = current_app.config.get("IMPORT_STAGING_DIR") or os.path.join(
+        tempfile.gettempdir(), "anp_imports"
+    )
+    os.makedirs(staging_dir, exist_ok=True)
+
+    extension = file.filename.rsplit(".", 1)[-1].lower()
+    file_path = os.path.join(staging_dir, f"{uuid.uuid4().hex}.{extension}")
+    file.save(file_path)
+    return file_path
+
+
+def _record_progress(job_id, processed_rows, total_rows, stats):
+    """
+    Tulis progress lewat koneksi terpisah agar bisa dibaca endpoint status
+    sebelum transaksi import di-commit.
+
+    SQLite hanya mengizinkan satu penulis: transaksi import sudah memegang
+    lock tulis, jadi koneksi kedua akan menunggu sampai "database is locked".
+    Di SQLite progress dilewati dan baru terlihat saat job selesai.
+    """
+    if db.engine.dialect.name == "sqlite":
+        return
+
+    values = {
+        "processed_rows": processed_rows,
+        "total_rows": total_rows,
+        "result": json.dumps(stats),
+        "updated_at": datetime.now(timezone.utc),
+    }
+    if total_rows:
+        # Sisakan 100% untuk saat commit selesai
+        values["progress"] = min(int(processed_rows * 100 / total_rows), 99)
+
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(ImportJob.__table__)
+                .where(ImportJob.__table__.c.id == job_id)
+                .values(**values)
+            )
+    except Exception as e:
+        # Progress hanya informasi; jangan gagalkan import karenanya
+        logger.warning(f"Could not record progress for import job {job_id}: {str(e)}")
+
+
+def run_import_job_task(job_id, app=None):
+    """Background task untuk memproses satu import job dari file staging (``app`` default: create_app() baru)"""
+    # Use app context for database operations
+    if app is None:
+        from app import create_app
+        app = create_app()
+
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        if not job:
+            logger.error(f"Import job {job_id} not found")
+            return
+
+        file_path = job.file_path
+        try:
+            job.status = "running"
+            job.progress = 0
+            db.session.commit()
+
+            logger.info(f"Starting import job {job_id} ({job.import_type}: {job.filename})")
+
+            def on_progress(processed_rows, total_rows, stats):
+                _record_progress(job_id, processed_rows, total_rows, stats)
+
+            message, stats = run_import(
+                job.import_type, file_path, job.filename, job.get_options(), on_progress
+            )
+
+            # Commit data import, lalu tandai job selesai
+            db.session.commit()
+
+            job = db.session.get(ImportJob, job_id)
+            job.status = "completed"
+            job.progress = 100
+            job.processed_rows = stats["total_rows"]
+            job.set_result(stats)
+            db.session.commit()
+
+            logger.info(f"Completed import job {job_id}: {message}")
+
+        except Exception as e:
+            logger.error(f"Import job {job_id} failed: {str(e)}")
+            db.session.rollback()
+
+            # Update job status to failed
+            job = db.session.get(ImportJob, job_id)
+            if job:
+                job.status = "failed"
+                job.error = str(e)
+                db.session.commit()
+
+        finally:
+            # File staging tidak diperlukan lagi setelah job selesai
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+
+
+def start_import_job_background(job_id):
+    """Start a background thread to run the import job"""
+    app = current_app._get_current_object()
+    thread = threading.Thread(target=run_import_job_task, args=(job_id, app))
+    thread.daemon = True  # Allow the thread to be terminated when the main process exits
+    thread.start()
+    return thread
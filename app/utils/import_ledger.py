@@ -0,0 +1,138 @@
+# app/utils/import_ledger.py
+import hashlib
+import pandas as pd
+from ..db import db
+from app.models.import_ledger import ImportLedger
+
+# Ukuran blok saat menghitung hash file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(file):
+    """
+    Hitung SHA-256 isi file upload.
+
+    Args:
+        file: Path atau file-like object (posisi baca dikembalikan ke awal)
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    if hasattr(file, "read"):
+        file.seek(0)
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+        file.seek(0)
+    else:
+        with open(file, "rb") as handle:
+            for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def find_imported_file(import_type, digest):
+    """Kembalikan entri ledger untuk file yang sudah pernah diimport, atau None"""
+    return ImportLedger.query.filter_by(
+        import_type=import_type, chunk_key=None, content_hash=digest
+    ).first()
+
+
+def record_file(import_type, digest, row_count):
+    """Catat file yang sudah selesai diimport (commit dilakukan pemanggil)"""
+    db.session.add(
+        ImportLedger(import_type=import_type, content_hash=digest, row_count=row_count)
+    )
+
+
+def clear_ledger(import_type):
+    """Hapus ledger satu jenis import, mis. setelah data terkait dihapus"""
+    ImportLedger.query.filter_by(import_type=import_type).delete()
+
+
+class ChunkLedger:
+    """
+    Ledger hash per chunk baris (mis. transaksi per bulan invoice).
+
+    Pass pertama (``scan``) menghitung hash isi setiap chunk dari seluruh file.
+    Hash per chunk adalah jumlah hash per baris, sehingga tidak bergantung pada
+    urutan baris maupun pembagian window. Chunk yang isinya identik dengan
+    chunk yang pernah diimport dilewati pada pass kedua (``filter``).
+
+    Chunk hanya dicatat jika semua barisnya tuntas (masuk atau duplikat).
+    Baris yang ditolak, mis. karena customer belum ada, membuat chunk tetap
+    diproses ulang pada upload berikutnya.
+
+    Args:
+        import_type: Jenis import
+        key_func: Fungsi DataFrame -> Series kunci chunk (string)
+    """
+
+    def __init__(self, import_type, key_func):
+        self.import_type = import_type
+        self.key_func = key_func
+        self.digests = {}
+        self.known_keys = set()
+        self.rejected_keys = set()
+        self.skipped_rows = 0
+        self._last_keys = None
+
+    def _row_hashes(self, df):
+        """Hash per baris (uint64) yang deterministik antar proses"""
+        return pd.util.hash_pandas_object(df.astype(str), index=False)
+
+    def scan(self, reader):
+        """Pass pertama: hitung hash setiap chunk lalu cocokkan dengan ledger"""
+        sums = {}
+        counts = {}
+        for df in reader:
+            hashes = self._row_hashes(df).groupby(self.key_func(df).to_numpy())
+            for key, value in hashes.sum().items():
+                # Jumlah modulo 2^64 agar hasilnya tetap sama di setiap window
+                sums[key] = (sums.get(key, 0) + int(value)) % (1 << 64)
+            for key, value in hashes.size().items():
+                counts[key] = counts.get(key, 0) + int(value)
+
+        self.digests = {
+            key: (hashlib.sha256(f"{counts[key]}:{sums[key]}".encode()).hexdigest(), counts[key])
+            for key in sums
+        }
+
+        hashes = [digest for digest, _ in self.digests.values()]
+        known = set()
+        for start in range(0, len(hashes), 1000):
+            rows = db.session.query(ImportLedger.chunk_key, ImportLedger.content_hash).filter(
+                ImportLedger.import_type == self.import_type,
+                ImportLedger.content_hash.in_(hashes[start:start + 1000]),
+            ).all()
+            known.update(rows)
+
+        self.known_keys = {
+            key for key, (digest, _) in self.digests.items() if (key, digest) in known
+        }
+
+    def filter(self, df):
+        """Pass kedua: buang baris yang termasuk chunk yang sudah pernah diimport"""
+        keys = self.key_func(df)
+        known_mask = keys.isin(self.known_keys)
+        self.skipped_rows += int(known_mask.sum())
+        self._last_keys = keys[~known_mask]
+        return df[~known_mask]
+
+    def reject(self, index):
+        """Tandai chunk dari baris (index window terakhir) yang tidak bisa diimport"""
+        self.rejected_keys.update(self._last_keys.loc[index])
+
+    def record(self):
+        """Catat chunk baru yang seluruh barisnya tuntas (commit dilakukan pemanggil)"""
+        for key, (digest, row_count) in self.digests.items():
+            if key in self.known_keys or key in self.rejected_keys:
+                continue
+            db.session.add(
+                ImportLedger(
+                    import_type=self.import_type,
+                    chunk_key=key,
+                    content_hash=digest,
+                    row_count=row_count,
+                )
+            )
@@ -0,0 +1,119 @@
+# app/utils/model_store.py
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+def _store_dir():
+    """Direktori model (FORECAST_MODEL_DIR atau folder di temp)"""
+    store_dir = current_app.config.get("FORECAST_MODEL_DIR") or os.path.join(
+        tempfile.gettempdir(), "anp_forecast_models"
+    )
+    os.makedirs(store_dir, exist_ok=True)
+    return store_dir
+
+
+def _product_prefix(product_id):
+    # product_id bisa berisi karakter yang tidak aman untuk nama file
+    return hashlib.sha256(str(product_id).encode()).hexdigest()[:16]
+
+
+def _model_path(product_id, params_hash):
+    return os.path.join(_store_dir(), f"{_product_prefix(product_id)}_{params_hash}.json")
+
+
+def model_lock_path(product_id):
+    """File lock fit model satu produk (dipakai bersama semua worker di node)"""
+    return os.path.join(_store_dir(), f"{_product_prefix(product_id)}.lock")
+
+
+def load_model(product_id, params_hash):
+    """
+    Ambil model Prophet tersimpan untuk produk dan parameter tertentu.
+
+    Args:
+        product_id: ID produk
+        params_hash: Fingerprint parameter Prophet
+
+    Returns:
+        tuple: (Prophet, data_version) atau (None, None) jika belum ada.
+        Pemanggil membandingkan data_version dengan data saat ini; model
+        yang sudah usang masih berguna sebagai nilai awal refit.
+    """
+    path = _model_path(product_id, params_hash)
+    try:
+        with open(path) as handle:
+            payload = json.load(handle)
+    except FileNotFoundError:
+        return None, None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Unreadable forecast model {path}: {str(e)}")
+        return None, None
+
+    if payload.get("product_id") != product_id:
+        return None, None
+
+    from prophet.serialize import model_from_json
+
+    try:
+        return model_from_json(payload["model"]), tuple(payload["data_version"])
+    except Exception as e:
+        logger.warning(f"Invalid forecast model {path}: {str(e)}")
+        return None, None
+
+
+def save_model(product_id, params_hash, data_version, model):
+    """
+    Simpan model yang sudah di-fit; model lama produk yang sama dihapus.
+
+    File ditulis ke nama sementara lalu di-rename agar worker lain tidak
+    pernah membaca file yang setengah tertulis.
+    """
+    from prophet.serialize import model_to_json
+
+    path = _model_path(product_id, params_hash)
+    payload = {
+        "product_id": product_id,
+        "params_hash": params_hash,
+        "data_version": list(data_version),
+        "model": model_to_json(model),
+    }
+
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w") as handle:
+        json.dump(payload, handle)
+    os.replace(temp_path, path)
+
+    # Model dengan parameter lama untuk produk ini tidak akan dipakai lagi
+    for stale in glob.glob(os.path.join(_store_dir(), f"{_product_prefix(product_id)}_*.json")):
+        if stale != path:
+            _delete_file(stale)
+    return path
+
+
+def delete_models(product_id=None):
+    """
+    Hapus model tersimpan untuk satu produk, atau seluruh store.
+
+    Returns:
+        int: Jumlah file yang dihapus
+    """
+    pattern = f"{_product_prefix(product_id)}_*.json" if product_id else "*.json"
+    paths = glob.glob(os.path.join(_store_dir(), pattern))
+    for path in paths:
+        _delete_file(path)
+    return len(paths)
+
+
+def _delete_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,130 @@
+# app/utils/sales_summary.py
+from datetime import datetime, timezone
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, literal, select
+from ..db import db
+from app.utils.date_buckets import month_range, month_start
+from app.models.sales_summary import SalesSummary
+from app.models.transaction import Transaction
+
+# Dimensi agregat -> kolom transaksi (None = total seluruh transaksi)
+DIMENSIONS = {
+    "product": Transaction.product_id,
+    "category": Transaction.category,
+    "customer": Transaction.customer_id,
+    "total": None,
+}
+
+SUMMARY_COLUMNS = [
+    "grain",
+    "dimension",
+    "dim_key",
+    "period_date",
+    "qty",
+    "amount",
+    "cost",
+    "line_count",
+    "invoice_count",
+    "updated_at",
+]
+
+
+def _measures():
+    return [
+        func.coalesce(func.sum(Transaction.qty), 0),
+        func.coalesce(func.sum(Transaction.total_amount), 0),
+        func.coalesce(func.sum(Transaction.total_cost), 0),
+        func.count(Transaction.id),
+        func.count(func.distinct(Transaction.invoice_id)),
+    ]
+
+
+def rebuild_months(months):
+    """
+    Hitung ulang agregat untuk bulan tertentu dari tabel transaction.
+
+    Baris agregat bulan tersebut dihapus lalu diisi ulang dengan
+    INSERT ... SELECT ... GROUP BY, sehingga biayanya sebanding dengan
+    jumlah transaksi di bulan itu saja. Commit dilakukan pemanggil.
+
+    Args:
+        months: Iterable tanggal (hari apa pun dalam bulan yang dihitung ulang)
+    """
+    now = datetime.now(timezone.utc)
+    table = SalesSummary.__table__
+
+    for start, end in sorted({month_range(m) for m in months}):
+        in_month = [Transaction.invoice_date >= start, Transaction.invoice_date < end]
+
+        for dimension, column in DIMENSIONS.items():
+            key = literal("") if column is None else func.coalesce(column, "")
+
+            # DELETE per (grain, dimension) agar memakai ix_sales_summary_period,
+            # bukan scan (dan lock) seluruh tabel agregat
+            for grain in ("day", "month"):
+                db.session.execute(
+                    table.delete().where(
+                        table.c.grain == grain,
+                        table.c.dimension == dimension,
+                        table.c.period_date >= start,
+                        table.c.period_date < end,
+                    )
+                )
+
+            # Grain harian: satu baris per key per tanggal invoice
+            daily = select(
+                literal("day"), literal(dimension), key, Transaction.invoice_date,
+                *_measures(), literal(now),
+            ).where(*in_month).group_by(key, Transaction.invoice_date)
+
+            # Grain bulanan: satu baris per key untuk bulan ini
+            monthly = select(
+                literal("month"), literal(dimension), key, literal(start, db.Date),
+                *_measures(), literal(now),
+            ).where(*in_month)
+            if column is not None:
+                monthly = monthly.group_by(key)
+            else:
+                monthly = monthly.having(func.count(Transaction.id) > 0)
+
+            db.session.execute(table.insert().from_select(SUMMARY_COLUMNS, daily))
+            db.session.execute(table.insert().from_select(SUMMARY_COLUMNS, monthly))
+
+
+def rebuild_all():
+    """Bangun ulang seluruh agregat dari awal (commit dilakukan pemanggil)"""
+    db.session.execute(SalesSummary.__table__.delete())
+
+    first, last = db.session.query(
+        func.min(Transaction.invoice_date), func.max(Transaction.invoice_date)
+    ).one()
+    if not first:
+        return 0
+
+    months = []
+    current = month_start(first)
+    while current <= last:
+        months.append(current)
+        current += relativedelta(months=1)
+
+    rebuild_months(months)
+    return len(months)
+
+
+def ensure_sales_summary():
+    """Isi tabel agregat sekali jika masih kosong tetapi transaksi sudah ada"""
+    if db.session.query(SalesSummary.id).first():
+        return False
+    if not db.session.query(Transaction.id).first():
+        return False
+    rebuild_all()
+    db.session.commit()
+    return True
+
+
+def summary_query(grain, dimension, *columns):
+    """Query tabel agregat untuk grain dan dimensi tertentu"""
+    return db.session.query(*columns).filter(
+        SalesSummary.grain == grain,
+        SalesSummary.dimension == dimension,
+    )
@@ -0,0 +1,152 @@
+# app/utils/saved_forecasts.py
+import json
+from datetime import datetime, timezone
+from ..db import db
+from app.models.saved_forecast import SavedForecast
+from app.utils.bulk_import import bulk_insert, bulk_update
+
+
+def _first_value(forecast_item, *keys):
+    """Nilai pertama yang tidak None (forecast 0 tetap dipakai)"""
+    for key in keys:
+        value = forecast_item.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def forecast_values(forecast_item):
+    """
+    Ambil yhat/yhat_lower/yhat_upper dari satu item forecast.
+
+    Item historis memakai kunci model (yhat, ...); item masa depan dari
+    frontend bisa memakai forecast/lower/upper.
+    """
+    if forecast_item.get('is_historical') == True:
+        # Historical data from model
+        return {
+            'yhat': forecast_item.get('yhat'),
+            'yhat_lower': forecast_item.get('yhat_lower'),
+            'yhat_upper': forecast_item.get('yhat_upper')
+        }
+
+    # Future forecast data
+    return {
+        'yhat': _first_value(forecast_item, 'forecast', 'yhat'),
+        'yhat_lower': _first_value(forecast_item, 'lower', 'yhat_lower'),
+        'yhat_upper': _first_value(forecast_item, 'upper', 'yhat_upper')
+    }
+
+
+def _items_by_date(forecast_items):
+    """Item forecast per tanggal (tanggal sama: item terakhir dipakai)"""
+    # Deduplicate forecast items by date - if there are multiple items for the same date, use the last one
+    processed_dates = {}
+    for forecast_item in forecast_items:
+        forecast_date = forecast_item.get('ds')
+        if not forecast_date:
+            continue
+
+        # Convert to date if it's a string
+        if isinstance(forecast_date, str):
+            forecast_date = datetime.strptime(forecast_date, '%Y-%m-%d').date()
+
+        processed_dates[forecast_date] = forecast_item
+    return processed_dates
+
+
+def upsert_saved_forecasts_bulk(entries, created_by=None):
+    """
+    Simpan forecast bulanan banyak produk sekaligus.
+
+    Id forecast yang sudah ada untuk semua produk diambil dengan satu query,
+    lalu baris dibagi menjadi baru dan lama: baris baru ditulis dengan INSERT
+    multi-row (bulk_insert), baris lama dengan UPDATE per primary key
+    (bulk_update). Commit dilakukan pemanggil.
+
+    Args:
+        entries: List (product_id, forecast_items, mape)
+        created_by: ID user untuk baris baru
+
+    Returns:
+        dict: product_id -> (jumlah baru, jumlah update, list tanggal unik)
+    """
+    by_product = {}
+    for product_id, forecast_items, mape in entries:
+        by_product[product_id] = (_items_by_date(forecast_items), mape)
+
+    all_dates = {forecast_date for processed_dates, _ in by_product.values() for forecast_date in processed_dates}
+    existing = {}
+    if all_dates:
+        existing = {
+            (product_id, forecast_date): forecast_id
+            for forecast_id, product_id, forecast_date in db.session.query(
+                SavedForecast.id, SavedForecast.product_id, SavedForecast.forecast_date
+            ).filter(
+                SavedForecast.product_id.in_(list(by_product)),
+                SavedForecast.forecast_date.in_(list(all_dates))
+            )
+        }
+
+    now = datetime.now(timezone.utc)
+    new_rows = []
+    updated_rows = []
+    counts = {}
+    for product_id, (processed_dates, mape) in by_product.items():
+        saved_count = 0
+        updated_count = 0
+
+        for forecast_date, forecast_item in processed_dates.items():
+            values = forecast_values(forecast_item)
+
+            # Skip if we don't have a forecast value (0 is a valid forecast)
+            if values['yhat'] is None:
+                continue
+
+            forecast_id = existing.get((product_id, forecast_date))
+            if forecast_id:
+                # Update existing forecast
+                updated_rows.append({
+                    'id': forecast_id,
+                    'forecast_data': json.dumps(values),
+                    'mape': mape,
+                    'updated_at': now
+                })
+                updated_count += 1
+            else:
+                # Create new forecast
+                new_rows.append({
+                    'product_id': product_id,
+                    'forecast_date': forecast_date,
+                    'forecast_data': json.dumps(values),
+                    'mape': mape,
+                    'created_by': created_by,
+                    'created_at': now,
+                    'updated_at': now
+                })
+                saved_count += 1
+
+        counts[product_id] = (saved_count, updated_count, list(processed_dates.keys()))
+
+    bulk_insert(SavedForecast, new_rows)
+    bulk_update(SavedForecast, updated_rows)
+    return counts
+
+
+def upsert_saved_forecasts(product_id, forecast_items, mape=None, created_by=None):
+    """
+    Simpan forecast bulanan satu produk: update tanggal yang sudah ada, insert sisanya.
+
+    Item dengan tanggal yang sama memakai item terakhir; item tanpa yhat dilewati.
+    Forecast yang sudah ada diambil dengan satu query. Commit dilakukan pemanggil.
+
+    Args:
+        product_id: ID produk
+        forecast_items: List dict dengan 'ds' (YYYY-MM-DD atau date) dan nilai forecast
+        mape: MAPE model (disimpan di setiap baris)
+        created_by: ID user untuk baris baru
+
+    Returns:
+        tuple: (jumlah baru, jumlah update, list tanggal unik)
+    """
+    return upsert_saved_forecasts_bulk([(product_id, forecast_items, mape)], created_by)[product_id]
@@ -0,0 +1,93 @@
+# app/utils/single_flight.py
+import fcntl
+import threading
+from contextlib import contextmanager
+
+
+class _Call:
+    """Satu perhitungan yang sedang berjalan untuk sebuah kunci"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Gabungkan panggilan identik yang berjalan bersamaan di satu proses.
+
+    Thread pertama untuk sebuah kunci menjalankan fungsi; thread lain dengan
+    kunci yang sama menunggu lalu menerima hasil (atau exception) yang sama.
+    Setelah selesai kunci dilepas, jadi panggilan berikutnya dihitung ulang
+    (hasil yang perlu disimpan lebih lama tetap urusan forecast_cache).
+    Antar proses worker dipakai file_lock di sekitar bagian yang mahal.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Jalankan ``fn()`` sekali untuk semua pemanggil ``key`` yang bersamaan.
+
+        Returns:
+            tuple: (hasil fn, True jika hasil dari panggilan thread lain)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Lock eksklusif lintas proses (fcntl.flock) pada ``path``.
+
+    Blok sampai proses lain melepas lock; lock dilepas otomatis oleh OS
+    jika proses pemegangnya mati.
+    """
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+# Instance bersama untuk request forecast di proses ini
+forecast_flight = SingleFlight()
@@ -1,292 +1,410 @@
 import threading
+import time
 import pandas as pd
 import numpy as np
 import json
-from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
 from datetime import datetime, timezone
-from joblib import Parallel, delayed
+from flask import current_app
 from ..db import db
-from app.models.transaction import Transaction
-from app.models.forecast_parameter import ForecastParameter, TuningJob
-from sqlalchemy import func
+from app.models.forecast_parameter import ForecastParameter, TuningJob, TuningResult
+from app.models.sales_summary import SalesSummary
+from app.utils.sales_summary import summary_query
+from app.utils.forecast_cache import forecast_cache
+from app.utils.forecast_features import add_month_dummies
+from app.utils.tuning import (
+    SharedTrainingFrame,
+    TuningScheduler,
+    TuningStopped,
+    node_core_budget,
+    sample_candidates,
+    successive_halving,
+    tuning_cutoffs,
+)
+from app.utils.tuning_queue import (
+    checkpoint_hash,
+    JobLease,
+    LeaseLost,
+    claim_job,
+    make_worker_id,
+    requeue_stale_jobs,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-def run_parameter_tuning_task(job_id):
+
+def process_tuning_job(app, job, worker_id):
     """
-    Background task to run parameter tuning with parallel processing
+    Jalankan job tuning yang sudah di-claim ``worker_id`` dengan heartbeat lease.
+
+    Job yang lease-nya hilang (di-requeue ke worker lain) dihentikan tanpa
+    menulis hasil; job lain yang error ditandai failed.
     """
-    # Use app context for database operations
-    from app import create_app
-    app = create_app()
-    
-    with app.app_context():
+    job_id = job.id
+    lease_seconds = app.config.get("TUNING_LEASE_SECONDS", 120)
+
+    with JobLease(app, job_id, worker_id, lease_seconds) as lease:
         try:
-            # Get job details
-            job = TuningJob.query.get(job_id)
-            if not job:
-                logger.error(f"Job {job_id} not found")
-                return
-            
-            # Update job status
-            job.status = "running"
-            job.progress = 5
-            db.session.commit()
-            
-            logger.info(f"Starting parameter tuning job {job_id} for category: {job.category}")
-            
-            # Get parameters to test
-            params_config = job.get_parameters()
-            category = job.category
-            selected_parameters = params_config.get("selected_parameters", [])
-            parameter_values = params_config.get("parameters", {})
-            
-            # Get historical data for the category
-            query = db.session.query(
-                Transaction.invoice_date.label("ds"), 
-                func.sum(Transaction.qty).label("y")
-            ).filter(
-                Transaction.category == category
-            ).group_by(
-                Transaction.invoice_date
-            ).order_by(
-                Transaction.invoice_date
-            )
-            
-            # Get the data
-            transactions = query.all()  
-            
-            if not transactions:
-                raise ValueError("No sales data available for the selected category")
-            
-            # Update progress
-            job.progress = 10
-            db.session.commit()
-            
-            # Convert to DataFrame 
-            df = pd.DataFrame(transactions, columns=["ds", "y"])
-            df["ds"] = pd.to_datetime(df["ds"])
-            
-            # Handle decimal type
-            df["y"] = df["y"].astype(float)
-            
-            # Ensure data is sorted by date
-            df = df.sort_values("ds")
-            
-            # Ensure positive values
-            df["y"] = df["y"].clip(lower=0)
-            
-            # Prepare monthly data with proper frequency
-            freq = "MS"  # Monthly start frequency
-            df_monthly = df.groupby(pd.Grouper(key='ds', freq=freq))['y'].sum().reset_index()
+            _run_tuning_job(app, job, lease)
+        
+        except (LeaseLost, TuningStopped):
+            # Dibatalkan atau diambil ulang worker lain: hasil per kombinasi sudah tersimpan
+            logger.warning(f"Stopped tuning job {job_id}: no longer held by {worker_id}")
+            db.session.rollback()
+        
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            db.session.rollback()
             
-            # Ensure the date range is complete with all months
-            all_dates = pd.date_range(start=df_monthly['ds'].min(), end=df_monthly['ds'].max(), freq=freq)
-            df_complete = pd.DataFrame({'ds': all_dates})
-            df_monthly = pd.merge(df_complete, df_monthly, on='ds', how='left').fillna(0)
+            # Update job status to failed (hanya jika job masih dipegang worker ini)
+            job = db.session.get(TuningJob, job_id, populate_existing=True)
+            if job and job.worker_id == worker_id:
+                job.status = "failed"
+                job.error = str(e)
+                job.worker_id = None
+                job.lease_expires_at = None
+                db.session.commit()
 
-            # Add month dummies as additional regressors
-            df_monthly['month'] = df_monthly['ds'].dt.month
-            for m_val in range(1, 13):
-                df_monthly[f'is_{m_val:02d}'] = (df_monthly['month'] == m_val).astype(int)
-            df_monthly = df_monthly.drop(columns=['month'])
 
-            # Update progress
-            job.progress = 20
-            db.session.commit()
-            
-            # Check if we have enough data
-            if len(df_monthly) < 12:
-                raise ValueError("Insufficient data for parameter tuning. Need at least 12 months of data.")
-                
-            # Optional: Apply log transformation to avoid negative forecasts
-            df_monthly['y_orig'] = df_monthly['y']  # Save original values
-            df_monthly['y'] = np.log1p(df_monthly['y'])  # log(1 + y) to avoid log(0)
-            
-            # Generate the grid of parameters to test
-            param_grid = {}
-            for param in selected_parameters:
-                param_grid[param] = parameter_values.get(param, [])
-            
-            # Generate all combinations of parameters
-            from itertools import product as itertools_product
-            all_params = []
-            param_names = list(param_grid.keys())
-            param_values = [param_grid[name] for name in param_names]
-            
-            # Create all combinations 
-            for items in itertools_product(*param_values):
-                params = {}
-                for i, name in enumerate(param_names):
-                    params[name] = items[i]
-                all_params.append(params)
-            
-            if not all_params:
-                raise ValueError("No valid parameter combinations to test")
-            
-            # Update progress
-            job.progress = 30
-            db.session.commit()
-            
-            # Configure cross-validation
-            # Use 60% of data for training by default, or at least 12 months
-            data_months = len(df_monthly)
-            training_months = max(int(data_months * 0.6), 12)
-            initial_period = f"{training_months * 30} days"
-            # initial_period = "360 days"  # Set to 12 months for initial period
+def _db_float(value):
+    # NaN tidak bisa disimpan di MySQL
+    if value is None or np.isnan(value):
+        return None
+    return float(value)
 
-            # Define evaluation function for parallel processing
-            def evaluate_params(params):
-                try:
-                    # Create model with current parameters
-                    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False,**params)
-                    # model = Prophet(**params)
 
-                    # Add Indonesia country holidays if holidays_prior_scale is in parameters
-                    if "holidays_prior_scale" in params:
-                        model.add_country_holidays(country_name='ID')
-                    
-                    # Add monthly dummy regressors
-                    for m_val in range(1, 13):
-                        model.add_regressor(f'is_{m_val:02d}')
-                    
+def _run_tuning_job(app, job, lease):
+    """Parameter tuning untuk satu job (dipanggil dari process_tuning_job)"""
+    # Status "running" dan lease sudah di-set saat claim
+    job.progress = 5
+    job.error = None
+    db.session.commit()
+    
+    logger.info(f"Starting parameter tuning job {job.id} for category: {job.category}")
+    
+    # Get parameters to test
+    params_config = job.get_parameters()
+    category = job.category
+    selected_parameters = params_config.get("selected_parameters", [])
+    parameter_values = params_config.get("parameters", {})
+    
+    # Get daily historical data for the category from the sales summary
+    # (daily grain so negative days are clipped before monthly aggregation)
+    query = summary_query(
+        "day",
+        "category",
+        SalesSummary.period_date.label("ds"),
+        SalesSummary.qty.label("y")
+    ).filter(
+        SalesSummary.dim_key == category
+    ).order_by(
+        SalesSummary.period_date
+    )
+    
+    # Get the data
+    transactions = query.all()  
+    
+    if not transactions:
+        raise ValueError("No sales data available for the selected category")
+    
+    # Update progress
+    job.progress = 10
+    db.session.commit()
+    
+    # Convert to DataFrame 
+    df = pd.DataFrame(transactions, columns=["ds", "y"])
+    df["ds"] = pd.to_datetime(df["ds"])
+    
+    # Handle decimal type
+    df["y"] = df["y"].astype(float)
+    
+    # Ensure data is sorted by date
+    df = df.sort_values("ds")
+    
+    # Ensure positive values
+    df["y"] = df["y"].clip(lower=0)
+    
+    # Prepare monthly data with proper frequency
+    freq = "MS"  # Monthly start frequency
+    df_monthly = df.groupby(pd.Grouper(key='ds', freq=freq))['y'].sum().reset_index()
+    
+    # Ensure the date range is complete with all months
+    all_dates = pd.date_range(start=df_monthly['ds'].min(), end=df_monthly['ds'].max(), freq=freq)
+    df_complete = pd.DataFrame({'ds': all_dates})
+    df_monthly = pd.merge(df_complete, df_monthly, on='ds', how='left').fillna(0)
 
-                    # Fit model
-                    model.fit(df_monthly)
-                    
-                    # Perform cross-validation with appropriate settings
-                    df_cv = cross_validation(
-                        model,
-                        # initial=initial_period,
-                        initial= "730 days",
-                        period="30 days",  # Test 1 month at a time
-                        horizon="30 days", # Forecast 1 month ahead
-                        parallel="processes"
-                    )
-                    
-                    # Convert predictions and actuals back from log space if we applied log transform
-                    df_cv["yhat"] = np.expm1(df_cv["yhat"])
-                    df_cv["y"] = np.expm1(df_cv["y"])
-                    df_cv["yhat_lower"] = np.expm1(df_cv["yhat_lower"])
-                    df_cv["yhat_upper"] = np.expm1(df_cv["yhat_upper"])
-                    
-                    # Calculate metrics - standard and with better handling of edge cases
-                    df_p = performance_metrics(df_cv)
-                    rmse = df_p["rmse"].mean()
-                    rmse = df_p["rmse"].values[0]
+    # Add month dummies as additional regressors
+    df_monthly = add_month_dummies(df_monthly)
 
-                    # Calculate MAPE manually to handle edge cases better (avoid division by zero)
-                    df_cv['ape'] = np.where(
-                        df_cv['y'] > 0,  # Only where y > 0
-                        np.abs((df_cv['y'] - df_cv['yhat']) / df_cv['y']),
-                        np.nan  # Mark as NaN where y = 0
-                    )
-                    mape = np.nanmean(df_cv['ape']) * 100  # Convert to percentage
-                    
-                    return {
-                        "parameters": params,
-                        "mape": mape,
-                        "rmse": rmse,
-                        "success": True
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Error in parameter set: {str(e)}")
-                    return {
-                        "parameters": params,
-                        "error": str(e),
-                        "success": False
-                    }
-            
-            # Run parallel parameter evaluation
-            total_params = len(all_params)
-            logger.info(f"Testing {total_params} parameter combinations in parallel")
-            
-            # Determine the number of jobs based on CPU cores, but limit it
-            n_jobs = min(total_params, -1)  # Use at most 4 cores to avoid overloading
-            
-            results = Parallel(n_jobs=n_jobs)(
-                delayed(evaluate_params)(params) for params in all_params
-            )
-            
-            # Update progress
-            job.progress = 90
-            db.session.commit()
-            
-            # Process results
-            successful_results = [r for r in results if r["success"]]
-            
-            if not successful_results:
-                raise ValueError("No valid parameter combinations found during testing")
-            
-            # Find best parameters (lowest MAPE)
-            best_result = min(successful_results, key=lambda x: x["mape"])
-            best_params = best_result["parameters"]
-            best_mape = best_result["mape"]
-            best_rmse = best_result["rmse"]
-            
-            # Sort all results by MAPE for better presentation
-            sorted_results = sorted(successful_results, key=lambda x: x["mape"])
-            
-            # Save the best parameters to ForecastParameter table
-            try:
-                # Check if parameters already exist for this category
-                existing = ForecastParameter.query.filter_by(category=category).first()
-                
-                if existing:
-                    # Update existing parameter
-                    existing.set_parameters(best_params)
-                    existing.mape = best_mape
-                    existing.rmse = best_rmse
-                    existing.updated_at = datetime.now(timezone.utc)
-                else:
-                    # Create new parameter
-                    new_param = ForecastParameter(
-                        category=category,
-                        parameters=json.dumps(best_params),
-                        mape=best_mape,
-                        rmse=best_rmse
-                    )
-                    db.session.add(new_param)
-                
-                db.session.commit()
-            except Exception as e:
-                logger.error(f"Error saving parameters: {str(e)}")
-                # Continue processing - we still want to return results even if saving failed
-            
-            # Update job with results
-            job.status = "completed"
-            job.progress = 100
-            job.set_result({
-                "best_parameters": best_params,
-                "mape": best_mape,
-                "rmse": best_rmse,
-                "all_results": sorted_results,
-                "total_combinations_tested": total_params,
-                "successful_combinations": len(successful_results)
-            })
+    # Update progress
+    job.progress = 20
+    db.session.commit()
+    
+    # Check if we have enough data
+    if len(df_monthly) < 12:
+        raise ValueError("Insufficient data for parameter tuning. Need at least 12 months of data.")
+        
+    # Optional: Apply log transformation to avoid negative forecasts
+    df_monthly['y_orig'] = df_monthly['y']  # Save original values
+    df_monthly['y'] = np.log1p(df_monthly['y'])  # log(1 + y) to avoid log(0)
+    
+    # Generate the grid of parameters to test
+    param_grid = {}
+    for param in selected_parameters:
+        param_grid[param] = parameter_values.get(param, [])
+    
+    # Generate all combinations of parameters
+    from itertools import product as itertools_product
+    all_params = []
+    param_names = list(param_grid.keys())
+    param_values = [param_grid[name] for name in param_names]
+    
+    # Create all combinations 
+    for items in itertools_product(*param_values):
+        params = {}
+        for i, name in enumerate(param_names):
+            params[name] = items[i]
+        all_params.append(params)
+    
+    if not all_params:
+        raise ValueError("No valid parameter combinations to test")
+    
+    # Update progress
+    job.progress = 30
+    db.session.commit()
+    
+    # Cutoff cross-validation dihitung sekali untuk semua kombinasi
+    cutoffs = tuning_cutoffs(df_monthly)
+
+    # Mode pencarian: grid penuh (default), acak, atau successive halving
+    search = params_config.get("search") or {}
+    search_mode = search.get("mode", "grid")
+    candidates = all_params
+    if search_mode in ("random", "halving"):
+        # Seed tetap per job agar resume memilih kandidat yang sama
+        seed = search.get("seed", job.id)
+        candidates = sample_candidates(all_params, search.get("n_candidates"), seed)
+    
+    # Checkpoint kombinasi yang sudah selesai (dari attempt / run sebelumnya)
+    checkpoints = [row.to_result() for row in TuningResult.query.filter_by(job_id=job.id).all()]
+    saved = {(checkpoint_hash(r["parameters"]), r["cutoffs"]) for r in checkpoints}
+    if checkpoints:
+        logger.info(f"Resuming tuning job {job.id} with {len(checkpoints)} checkpointed result(s)")
+
+    # Satu antrean task (kombinasi x cutoff) dalam budget core node ini
+    total_params = len(candidates)
+    budget = node_core_budget(app.config)
+    workers = budget.acquire(total_params * len(cutoffs))
+    logger.info(
+        f"Testing {total_params} of {len(all_params)} parameter combinations ({search_mode} search) "
+        f"x {len(cutoffs)} cutoffs on {workers} of {budget.cores} tuning cores"
+    )
+
+    def on_progress(done_tasks, total_tasks):
+        # Berhenti jika lease sudah diambil worker lain
+        lease.check()
+        # Progress 30-90% mengikuti task yang selesai
+        progress = 30 + int(60 * done_tasks / total_tasks)
+        if progress > job.progress:
+            job.progress = progress
             db.session.commit()
-            
-            logger.info(f"Completed parameter tuning job {job_id}")
-            
-        except Exception as e:
-            logger.error(f"Job {job_id} failed: {str(e)}")
-            
-            # Update job status to failed
-            job = TuningJob.query.get(job_id)
-            if job:
-                job.status = "failed"
-                job.error = str(e)
-                db.session.commit()
+
+    def on_result(result):
+        # Simpan setiap kombinasi begitu selesai
+        lease.check()
+        key = (checkpoint_hash(result["parameters"]), result["cutoffs"])
+        if key in saved:
+            return
+        db.session.add(TuningResult(
+            job_id=job.id,
+            params_hash=key[0],
+            parameters=json.dumps(result["parameters"]),
+            cutoffs=result["cutoffs"],
+            success=result["success"],
+            mape=_db_float(result.get("mape")),
+            rmse=_db_float(result.get("rmse")),
+            error=result.get("error")
+        ))
+        db.session.commit()
+        saved.add(key)
+    
+    def on_rung(rungs):
+        lease.check()
+        # Leaderboard sementara bisa dibaca selama job berjalan
+        job.set_result({"search": search_mode, "rungs": rungs})
+        db.session.commit()
+
+    rungs = None
+    eliminated = []
+    try:
+        # Data training dan fold CV dibagi ke worker lewat file memory-mapped
+        with SharedTrainingFrame(df_monthly, cutoffs, app.config.get("TUNING_SHARED_DIR")) as frame, TuningScheduler(
+            workers,
+            nice=app.config.get("TUNING_WORKER_NICE", 10)
+        ) as scheduler:
+            scheduler.preload(checkpoints)
+            if search_mode == "halving":
+                results, eliminated, rungs = successive_halving(
+                    scheduler,
+                    frame,
+                    candidates,
+                    min_cutoffs=int(search.get("min_cutoffs", 3)),
+                    eta=int(search.get("eta", 2)),
+                    on_rung=on_rung,
+                    on_progress=on_progress,
+                    on_result=on_result,
+                    should_stop=lease.lost.is_set
+                )
+            else:
+                results = scheduler.evaluate(
+                    frame,
+                    candidates,
+                    cutoffs,
+                    on_progress=on_progress,
+                    on_result=on_result,
+                    should_stop=lease.lost.is_set
+                )
+    finally:
+        budget.release()
+    
+    # Update progress
+    job.progress = 90
+    db.session.commit()
+    
+    # Process results
+    successful_results = [r for r in results if r["success"]]
+    
+    if not successful_results:
+        raise ValueError("No valid parameter combinations found during testing")
+    
+    # Find best parameters (lowest MAPE)
+    best_result = min(successful_results, key=lambda x: x["mape"])
+    best_params = best_result["parameters"]
+    best_mape = best_result["mape"]
+    best_rmse = best_result["rmse"]
+    
+    # Sort all results by MAPE for better presentation
+    sorted_results = sorted(successful_results, key=lambda x: x["mape"])
+    
+    # Save the best parameters to ForecastParameter table
+    lease.check()
+    try:
+        # Check if parameters already exist for this category
+        existing = ForecastParameter.query.filter_by(category=category).first()
+        
+        if existing:
+            # Update existing parameter
+            existing.set_parameters(best_params)
+            existing.mape = best_mape
+            existing.rmse = best_rmse
+            existing.updated_at = datetime.now(timezone.utc)
+        else:
+            # Create new parameter
+            new_param = ForecastParameter(
+                category=category,
+                parameters=json.dumps(best_params),
+                mape=best_mape,
+                rmse=best_rmse
+            )
+            db.session.add(new_param)
+        
+        db.session.commit()
+        
+        # Forecast kategori ini harus dihitung ulang dengan parameter baru
+        forecast_cache.invalidate(category=category)
+    except Exception as e:
+        logger.error(f"Error saving parameters: {str(e)}")
+        # Continue processing - we still want to return results even if saving failed
+    
+    # Update job with results
+    lease.check()
+    job.status = "completed"
+    job.progress = 100
+    job.worker_id = None
+    job.lease_expires_at = None
+    result = {
+        "best_parameters": best_params,
+        "mape": best_mape,
+        "rmse": best_rmse,
+        "all_results": sorted_results,
+        "total_combinations_tested": total_params,
+        "successful_combinations": len(successful_results),
+        "search": search_mode
+    }
+    if rungs is not None:
+        # Kandidat yang dibuang di rung awal (skor dari cutoff lebih sedikit)
+        result["rungs"] = rungs
+        result["eliminated_results"] = [r for r in eliminated if r["success"]]
+    job.set_result(result)
+    db.session.commit()
+    
+    logger.info(f"Completed parameter tuning job {job.id}")
+
+
+def run_parameter_tuning_task(job_id, app=None):
+    """
+    Embedded worker: claim satu job tertentu dan jalankan di thread API.
+
+    Dipakai jika TUNING_EMBEDDED_WORKER aktif. Job tetap lewat antrean
+    (claim + lease), jadi jika proses API mati job di-requeue ke worker lain.
+    ``app`` adalah app milik proses API; create_app() hanya dipanggil jika
+    task dijalankan di luar request (mis. dari shell).
+    """
+    # Use app context for database operations
+    if app is None:
+        from app import create_app
+        app = create_app()
+
+    with app.app_context():
+        worker_id = make_worker_id("api")
+        job = claim_job(worker_id, app.config.get("TUNING_LEASE_SECONDS", 120), job_id=job_id)
+        if not job:
+            logger.info(f"Job {job_id} was already claimed by another worker")
+            return
+        process_tuning_job(app, job, worker_id)
 
 
 def start_parameter_tuning_background(job_id):
     """Start a background thread to run the parameter tuning job"""
-    thread = threading.Thread(target=run_parameter_tuning_task, args=(job_id,))
+    app = current_app._get_current_object()
+    thread = threading.Thread(target=run_parameter_tuning_task, args=(job_id, app))
     thread.daemon = True  # Allow the thread to be terminated when the main process exits
     thread.start()
     return thread
 
 
+def run_tuning_worker(worker_id=None, poll_seconds=5, max_jobs=None):
+    """
+    Loop worker tuning: requeue lease basi, claim job pending, jalankan, ulangi.
+
+    Harus dipanggil di dalam app context (lihat worker.py).
+
+    Args:
+        worker_id: ID worker (default: host-pid-acak)
+        poll_seconds: Jeda polling saat antrean kosong
+        max_jobs: Berhenti setelah sekian job (None = terus berjalan)
+    """
+    app = current_app._get_current_object()
+    worker_id = worker_id or make_worker_id()
+    lease_seconds = app.config.get("TUNING_LEASE_SECONDS", 120)
+    max_attempts = app.config.get("TUNING_MAX_ATTEMPTS", 3)
+    processed = 0
+
+    logger.info(f"Tuning worker {worker_id} started")
+    while max_jobs is None or processed < max_jobs:
+        try:
+            requeue_stale_jobs(max_attempts)
+            job = claim_job(worker_id, lease_seconds)
+        except Exception as e:
+            logger.error(f"Tuning worker {worker_id} could not poll the queue: {str(e)}")
+            db.session.rollback()
+            job = None
+
+        if job is None:
+            time.sleep(poll_seconds)
+            continue
+
+        logger.info(f"Tuning worker {worker_id} claimed job {job.id} (attempt {job.attempts})")
+        process_tuning_job(app, job, worker_id)
+        db.session.remove()
+        processed += 1
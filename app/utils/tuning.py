@@ -0,0 +1,525 @@
+# app/utils/tuning.py
+"""
+Scheduler parameter tuning Prophet dengan budget core global.
+
+Setiap (kombinasi parameter x cutoff cross-validation) menjadi satu task
+di satu process pool. Tidak ada pool bersarang: cutoff tidak lagi
+dijalankan oleh ``cross_validation(parallel="processes")`` di dalam worker.
+
+Ukuran pool dibatasi oleh slot core yang dipegang job (CoreBudget). Slot
+berupa file lock di satu direktori, sehingga semua job tuning di node yang
+sama (thread maupun worker gunicorn) berbagi TUNING_CORE_BUDGET core,
+termasuk pool forecast batch (lihat forecast_runs.run_forecast_batch).
+"""
+import fcntl
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from app.utils.forecast_features import MONTH_COLUMNS, add_month_regressors, holiday_frame
+
+logger = logging.getLogger(__name__)
+
+# Pengaturan cross-validation (sama dengan versi sebelumnya)
+CV_INITIAL = pd.Timedelta("730 days")
+CV_PERIOD = pd.Timedelta("30 days")  # Test 1 month at a time
+CV_HORIZON = pd.Timedelta("30 days")  # Forecast 1 month ahead
+
+
+def default_core_budget(reserved_cores=2):
+    """Jumlah core untuk tuning: semua core dikurangi cadangan untuk web worker"""
+    return max(1, (os.cpu_count() or 1) - reserved_cores)
+
+
+def node_core_budget(config):
+    """CoreBudget bersama node ini (dipakai job tuning dan forecast batch)"""
+    return CoreBudget(
+        config.get("TUNING_CORE_BUDGET") or default_core_budget(config.get("TUNING_RESERVED_CORES", 2)),
+        config.get("TUNING_SLOT_DIR")
+    )
+
+
+class CoreBudget:
+    """
+    Semaphore core lintas proses berbasis file lock (fcntl.flock).
+
+    Ada ``cores`` file slot di ``slot_dir``. Job memegang slot selama
+    berjalan; lock dilepas otomatis oleh OS jika proses mati.
+
+    Args:
+        cores: Total core untuk semua job tuning / forecast batch di node ini
+        slot_dir: Direktori file slot (None = folder di temp)
+    """
+
+    def __init__(self, cores, slot_dir=None):
+        self.cores = max(1, int(cores))
+        self.slot_dir = slot_dir or os.path.join(tempfile.gettempdir(), "anp_tuning_slots")
+        os.makedirs(self.slot_dir, exist_ok=True)
+        self._held = []
+
+    def acquire(self, wanted, poll_seconds=1.0):
+        """
+        Ambil sampai ``wanted`` slot; tunggu sampai minimal satu slot bebas.
+
+        Returns:
+            int: Jumlah slot yang dipegang
+        """
+        wanted = max(1, min(wanted, self.cores))
+        while True:
+            for slot in range(self.cores):
+                if len(self._held) >= wanted:
+                    break
+                handle = open(os.path.join(self.slot_dir, f"slot_{slot}.lock"), "w")
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._held.append(handle)
+                except OSError:
+                    handle.close()
+            if self._held:
+                return len(self._held)
+            time.sleep(poll_seconds)
+
+    def release(self):
+        for handle in self._held:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+        self._held = []
+
+
+def build_tuning_model(params, dates):
+    """Model Prophet untuk evaluasi satu kombinasi parameter pada data bertanggal ``dates``"""
+    from prophet import Prophet
+
+    # Add Indonesia country holidays if holidays_prior_scale is in parameters
+    holidays = holiday_frame(dates) if "holidays_prior_scale" in params else None
+    model = Prophet(yearly_seasonality=True, weekly_seasonality=True, daily_seasonality=False,
+                    holidays=holidays, **params)
+
+    # Add monthly dummy regressors
+    return add_month_regressors(model)
+
+
+def tuning_cutoffs(df_monthly):
+    """Cutoff cross-validation (initial 730 hari, period/horizon 30 hari)"""
+    from prophet.diagnostics import generate_cutoffs
+
+    return list(generate_cutoffs(df_monthly, CV_HORIZON, CV_INITIAL, CV_PERIOD))
+
+
+def _init_worker(nice):
+    # Worker tuning mengalah ke proses web di core yang sama
+    if nice:
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+    logging.getLogger("cmdstanpy").disabled = True
+
+
+class SharedTrainingFrame:
+    """
+    Frame training tuning (y, regressor is_MM) dan batas fold CV, ditulis sekali ke file .npy.
+
+    Worker membuka file dengan ``np.load(mmap_mode="r")`` lewat ``handle``
+    yang kecil (path + metadata), sehingga data tidak di-pickle per task dan
+    halaman memorinya dibagi semua proses. Direktori default /dev/shm (RAM)
+    jika tersedia. Dipakai sebagai context manager; file dihapus saat keluar.
+
+    Args:
+        df_monthly: DataFrame bulanan (ds, y log, is_01..is_12)
+        cutoffs: List cutoff dari tuning_cutoffs
+        directory: Direktori induk file (None = /dev/shm atau temp)
+    """
+
+    def __init__(self, df_monthly, cutoffs, directory=None):
+        if directory is None and os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+            directory = "/dev/shm"
+        self.path = tempfile.mkdtemp(prefix="anp_tuning_", dir=directory)
+
+        columns = ["y"] + MONTH_COLUMNS
+        ds = df_monthly["ds"].to_numpy(dtype="datetime64[ns]")
+        cutoff_values = np.array(cutoffs, dtype="datetime64[ns]")
+
+        # Fold: baris training [0, train_end), baris test [train_end, test_end)
+        folds = np.column_stack([
+            np.searchsorted(ds, cutoff_values, side="right"),
+            np.searchsorted(ds, cutoff_values + np.timedelta64(CV_HORIZON), side="right"),
+        ]).astype(np.int64)
+
+        np.save(os.path.join(self.path, "ds.npy"), ds.astype(np.int64))
+        np.save(os.path.join(self.path, "features.npy"), df_monthly[columns].to_numpy(dtype=np.float64))
+        np.save(os.path.join(self.path, "folds.npy"), folds)
+
+        self.cutoffs = list(cutoffs)
+        self._fold_index = {cutoff: i for i, cutoff in enumerate(self.cutoffs)}
+        self.handle = (self.path, tuple(columns))
+
+    def fold(self, cutoff):
+        """Index fold untuk sebuah cutoff"""
+        return self._fold_index[cutoff]
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Frame yang sudah dibuka di proses worker ini (path -> (DataFrame, folds))
+_attached_frames = {}
+
+
+def attach_frame(handle):
+    """Buka frame bersama di worker (sekali per proses), tanpa menyalin lewat pickle"""
+    path, columns = handle
+    if path not in _attached_frames:
+        # Worker hanya melayani satu job; frame job lama tidak dipakai lagi
+        _attached_frames.clear()
+        features = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+        ds = np.load(os.path.join(path, "ds.npy"), mmap_mode="r")
+        df = pd.DataFrame(features, columns=list(columns), copy=False)
+        df.insert(0, "ds", pd.to_datetime(np.asarray(ds), unit="ns"))
+        _attached_frames[path] = (df, np.load(os.path.join(path, "folds.npy")))
+    return _attached_frames[path]
+
+
+def _cutoff_task(handle, params, fold, cutoff):
+    """
+    Fit data sampai ``cutoff`` (fold) lalu prediksi bulan dalam horizon.
+
+    Selalu cold start: nilai awal dari fit yang melihat bulan setelah cutoff
+    membocorkan data uji ke skor yang dipakai memilih parameter.
+    """
+    df_monthly, folds = attach_frame(handle)
+    train_end, test_end = folds[fold]
+    train = df_monthly.iloc[:train_end]
+    test = df_monthly.iloc[train_end:test_end]
+
+    model = build_tuning_model(params, train["ds"])
+    model.fit(train)
+
+    forecast = model.predict(test.drop(columns=["y"]))
+    return pd.DataFrame({
+        "ds": forecast["ds"].values,
+        "yhat": forecast["yhat"].values,
+        "yhat_lower": forecast["yhat_lower"].values,
+        "yhat_upper": forecast["yhat_upper"].values,
+        "y": test["y"].values,
+        "cutoff": cutoff,
+    })
+
+
+def score_cv(df_cv):
+    """MAPE (%) dan RMSE dari hasil cross-validation dalam skala log"""
+    from prophet.diagnostics import performance_metrics
+
+    df_cv = df_cv.copy()
+
+    # Convert predictions and actuals back from log space
+    for column in ("yhat", "y", "yhat_lower", "yhat_upper"):
+        df_cv[column] = np.expm1(df_cv[column])
+
+    df_p = performance_metrics(df_cv)
+    rmse = df_p["rmse"].values[0]
+
+    # Calculate MAPE manually to handle edge cases better (avoid division by zero)
+    ape = np.where(
+        df_cv["y"] > 0,  # Only where y > 0
+        np.abs((df_cv["y"] - df_cv["yhat"]) / df_cv["y"]),
+        np.nan  # Mark as NaN where y = 0
+    )
+    return np.nanmean(ape) * 100, rmse
+
+
+def params_key(params):
+    """Kunci stabil satu kombinasi parameter"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class TuningStopped(Exception):
+    """Evaluasi dihentikan oleh callback ``should_stop`` (mis. job dibatalkan)"""
+
+
+class TuningScheduler:
+    """
+    Jalankan evaluasi grid sebagai satu antrean task (kombinasi x cutoff).
+
+    Pool dan hasil per (kombinasi, cutoff) disimpan selama ``with``, sehingga
+    evaluasi ulang dengan cutoff tambahan hanya menjalankan task yang belum ada.
+    Hasil kombinasi yang sudah tersimpan (checkpoint) bisa dimuat dengan
+    ``preload`` dan tidak dijalankan lagi.
+
+    Args:
+        workers: Jumlah proses pool (slot core yang dipegang job)
+        nice: Nilai nice untuk proses worker (0 = tidak diubah)
+    """
+
+    def __init__(self, workers, nice=0):
+        self.workers = max(1, workers)
+        self.nice = nice
+        self._pool = None
+        self._frames = {}  # (params_key, cutoff) -> DataFrame hasil cutoff
+        self._errors = {}  # params_key -> error pertama
+        self._known = {}  # (params_key, jumlah cutoff) -> hasil kombinasi
+
+    def __enter__(self):
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.nice,),
+        )
+        return self
+
+    def __exit__(self, *exc_info):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._pool = None
+
+    def preload(self, results):
+        """Muat hasil kombinasi dari checkpoint (dict dengan parameters, cutoffs, success, ...)"""
+        for result in results:
+            key = params_key(result["parameters"])
+            if result["success"]:
+                self._known[(key, result["cutoffs"])] = result
+            else:
+                self._errors[key] = result.get("error")
+
+    def _terminate(self):
+        # Hentikan fit yang sedang berjalan agar core langsung bebas.
+        # ProcessPoolExecutor tidak punya API untuk ini; _processes berisi proses worker.
+        # Salin sebelum shutdown(): shutdown() mengosongkan _processes (None).
+        processes = list((self._pool._processes or {}).values())
+        for process in processes:
+            process.terminate()
+        # Tunggu proses benar-benar mati sebelum slot core dilepas pemanggil
+        for process in processes:
+            process.join()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _needs(self, key, cutoffs):
+        return key not in self._errors and (key, len(cutoffs)) not in self._known
+
+    def pending_tasks(self, all_params, cutoffs):
+        """Jumlah task yang masih perlu dijalankan untuk evaluasi ini"""
+        total = 0
+        for params in all_params:
+            key = params_key(params)
+            if not self._needs(key, cutoffs):
+                continue
+            total += sum(1 for cutoff in cutoffs if (key, cutoff) not in self._frames)
+        return total
+
+    def evaluate(self, frame, all_params, cutoffs, on_progress=None, on_result=None, should_stop=None):
+        """
+        Evaluasi semua kombinasi parameter pada ``cutoffs``.
+
+        Args:
+            frame: SharedTrainingFrame berisi data tuning dan semua cutoff
+            all_params: List dict parameter Prophet
+            cutoffs: Cutoff (bagian dari frame.cutoffs) yang dinilai
+            on_progress: Callback(done_tasks, total_tasks) untuk task evaluasi ini
+            on_result: Callback(hasil) begitu satu kombinasi selesai (untuk checkpoint)
+            should_stop: Callback tanpa argumen, dicek tiap detik; True = hentikan
+
+        Returns:
+            list: {"parameters", "mape", "rmse", "cutoffs", "success"} atau
+            {"parameters", "error", "success"}, urut sesuai all_params
+
+        Raises:
+            TuningStopped: Jika should_stop mengembalikan True (pool dihentikan)
+        """
+        if self._pool is None:
+            with self:
+                return self.evaluate(frame, all_params, cutoffs, on_progress, on_result, should_stop)
+
+        total_tasks = self.pending_tasks(all_params, cutoffs)
+        done_tasks = 0
+        pending = {}
+        remaining = {}  # params_key -> jumlah cutoff yang belum selesai
+
+        def submit_cutoffs(key, params):
+            for cutoff in cutoffs:
+                if (key, cutoff) not in self._frames:
+                    future = self._pool.submit(_cutoff_task, frame.handle, params, frame.fold(cutoff), cutoff)
+                    pending[future] = (key, params, cutoff)
+
+        def finish(key, params):
+            # Semua cutoff kombinasi selesai (atau gagal): skor dan checkpoint
+            remaining.pop(key, None)
+            result = self._score(params, cutoffs)
+            if result["success"]:
+                self._known[(key, len(cutoffs))] = result
+            if on_result:
+                on_result(result)
+
+        for params in all_params:
+            key = params_key(params)
+            if not self._needs(key, cutoffs) or key in remaining:
+                continue
+            remaining[key] = sum(1 for cutoff in cutoffs if (key, cutoff) not in self._frames)
+            if remaining[key]:
+                submit_cutoffs(key, params)
+            else:
+                finish(key, params)
+
+        try:
+            while pending:
+                if should_stop and should_stop():
+                    raise TuningStopped("Tuning stopped")
+
+                finished, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key, params, cutoff = pending.pop(future)
+                    done_tasks += 1
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        logger.error(f"Error in parameter set: {str(e)}")
+                        first_error = key not in self._errors
+                        self._errors.setdefault(key, str(e))
+                        if first_error:
+                            finish(key, params)
+                        continue
+
+                    self._frames[(key, cutoff)] = value
+                    if key in remaining:
+                        remaining[key] -= 1
+                        if remaining[key] == 0:
+                            finish(key, params)
+
+                if finished and on_progress and total_tasks:
+                    on_progress(min(done_tasks, total_tasks), total_tasks)
+        except BaseException:
+            self._terminate()
+            raise
+
+        return [self._score(params, cutoffs) for params in all_params]
+
+    def _score(self, params, cutoffs):
+        key = params_key(params)
+        if key in self._errors:
+            return {"parameters": params, "error": self._errors[key], "cutoffs": len(cutoffs), "success": False}
+        if (key, len(cutoffs)) in self._known:
+            return dict(self._known[(key, len(cutoffs))], parameters=params)
+        try:
+            df_cv = pd.concat([self._frames[(key, cutoff)] for cutoff in cutoffs])
+            df_cv = df_cv.sort_values(["cutoff", "ds"]).reset_index(drop=True)
+            mape, rmse = score_cv(df_cv)
+            return {"parameters": params, "mape": mape, "rmse": rmse, "cutoffs": len(cutoffs), "success": True}
+        except Exception as e:
+            logger.error(f"Error in parameter set: {str(e)}")
+            self._errors[key] = str(e)
+            return {"parameters": params, "error": str(e), "cutoffs": len(cutoffs), "success": False}
+
+
+def sample_candidates(all_params, n_candidates, seed=None):
+    """Ambil ``n_candidates`` kombinasi acak (tanpa pengulangan) dari grid"""
+    if not n_candidates or n_candidates >= len(all_params):
+        return list(all_params)
+    rng = random.Random(seed)
+    return rng.sample(list(all_params), n_candidates)
+
+
+def halving_schedule(n_candidates, n_cutoffs, min_cutoffs=3, eta=2):
+    """
+    Rencana successive halving: list (jumlah kandidat, jumlah cutoff) per rung.
+
+    Rung pertama memakai ``min_cutoffs`` cutoff terbaru; setiap rung berikutnya
+    menyisakan 1/eta kandidat terbaik dan mengalikan cutoff dengan eta.
+    Rung terakhir selalu memakai semua cutoff agar MAPE sebanding dengan grid.
+    """
+    eta = max(2, int(eta))
+    candidates = max(1, n_candidates)
+    cutoffs = max(1, min(min_cutoffs, n_cutoffs))
+    rungs = [(candidates, cutoffs)]
+    while cutoffs < n_cutoffs:
+        candidates = max(1, math.ceil(candidates / eta))
+        cutoffs = min(n_cutoffs, cutoffs * eta)
+        rungs.append((candidates, cutoffs))
+    return rungs
+
+
+def _leaderboard_entry(result):
+    entry = {"parameters": result["parameters"], "success": result["success"]}
+    if result["success"]:
+        entry.update(mape=result["mape"], rmse=result["rmse"], cutoffs=result["cutoffs"])
+    else:
+        entry["error"] = result["error"]
+    return entry
+
+
+def successive_halving(scheduler, frame, candidates, min_cutoffs=3, eta=2,
+                       on_rung=None, on_progress=None, on_result=None, should_stop=None):
+    """
+    Successive halving: skor semua kandidat di sedikit cutoff, buang yang terburuk, tambah cutoff.
+
+    Args:
+        scheduler: TuningScheduler yang sedang terbuka (hasil cutoff dipakai ulang antar rung)
+        frame: SharedTrainingFrame; rung memakai cutoff terbaru dari frame.cutoffs (urut naik)
+        candidates: List dict parameter
+        on_rung: Callback(list leaderboard rung) setelah tiap rung
+        on_progress: Callback(done_tasks, planned_tasks) untuk seluruh pencarian
+        on_result, should_stop: Diteruskan ke TuningScheduler.evaluate
+
+    Returns:
+        tuple: (hasil rung terakhir, hasil kandidat yang tereliminasi, list rung)
+    """
+    cutoffs = frame.cutoffs
+    schedule = halving_schedule(len(candidates), len(cutoffs), min_cutoffs, eta)
+    planned = sum(
+        n * (c - (schedule[i - 1][1] if i else 0)) for i, (n, c) in enumerate(schedule)
+    )
+    done_before = 0
+
+    survivors = list(candidates)
+    eliminated = []
+    rungs = []
+    for rung, (n_keep, n_cutoffs) in enumerate(schedule):
+        survivors = survivors[:n_keep]
+        rung_cutoffs = cutoffs[-n_cutoffs:]
+        rung_tasks = scheduler.pending_tasks(survivors, rung_cutoffs)
+
+        def rung_progress(done, total, offset=done_before):
+            if on_progress:
+                on_progress(min(offset + done, planned), planned)
+
+        results = scheduler.evaluate(
+            frame,
+            survivors,
+            rung_cutoffs,
+            on_progress=rung_progress,
+            on_result=on_result,
+            should_stop=should_stop,
+        )
+        done_before += rung_tasks
+
+        # Kandidat gagal dianggap terburuk
+        results.sort(key=lambda r: r["mape"] if r["success"] else float("inf"))
+        rungs.append({
+            "rung": rung,
+            "candidates": len(results),
+            "cutoffs": n_cutoffs,
+            "leaderboard": [_leaderboard_entry(r) for r in results],
+        })
+        if on_rung:
+            on_rung(rungs)
+
+        if rung + 1 < len(schedule):
+            n_next = schedule[rung + 1][0]
+            eliminated.extend(results[n_next:])
+            survivors = [r["parameters"] for r in results[:n_next]]
+
+    return results, eliminated, rungs
@@ -0,0 +1,179 @@
+# app/utils/tuning_queue.py
+"""
+Antrean job tuning berbasis tabel tuning_jobs (claim, lease, heartbeat).
+
+Worker mengambil job "pending" dengan UPDATE bersyarat status, sehingga
+satu job hanya di-claim satu worker walaupun banyak proses/node polling
+bersamaan. Selama berjalan worker memperpanjang lease lewat heartbeat;
+job "running" yang lease-nya habis (worker mati, deploy, recycle)
+dikembalikan ke "pending" sampai TUNING_MAX_ATTEMPTS kali.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, or_, update
+
+from ..db import db
+from app.models.forecast_parameter import TuningJob
+
+logger = logging.getLogger(__name__)
+
+# Interval heartbeat maksimum (detik); juga batas waktu deteksi pembatalan
+HEARTBEAT_SECONDS = 5
+
+
+class LeaseLost(Exception):
+    """Lease job sudah tidak dipegang worker ini (diambil ulang atau dibatalkan)"""
+
+
+def _utcnow():
+    # Kolom DateTime disimpan sebagai UTC tanpa tzinfo
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def checkpoint_hash(params):
+    """SHA-256 kombinasi parameter (kunci checkpoint di tuning_results)"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def make_worker_id(prefix="worker"):
+    """ID worker unik: host, pid dan suffix acak"""
+    return f"{prefix}-{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def requeue_stale_jobs(max_attempts=3):
+    """
+    Kembalikan job "running" dengan lease kedaluwarsa ke "pending".
+
+    Job yang sudah di-claim ``max_attempts`` kali ditandai gagal.
+
+    Returns:
+        tuple: (jumlah job di-requeue, jumlah job digagalkan)
+    """
+    now = _utcnow()
+    stale = and_(TuningJob.status == "running", TuningJob.lease_expires_at < now)
+
+    failed = db.session.execute(
+        update(TuningJob)
+        .where(stale, TuningJob.attempts >= max_attempts)
+        .values(
+            status="failed",
+            error=f"Worker lease expired {max_attempts} time(s)",
+            worker_id=None,
+            lease_expires_at=None,
+        )
+    ).rowcount
+
+    requeued = db.session.execute(
+        update(TuningJob)
+        .where(stale, or_(TuningJob.attempts < max_attempts, TuningJob.attempts.is_(None)))
+        .values(status="pending", worker_id=None, lease_expires_at=None)
+    ).rowcount
+    db.session.commit()
+
+    if requeued or failed:
+        logger.warning(f"Tuning queue: requeued {requeued} stale job(s), failed {failed}")
+    return requeued, failed
+
+
+def claim_job(worker_id, lease_seconds, job_id=None):
+    """
+    Claim satu job pending (job tertua, atau ``job_id`` tertentu).
+
+    Returns:
+        TuningJob | None: Job yang berhasil di-claim
+    """
+    query = TuningJob.query.filter_by(status="pending")
+    if job_id is not None:
+        query = query.filter_by(id=job_id)
+
+    for candidate_id, in query.with_entities(TuningJob.id).order_by(TuningJob.id).limit(10).all():
+        now = _utcnow()
+        claimed = db.session.execute(
+            update(TuningJob)
+            .where(TuningJob.id == candidate_id, TuningJob.status == "pending")
+            .values(
+                status="running",
+                worker_id=worker_id,
+                heartbeat_at=now,
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=TuningJob.attempts + 1,
+            )
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(TuningJob, candidate_id, populate_existing=True)
+    return None
+
+
+def renew_lease(job_id, worker_id, lease_seconds):
+    """Perpanjang lease; False jika job sudah tidak dipegang worker ini"""
+    now = _utcnow()
+    with db.engine.begin() as connection:
+        renewed = connection.execute(
+            update(TuningJob)
+            .where(
+                TuningJob.id == job_id,
+                TuningJob.worker_id == worker_id,
+                TuningJob.status == "running",
+            )
+            .values(heartbeat_at=now, lease_expires_at=now + timedelta(seconds=lease_seconds))
+        ).rowcount
+    return bool(renewed)
+
+
+class JobLease:
+    """
+    Heartbeat lease satu job di thread terpisah selama job berjalan.
+
+    Thread memakai koneksi engine sendiri (bukan db.session milik job).
+    ``check()`` melempar LeaseLost jika heartbeat gagal memperpanjang lease
+    (job diambil ulang atau dibatalkan). Heartbeat berjalan paling lambat
+    tiap HEARTBEAT_SECONDS agar pembatalan cepat terdeteksi.
+
+    Args:
+        app: Flask app (untuk app context di thread heartbeat)
+        job_id: ID job yang di-claim
+        worker_id: ID worker pemegang lease
+        lease_seconds: Durasi lease; heartbeat tiap sepertiganya
+    """
+
+    def __init__(self, app, job_id, worker_id, lease_seconds):
+        self.app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _heartbeat(self):
+        with self.app.app_context():
+            while not self._stop.wait(max(1, min(self.lease_seconds / 3, HEARTBEAT_SECONDS))):
+                try:
+                    if not renew_lease(self.job_id, self.worker_id, self.lease_seconds):
+                        logger.warning(f"Lost lease on tuning job {self.job_id}")
+                        self.lost.set()
+                        return
+                except Exception as e:
+                    # Database sementara tidak terjangkau: coba lagi di heartbeat berikutnya
+                    logger.error(f"Heartbeat for tuning job {self.job_id} failed: {str(e)}")
+
+    def check(self):
+        if self.lost.is_set():
+            raise LeaseLost(f"Tuning job {self.job_id} is no longer held by {self.worker_id}")
@@ -3,61 +3,123 @@ from app.models.saved_forecast import SavedForecast
 from app.models.product import Product
 from app.models.product_stock import ProductStock
 from ..db import db
-from sqlalchemy import desc, extract
+from app.utils.date_buckets import month_filter
+from sqlalchemy import desc
 from datetime import datetime
+import json
 
-def get_stock_limits(product, with_forecast=True):
+
+# Jumlah product_id per query IN
+FORECAST_BATCH_SIZE = 1000
+
+
+def _limits_from_forecast(product, forecast_data=None):
     """
-    Helper function to get min_stock and max_stock values based on use_forecast setting
-    
+    Hitung (min_stock, max_stock) dari nilai default produk dan data forecast.
+
     Args:
         product: The Product model instance
-        with_forecast: Whether to consider the use_forecast flag (default True)
-        
+        forecast_data: Dictionary forecast bulan ini (yhat_lower, yhat_upper) atau None
+
     Returns:
         tuple: (min_stock, max_stock) values to use
     """
     # Default values
     min_stock = float(product.min_stock) if product.min_stock else 0
     max_stock = float(product.max_stock) if product.max_stock else 0
-    
-    # If use_forecast is enabled and we want to consider it
-    if with_forecast and product.use_forecast:
-        # Get the current month and year
-        current_date = datetime.now()
-        current_month = current_date.month
-        current_year = current_date.year
-        
-        # Get the forecast for the current month
-        current_month_forecast = SavedForecast.query.filter(
-            SavedForecast.product_id == product.product_id,
-            extract('month', SavedForecast.forecast_date) == current_month,
-            extract('year', SavedForecast.forecast_date) == current_year
-        ).first()
-        
-        if current_month_forecast:
-            forecast_data = current_month_forecast.get_forecast_data()
-            # Use forecast lower bound as min_stock
-            forecast_min = float(forecast_data.get('yhat_lower', 0))
-            # Use forecast upper bound as max_stock
-            forecast_max = float(forecast_data.get('yhat_upper', 0))
-            
-            # Validation: Ensure min is less than max and values are non-negative
-            if forecast_min < forecast_max and forecast_min >= 0 and forecast_max > 0:
-                min_stock = forecast_min
-                max_stock = forecast_max
-            else:
-                # If validation fails, use default values
-                min_stock = float(product.min_stock) if product.min_stock else 0
-                max_stock = float(product.max_stock) if product.max_stock else 0
-    
+
+    if forecast_data:
+        # Use forecast lower bound as min_stock
+        forecast_min = float(forecast_data.get('yhat_lower', 0))
+        # Use forecast upper bound as max_stock
+        forecast_max = float(forecast_data.get('yhat_upper', 0))
+
+        # Validation: Ensure min is less than max and values are non-negative
+        # (if validation fails, keep default values)
+        if forecast_min < forecast_max and forecast_min >= 0 and forecast_max > 0:
+            min_stock = forecast_min
+            max_stock = forecast_max
+
     # Ensure final values are valid, even if coming from default product values
     if min_stock > max_stock:
         # Swap values if min is greater than max
         min_stock, max_stock = max_stock, min_stock
-    
+
     # Ensure non-negative values
     min_stock = max(0, min_stock)
     max_stock = max(0, max_stock)
-    
+
     return min_stock, max_stock
+
+
+def get_month_forecasts(product_ids, month=None):
+    """
+    Ambil data forecast satu bulan untuk banyak produk sekaligus.
+
+    Args:
+        product_ids: Iterable product_id
+        month: Tanggal dalam bulan yang dicari (default bulan ini)
+
+    Returns:
+        dict: product_id -> dictionary forecast (yhat, yhat_lower, yhat_upper)
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    in_month = month_filter(SavedForecast.forecast_date, month or datetime.now())
+
+    forecasts = {}
+    for start in range(0, len(product_ids), FORECAST_BATCH_SIZE):
+        rows = db.session.query(
+            SavedForecast.product_id,
+            SavedForecast.forecast_data
+        ).filter(
+            SavedForecast.product_id.in_(product_ids[start:start + FORECAST_BATCH_SIZE]),
+            in_month
+        ).order_by(SavedForecast.id).all()
+
+        for product_id, forecast_data in rows:
+            # Ambil forecast pertama per produk (sama seperti query .first())
+            if product_id not in forecasts:
+                forecasts[product_id] = json.loads(forecast_data)
+
+    return forecasts
+
+
+def get_stock_limits_bulk(products, month=None, with_forecast=True):
+    """
+    Versi batch dari get_stock_limits: satu query forecast untuk seluruh produk.
+
+    Args:
+        products: List Product model instance
+        month: Tanggal dalam bulan forecast yang dipakai (default bulan ini)
+        with_forecast: Whether to consider the use_forecast flag (default True)
+
+    Returns:
+        dict: product_id -> (min_stock, max_stock)
+    """
+    forecasts = {}
+    if with_forecast:
+        forecast_ids = [product.product_id for product in products if product.use_forecast]
+        if forecast_ids:
+            forecasts = get_month_forecasts(forecast_ids, month)
+
+    return {
+        product.product_id: _limits_from_forecast(
+            product,
+            forecasts.get(product.product_id) if with_forecast and product.use_forecast else None
+        )
+        for product in products
+    }
+
+
+def get_stock_limits(product, with_forecast=True):
+    """
+    Helper function to get min_stock and max_stock values based on use_forecast setting
+    
+    Args:
+        product: The Product model instance
+        with_forecast: Whether to consider the use_forecast flag (default True)
+        
+    Returns:
+        tuple: (min_stock, max_stock) values to use
+    """
+    return get_stock_limits_bulk([product], with_forecast=with_forecast)[product.product_id]
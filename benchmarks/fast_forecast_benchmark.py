@@ -0,0 +1,115 @@
+"""
+Benchmark forecaster statistik (fast_forecasts) vs Prophet untuk seri pendek/intermittent.
+
+Seri sintetis: sebagian pendek (6-20 bulan) dengan pola musiman, sebagian
+intermittent (banyak bulan tanpa penjualan). Semua seri di-forecast sekali
+dengan fast_forecasts (satu panggilan, tervektorisasi) lalu satu per satu
+dengan Prophet. Seri yang ditolak auto-selector tetap dihitung di sisi Prophet.
+Akurasi dibandingkan dengan error total permintaan beberapa bulan ke depan
+yang tidak ikut di-fit.
+
+Contoh:
+    python benchmarks/fast_forecast_benchmark.py --series 50 --holdout 3
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.forecasting import (  # noqa: E402
+    fast_forecasts,
+    prepare_monthly_frame,
+    run_product_forecast,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=50, help="Jumlah seri produk sintetis")
+    parser.add_argument("--holdout", type=int, default=3, help="Bulan ke depan untuk error holdout")
+    parser.add_argument("--max-error", type=float, default=30.0, help="Batas error holdout auto-selector (%)")
+    parser.add_argument("--max-months", type=int, default=24, help="Seri lebih pendek dari ini dianggap pendek")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def synthetic_series(rng, months, intermittent):
+    """Penjualan bulanan pendek musiman, atau intermittent (sebagian besar bulan nol)"""
+    t = np.arange(months)
+    base = rng.uniform(5, 200)
+    if intermittent:
+        qty = np.where(rng.random(months) < rng.uniform(0.2, 0.6), rng.poisson(base / 10, months) + 1, 0)
+    else:
+        season = base * rng.uniform(0.1, 0.3) * np.sin(2 * np.pi * (t + rng.integers(0, 12)) / 12)
+        qty = np.maximum(0, base + season + rng.normal(0, base * 0.1, months)).round()
+    # Bulan pertama selalu ada penjualan (histori produk mulai dari penjualan pertama)
+    qty[0] = max(qty[0], 1)
+    dates = pd.date_range("2022-01-01", periods=months, freq="MS").date
+    return list(zip(dates, qty.astype(float)))
+
+
+def total_error(forecast, actual):
+    """Error total permintaan (%) bulan forecast terhadap nilai sebenarnya"""
+    predicted = sum(item["yhat"] for item in forecast if not item["is_historical"])
+    actual = sum(qty for _, qty in actual)
+    return abs(predicted - actual) / actual * 100 if actual > 0 else np.nan
+
+
+def main():
+    args = parse_args()
+    # Log per fit dari cmdstanpy menenggelamkan hasil benchmark
+    logging.getLogger("cmdstanpy").disabled = True
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+
+    histories, futures = [], []
+    for i in range(args.series):
+        intermittent = i % 2 == 1
+        months = int(rng.integers(24, 40)) if intermittent else int(rng.integers(6, 21))
+        series = synthetic_series(rng, months + args.holdout, intermittent)
+        histories.append(series[:months])
+        futures.append(series[months:])
+
+    frames = [prepare_monthly_frame(history) for history in histories]
+
+    start = time.perf_counter()
+    fast_results = fast_forecasts(frames, args.holdout, args.max_error, args.max_months)
+    fast_time = time.perf_counter() - start
+
+    rows = []
+    prophet_time = 0.0
+    for i, history in enumerate(histories):
+        start = time.perf_counter()
+        prophet_result = run_product_forecast(history, None, args.holdout)
+        elapsed = time.perf_counter() - start
+        prophet_time += elapsed
+
+        fast = fast_results[i]
+        rows.append({
+            "series": i,
+            "model": fast["model"] if fast else "prophet",
+            "prophet_s": elapsed,
+            "prophet_error": total_error(prophet_result["forecast"], futures[i]),
+            "fast_error": total_error(fast["forecast"], futures[i]) if fast else np.nan,
+        })
+
+    df = pd.DataFrame(rows)
+    routed = df[df["model"] != "prophet"]
+    print(f"Series: {args.series} (half short, half intermittent), horizon {args.holdout} months")
+    print(f"Routed to fast forecaster: {len(routed)} / {len(df)}  {routed['model'].value_counts().to_dict()}")
+    print(f"Time         fast {fast_time:.3f}s for all series  prophet {prophet_time:.1f}s "
+          f"(median {df['prophet_s'].median():.2f}s per series)")
+    print(f"Routed series, median total-demand error  fast {routed['fast_error'].median():.2f}%  "
+          f"prophet {routed['prophet_error'].median():.2f}%")
+    print(f"Routed series where fast beats prophet: "
+          f"{int((routed['fast_error'] < routed['prophet_error']).sum())} / {len(routed)}")
+
+
+if __name__ == "__main__":
+    main()
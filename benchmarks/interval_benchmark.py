@@ -0,0 +1,127 @@
+"""
+Benchmark mode interval prediksi: latency predict vs coverage interval.
+
+Setiap seri di-fit sekali pada histori tanpa beberapa bulan terakhir, lalu
+model yang sama di-predict dengan tiap mode interval (full, reduced dengan
+beberapa jumlah sampel, residual). Coverage = porsi bulan holdout yang
+nilai sebenarnya ada di dalam [yhat_lower, yhat_upper]; target mendekati
+interval_width model (0.8). Lebar rata-rata dihitung dalam skala asli.
+
+Tanpa --from-db dipakai seri sintetis musiman. Dengan --from-db seri
+diambil dari sales_summary database aplikasi (DATABASE_URL), produk
+dengan histori terpanjang lebih dulu.
+
+Contoh:
+    python benchmarks/interval_benchmark.py --series 20 --holdout 6
+    python benchmarks/interval_benchmark.py --from-db --series 50 --samples 50 100 200
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.forecasting import fit_model, predict_model, prepare_monthly_frame  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=20, help="Jumlah seri produk")
+    parser.add_argument("--months", type=int, default=48, help="Panjang histori seri sintetis (bulan)")
+    parser.add_argument("--holdout", type=int, default=6, help="Bulan terakhir yang tidak ikut di-fit")
+    parser.add_argument("--samples", type=int, nargs="+", default=[100], help="Jumlah sampel mode reduced")
+    parser.add_argument("--repeat", type=int, default=3, help="Ulangan predict per mode (diambil median)")
+    parser.add_argument("--from-db", action="store_true", help="Pakai histori penjualan dari database")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def synthetic_series(rng, months):
+    """Penjualan bulanan dengan tren, musiman tahunan dan noise"""
+    t = np.arange(months)
+    base = rng.uniform(20, 500)
+    trend = base * rng.uniform(-0.005, 0.01) * t
+    season = base * rng.uniform(0.1, 0.4) * np.sin(2 * np.pi * (t + rng.integers(0, 12)) / 12)
+    qty = np.maximum(0, base + trend + season + rng.normal(0, base * 0.15, months)).round()
+    dates = pd.date_range("2019-01-01", periods=months, freq="MS").date
+    return list(zip(dates, qty.astype(float)))
+
+
+def database_series(count, min_months):
+    """Seri penjualan bulanan terpanjang dari sales_summary"""
+    from app import create_app
+    from app.utils.forecast_runs import load_batch_series
+
+    app = create_app()
+    with app.app_context():
+        series = load_batch_series()
+    series = [rows for rows in series.values() if len(rows) >= min_months]
+    series.sort(key=len, reverse=True)
+    return series[:count]
+
+
+def evaluate(model, periods, actual, interval, samples, repeat):
+    """(median detik predict, coverage, lebar rata-rata) untuk satu mode"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        forecast = predict_model(model, periods, interval, samples)
+        timings.append(time.perf_counter() - start)
+
+    future = forecast.tail(periods)
+    lower = np.maximum(future["yhat_lower"].to_numpy(), 0)
+    upper = np.maximum(future["yhat_upper"].to_numpy(), 0)
+    covered = (actual >= lower) & (actual <= upper)
+    return statistics.median(timings), float(covered.mean()), float((upper - lower).mean())
+
+
+def main():
+    args = parse_args()
+    # Log per fit dari cmdstanpy menenggelamkan hasil benchmark
+    logging.getLogger("cmdstanpy").disabled = True
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+
+    if args.from_db:
+        series = database_series(args.series, 24 + args.holdout)
+    else:
+        rng = np.random.default_rng(args.seed)
+        series = [synthetic_series(rng, args.months) for _ in range(args.series)]
+    if not series:
+        print("No series with enough history")
+        return
+
+    modes = [("full", None)] + [("reduced", samples) for samples in args.samples] + [("residual", None)]
+    rows = []
+    for i, history in enumerate(series):
+        df_monthly = prepare_monthly_frame(history)
+        train = df_monthly.iloc[:-args.holdout]
+        actual = df_monthly["y_orig"].to_numpy()[-args.holdout:]
+        model = fit_model(train, None)
+
+        for interval, samples in modes:
+            seconds, coverage, width = evaluate(model, args.holdout, actual, interval, samples, args.repeat)
+            label = f"{interval}({samples})" if samples else interval
+            rows.append({"series": i, "mode": label, "seconds": seconds, "coverage": coverage, "width": width})
+
+    df = pd.DataFrame(rows)
+    summary = df.groupby("mode", sort=False).agg(
+        predict_ms=("seconds", lambda s: s.median() * 1000),
+        coverage=("coverage", "mean"),
+        mean_width=("width", "mean"),
+    )
+    full_ms = summary.loc["full", "predict_ms"]
+    summary["speedup"] = full_ms / summary["predict_ms"]
+
+    source = "database" if args.from_db else "synthetic"
+    print(f"Series: {len(series)} ({source}), holdout {args.holdout} months, target coverage 0.80")
+    print(summary.round({"predict_ms": 1, "coverage": 3, "mean_width": 1, "speedup": 1}).to_string())
+
+
+if __name__ == "__main__":
+    main()
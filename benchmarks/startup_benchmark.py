@@ -0,0 +1,108 @@
+"""
+Benchmark waktu startup app: import, create_app() dan request pertama.
+
+Setiap pengukuran dijalankan di interpreter baru (subprocess) agar cache
+import tidak ikut terhitung. Request pertama memakai test client ke
+POST /api/auth/login tanpa body (ditolak sebelum menyentuh database),
+jadi tidak perlu database yang hidup. Biaya memuat stack forecasting
+(prophet, cmdstanpy, holidays) diukur terpisah karena sekarang baru
+terjadi pada forecast pertama.
+
+Dengan --check, script keluar dengan status 1 jika modul berat sudah
+ada di sys.modules setelah create_app() biasa (dipakai di CI/deploy).
+
+Contoh:
+    python benchmarks/startup_benchmark.py --runs 5
+    python benchmarks/startup_benchmark.py --check
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modul yang tidak boleh dimuat hanya karena create_app()
+HEAVY_MODULES = ("prophet", "cmdstanpy", "holidays", "matplotlib", "plotly")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().post("/api/auth/login")
+first_request = time.perf_counter()
+heavy = sorted({name.split(".")[0] for name in sys.modules} & set(json.loads(sys.argv[1])))
+forecast_start = time.perf_counter()
+if sys.argv[2] == "1":
+    import pandas as pd
+    from app.utils.forecasting import build_model
+    build_model(None, pd.date_range("2022-01-01", periods=24, freq="MS"))
+forecast_ready = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "create_app_s": created - imported,
+    "first_request_s": first_request - created,
+    "total_s": first_request - start,
+    "forecast_stack_s": forecast_ready - forecast_start,
+    "status": response.status_code,
+    "heavy_modules": heavy,
+}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Jumlah interpreter baru per pengukuran")
+    parser.add_argument("--check", action="store_true", help="Gagal jika modul berat dimuat oleh create_app()")
+    parser.add_argument("--skip-forecast", action="store_true", help="Jangan ukur biaya memuat Prophet")
+    return parser.parse_args()
+
+
+def probe(load_forecast):
+    """Satu pengukuran di interpreter baru"""
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(HEAVY_MODULES), "1" if load_forecast else "0"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+
+    if args.check:
+        result = probe(load_forecast=False)
+        if result["heavy_modules"]:
+            print(f"FAIL: create_app() imported {', '.join(result['heavy_modules'])}")
+            sys.exit(1)
+        print(f"OK: no heavy modules after create_app() ({result['total_s']:.2f}s to first request)")
+        return
+
+    results = [probe(load_forecast=not args.skip_forecast) for _ in range(args.runs)]
+
+    def median(key):
+        return statistics.median(result[key] for result in results)
+
+    print(f"Runs: {args.runs} (fresh interpreter each)")
+    print(f"import app          {median('import_s'):.3f}s")
+    print(f"create_app()        {median('create_app_s'):.3f}s")
+    print(f"first request       {median('first_request_s'):.3f}s  (status {results[0]['status']})")
+    print(f"time to first req   {median('total_s'):.3f}s")
+    if not args.skip_forecast:
+        print(f"forecast stack load {median('forecast_stack_s'):.3f}s  (deferred to first forecast)")
+    print(f"heavy modules after create_app(): {results[0]['heavy_modules'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark refit Prophet: cold start vs warm start dari fit bulan sebelumnya.
+
+Untuk setiap seri sintetis, model "lama" di-fit pada data sampai bulan n-1,
+lalu data bulan n ditambahkan dan model di-fit ulang dua kali: cold start
+(nilai awal default) dan warm start (k, m, delta, beta dari model lama).
+Akurasi dibandingkan dengan MAPE in-sample dan MAPE holdout beberapa bulan
+ke depan yang tidak ikut di-fit.
+
+Contoh:
+    python benchmarks/warm_start_benchmark.py --series 20 --months 48
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.forecasting import (  # noqa: E402
+    compute_mape,
+    fit_model,
+    predict_model,
+    prepare_monthly_frame,
+    warm_start_params,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=20, help="Jumlah seri produk sintetis")
+    parser.add_argument("--months", type=int, default=48, help="Panjang histori per seri (bulan)")
+    parser.add_argument("--holdout", type=int, default=3, help="Bulan ke depan untuk MAPE holdout")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def synthetic_series(rng, months):
+    """Penjualan bulanan dengan tren, musiman tahunan dan noise"""
+    t = np.arange(months)
+    base = rng.uniform(20, 400)
+    trend = base * rng.uniform(-0.01, 0.02) * t
+    season = base * rng.uniform(0.1, 0.4) * np.sin(2 * np.pi * (t + rng.integers(0, 12)) / 12)
+    noise = rng.normal(0, base * 0.1, months)
+    qty = np.maximum(0, base + trend + season + noise).round()
+    dates = pd.date_range("2019-01-01", periods=months, freq="MS").date
+    return list(zip(dates, qty))
+
+
+def holdout_mape(model, actual):
+    """MAPE (%) prediksi bulan setelah histori terhadap nilai sebenarnya"""
+    forecast = predict_model(model, len(actual))
+    predicted = forecast["yhat"].to_numpy()[-len(actual):]
+    actual = np.array([qty for _, qty in actual], dtype=float)
+    mask = actual > 0
+    return float(np.mean(np.abs((actual[mask] - predicted[mask]) / actual[mask])) * 100)
+
+
+def timed_fit(df_monthly, init=None):
+    start = time.perf_counter()
+    model = fit_model(df_monthly, None, init=init)
+    return model, time.perf_counter() - start
+
+
+def main():
+    args = parse_args()
+    # Log per fit dari cmdstanpy menenggelamkan hasil benchmark
+    logging.getLogger("cmdstanpy").disabled = True
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+    rng = np.random.default_rng(args.seed)
+
+    rows = []
+    for i in range(args.series):
+        series = synthetic_series(rng, args.months + args.holdout)
+        history, future = series[:args.months], series[args.months:]
+
+        # Model bulan lalu (satu bulan data lebih sedikit)
+        previous, _ = timed_fit(prepare_monthly_frame(history[:-1]))
+
+        df_monthly = prepare_monthly_frame(history)
+        cold, cold_time = timed_fit(df_monthly)
+        warm, warm_time = timed_fit(df_monthly, init=warm_start_params(previous))
+
+        rows.append({
+            "series": i,
+            "cold_s": cold_time,
+            "warm_s": warm_time,
+            "cold_mape": compute_mape(df_monthly, predict_model(cold, 0)),
+            "warm_mape": compute_mape(df_monthly, predict_model(warm, 0)),
+            "cold_holdout": holdout_mape(cold, future),
+            "warm_holdout": holdout_mape(warm, future),
+        })
+        print(
+            f"series {i:3d}: cold {cold_time:6.2f}s  warm {warm_time:6.2f}s  "
+            f"holdout MAPE cold {rows[-1]['cold_holdout']:6.2f}%  warm {rows[-1]['warm_holdout']:6.2f}%"
+        )
+
+    df = pd.DataFrame(rows)
+    print()
+    print(f"Series: {args.series}, history: {args.months} months")
+    print(f"Fit time     median cold {df['cold_s'].median():.3f}s  warm {df['warm_s'].median():.3f}s  "
+          f"speedup {statistics.median(df['cold_s'] / df['warm_s']):.1f}x")
+    print(f"             total  cold {df['cold_s'].sum():.1f}s  warm {df['warm_s'].sum():.1f}s")
+    print(f"In-sample    mean MAPE cold {df['cold_mape'].mean():.3f}%  warm {df['warm_mape'].mean():.3f}%")
+    print(f"Holdout      mean MAPE cold {df['cold_holdout'].mean():.3f}%  warm {df['warm_holdout'].mean():.3f}%  "
+          f"(median cold {df['cold_holdout'].median():.3f}%  warm {df['warm_holdout'].median():.3f}%)")
+    print(f"Warm fit slower than cold: {int((df['warm_s'] > df['cold_s']).sum())} / {len(df)} series")
+    print(f"Max |holdout MAPE difference|: {(df['cold_holdout'] - df['warm_holdout']).abs().max():.3f} pp")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Precompute forecast malam hari untuk semua produk use_forecast.
+
+Membuat satu ForecastRun (use_forecast_only) dan menjalankannya langsung
+di proses ini: seri pendek/intermittent lewat forecaster statistik, sisanya
+Prophet di process pool dari budget core node (TUNING_CORE_BUDGET, dibagi
+dengan job tuning; batas FORECAST_BATCH_WORKERS). Bulan forecast di-upsert
+ke saved_forecast sehingga get_stock_limits dan dashboard memakai hasil
+terbaru tanpa fit saat jam kerja. Statistik tersimpan di forecast_runs
+(lihat GET /api/forecast/batch/<run_id>).
+
+Jadwalkan di luar jam sibuk, misalnya cron:
+    0 1 * * * cd /app && python precompute.py --periods 6
+
+Exit code 1 jika run gagal (untuk alert dari scheduler).
+"""
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, default=6, choices=[3, 6], help="Jumlah bulan forecast")
+    parser.add_argument("--category", default=None, help="Batasi ke satu kategori produk")
+    parser.add_argument("--workers", type=int, default=None, help="Batas worker (override FORECAST_BATCH_WORKERS)")
+    parser.add_argument("--nice", type=int, default=10, help="Prioritas proses (diwarisi worker pool)")
+    parser.add_argument("--stale-hours", type=float, default=12,
+                        help="Run aktif lebih lama dari ini dianggap mati dan ditandai gagal")
+    parser.add_argument("--created-by", default="precompute", help="Nilai created_by untuk run dan forecast baru")
+    return parser.parse_args()
+
+
+def fail_stale_runs(category, stale_hours):
+    """Tandai gagal run precompute sebelumnya yang tidak pernah selesai (proses mati)"""
+    from app import db
+    from app.models.forecast_run import ForecastRun
+
+    # created_at tersimpan sebagai UTC tanpa tzinfo
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=stale_hours)
+    stale = ForecastRun.query.filter(
+        ForecastRun.category == category if category else ForecastRun.category.is_(None),
+        ForecastRun.use_forecast_only == True,  # noqa: E712
+        ForecastRun.status.in_(["pending", "running"]),
+        ForecastRun.created_at < cutoff,
+    ).all()
+    for run in stale:
+        run.status = "failed"
+        run.error = f"Not finished after {stale_hours} hours"
+        run.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return len(stale)
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logger = logging.getLogger("precompute")
+
+    if args.nice:
+        try:
+            os.nice(args.nice)
+        except OSError:
+            pass
+
+    from app import create_app, db
+    from app.models.forecast_run import ForecastRun
+    from app.utils.forecast_runs import batch_products_query, run_forecast_run_task
+
+    app = create_app()
+    if args.workers:
+        app.config["FORECAST_BATCH_WORKERS"] = args.workers
+
+    with app.app_context():
+        failed = fail_stale_runs(args.category, args.stale_hours)
+        if failed:
+            logger.warning(f"Marked {failed} stale forecast run(s) as failed")
+
+        # Satu run aktif per cakupan produk (sama dengan POST /api/forecast/batch)
+        existing_run = ForecastRun.query.filter(
+            ForecastRun.category == args.category if args.category else ForecastRun.category.is_(None),
+            ForecastRun.use_forecast_only == True,  # noqa: E712
+            ForecastRun.status.in_(["pending", "running"]),
+        ).first()
+        if existing_run:
+            logger.info(f"Forecast run {existing_run.id} is still active, skipping")
+            return
+
+        total_products = batch_products_query(args.category, True).count()
+        if not total_products:
+            logger.info("No use_forecast products to precompute")
+            return
+
+        run = ForecastRun(
+            category=args.category,
+            use_forecast_only=True,
+            periods=args.periods,
+            status="pending",
+            progress=0,
+            total_products=total_products,
+            created_by=args.created_by,
+        )
+        db.session.add(run)
+        db.session.commit()
+        run_id = run.id
+
+    run_forecast_run_task(run_id, app)
+
+    with app.app_context():
+        run = db.session.get(ForecastRun, run_id)
+        stats = run.get_result() or {}
+        logger.info(
+            f"Forecast run {run.id} {run.status}: {run.succeeded} succeeded, {run.failed} failed, "
+            f"{stats.get('no_history', 0)} without history, saved {stats.get('saved', 0)}, "
+            f"updated {stats.get('updated', 0)}, {run.products_per_second()} products/s"
+        )
+        if run.status != "completed":
+            logger.error(f"Forecast run {run.id} failed: {run.error}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
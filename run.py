@@ -5,5 +5,9 @@ app = create_app()
 with app.app_context():
     db.create_all()
 
+    # Isi tabel agregat penjualan sekali jika masih kosong
+    from app.utils.sales_summary import ensure_sales_summary
+    ensure_sales_summary()
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5001)
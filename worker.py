@@ -0,0 +1,52 @@
+"""
+Worker job tuning parameter (antrean tabel tuning_jobs).
+
+Jalankan terpisah dari API, satu atau beberapa proses per node:
+    python worker.py --processes 2
+
+Set TUNING_EMBEDDED_WORKER=false di API agar job hanya diambil worker ini.
+"""
+import argparse
+import logging
+import multiprocessing
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=1, help="Jumlah proses worker di node ini")
+    parser.add_argument("--poll-seconds", type=float, default=5, help="Jeda polling saat antrean kosong")
+    parser.add_argument("--max-jobs", type=int, default=None, help="Berhenti setelah sekian job per proses")
+    return parser.parse_args()
+
+
+def run_worker(poll_seconds, max_jobs):
+    """Satu proses worker: app context sendiri lalu loop antrean"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+    from app import create_app
+    from app.utils.tasks import run_tuning_worker
+
+    app = create_app()
+    with app.app_context():
+        run_tuning_worker(poll_seconds=poll_seconds, max_jobs=max_jobs)
+
+
+def main():
+    args = parse_args()
+    if args.processes <= 1:
+        run_worker(args.poll_seconds, args.max_jobs)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(args.poll_seconds, args.max_jobs), name=f"tuning-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()